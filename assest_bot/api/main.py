@@ -1,20 +1,36 @@
 """FastAPI app for local development."""
-import json
+import asyncio
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.orchestrator.handler import handler
+from src.executor.db_client import close_async_pools
+from src.executor.plan_cache import get_plan_cache
+from src.executor.pool import close_pools, pool_stats
+from src.executor.result_cache import get_result_cache, invalidate_resource
+from src.orchestrator.entity_index import get_entity_index
+from src.orchestrator.handler import handle_batch_async, handle_question_async, stream_question_async
+from src.orchestrator.hedge import latency_stats
+from src.orchestrator.spec_cache import get_spec_cache
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Blocking calls (boto3 Bedrock, psycopg2 fallback) run on this executor;
+    # size it for the number of questions expected in flight.
+    executor = ThreadPoolExecutor(max_workers=int(os.getenv("API_IO_THREADS", "64")))
+    asyncio.get_running_loop().set_default_executor(executor)
     yield
+    await close_async_pools()
+    close_pools()
+    executor.shutdown(wait=False)
 
 
 app = FastAPI(title="Cloud Resource AI Query", lifespan=lifespan)
@@ -23,13 +39,60 @@ app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], all
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    cache = get_spec_cache()
+    results = get_result_cache()
+    entities = get_entity_index()
+    return {
+        "status": "ok",
+        "db_pools": pool_stats(),
+        "spec_cache": cache.stats() if cache else None,
+        "result_cache": results.stats() if results else None,
+        "plan_cache": get_plan_cache().stats(),
+        "llm_latency": latency_stats(),
+        "entity_index": entities.stats() if entities else None,
+    }
 
 
 @app.post("/query")
-def query(payload: dict):
-    """Post JSON body with 'question' key. Returns orchestrator response."""
-    event = {"body": json.dumps(payload) if isinstance(payload, dict) else "{}"}
-    resp = handler(event, None)
-    body = json.loads(resp["body"]) if isinstance(resp.get("body"), str) else resp.get("body", {})
+async def query(payload: dict, response: Response):
+    """Post JSON body with 'question' key ("debug": true adds stage timings when TRACE_DEBUG_FIELD=1). Returns orchestrator response."""
+    question = str((payload or {}).get("question") or "").strip()
+    status, body = await handle_question_async(question, debug=(payload or {}).get("debug") is True)
+    response.status_code = status
     return body
+
+
+@app.post("/query/batch")
+async def query_batch(payload: dict, response: Response):
+    """
+    Post JSON body with 'questions' (list of strings). Identical questions are planned once,
+    compatible specs share SQL statements; returns one result per question, in order.
+    """
+    questions = (payload or {}).get("questions")
+    if not isinstance(questions, list):
+        response.status_code = 400
+        return {"error": "questions must be a list"}
+    status, body = await handle_batch_async(questions, debug=payload.get("debug") is True)
+    response.status_code = status
+    return body
+
+
+@app.post("/query/stream")
+async def query_stream(payload: dict):
+    """
+    Same input as /query. Streams the result as NDJSON (application/x-ndjson):
+    a meta line, row/point chunks as they are fetched from the DB, then an end line.
+    """
+    question = str((payload or {}).get("question") or "").strip()
+    status, lines = await stream_question_async(question)
+    return StreamingResponse(lines, status_code=status, media_type="application/x-ndjson")
+
+
+@app.post("/cache/invalidate")
+def cache_invalidate(payload: dict):
+    """Post JSON body with 'resource' key (e.g. after an ingest run). Flushes cached results and entity values."""
+    resource = (payload or {}).get("resource", "")
+    entities = get_entity_index()
+    if entities:
+        entities.invalidate(resource)
+    return {"resource": resource, "invalidated": invalidate_resource(resource)}
@@ -0,0 +1 @@
+"""Benchmark / load-test harness for the query pipeline (see benchmarks/run.py)."""
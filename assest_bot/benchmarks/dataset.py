@@ -0,0 +1,130 @@
+"""Synthetic inventory for benchmarks, seeded into SQLite (default) or Postgres.
+
+Tables and columns come from the schema registry, so the data always matches
+what the executor compiles against. The row count applies to the large
+resource tables (EC2, RDS); the others get a tenth of it (at least 100 rows).
+Data is deterministic for a given row count.
+"""
+import os
+import random
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from src.shared.config import DbConfig
+from src.shared.schema_registry import ResourceSchema, get_registry
+
+LARGE_RESOURCES = ("ec2_instance", "rds_instance")
+
+REGIONS = ["us-east-1", "us-east-2", "us-west-1", "us-west-2", "eu-west-1", "eu-central-1", "ap-southeast-1", "ap-northeast-1"]
+DEPARTMENTS = ["Finance", "Engineering", "Marketing", "Sales", "HR", "Legal", "Operations", "Research"]
+ENGINES = ["postgres", "mysql", "aurora-postgresql", "aurora-mysql", "mariadb", "oracle-ee", "sqlserver-se"]
+INSTANCE_TYPES = ["t3.micro", "t3.small", "t3.medium", "m5.large", "m5.xlarge", "c5.large", "r5.large", "r5.2xlarge"]
+STATUSES = ["ACTIVE", "INACTIVE", "PROVISIONING"]
+TIERS = ["free", "standard", "premium"]
+N_OWNERS = 500
+N_ACCOUNTS = 200
+
+
+def row_count(resource: str, rows: int) -> int:
+    return rows if resource in LARGE_RESOURCES else max(100, rows // 10)
+
+
+def _value_fn(column: str) -> Callable[[int, random.Random], Any]:
+    """Generator for one column, chosen by column name."""
+    choices: Dict[str, Sequence[Any]] = {
+        "region": REGIONS,
+        "department": DEPARTMENTS,
+        "engine": ENGINES,
+        "instance_type": INSTANCE_TYPES,
+        "status": STATUSES,
+        "tier": TIERS,
+        "size": ["db.t3.micro", "db.m5.large", "db.r5.xlarge"],
+        "version": ["11", "12", "13", "14", "15", "16"],
+    }
+    if column in choices:
+        values = choices[column]
+        return lambda i, rnd: rnd.choice(values)
+    if column == "owner":
+        return lambda i, rnd: f"user{rnd.randrange(N_OWNERS):03d}"
+    if column == "account_id":
+        return lambda i, rnd: f"{100000000000 + rnd.randrange(N_ACCOUNTS)}"
+    if column.endswith("_count"):
+        return lambda i, rnd: rnd.randrange(0, 200)
+    if column.endswith("_id"):
+        prefix = column[: -len("_id")].replace("_", "-")
+        return lambda i, rnd: f"{prefix}-{i:010x}"
+    return lambda i, rnd: f"{column}-{i}"
+
+
+def generate_rows(schema: ResourceSchema, n: int, seed: int = 42) -> Iterator[tuple]:
+    rnd = random.Random(f"{seed}:{schema.name}")
+    fns = [_value_fn(c) for c in sorted(schema.columns)]
+    for i in range(n):
+        yield tuple(fn(i, rnd) for fn in fns)
+
+
+def seed_sqlite(path: str, rows: int, batch: int = 10000) -> str:
+    """Create (or reuse) a SQLite database at path with `rows` rows per large table."""
+    import sqlite3
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS bench_meta (rows INTEGER)")
+        if conn.execute("SELECT rows FROM bench_meta").fetchone() == (rows,):
+            return path
+        for schema in _schemas():
+            _create(conn, schema)
+            _insert_all(conn, schema, row_count(schema.name, rows), "?", batch)
+        conn.execute("DELETE FROM bench_meta")
+        conn.execute("INSERT INTO bench_meta VALUES (?)", (rows,))
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return path
+
+
+def seed_postgres(rows: int, config: Optional[DbConfig] = None, batch: int = 10000) -> None:
+    """(Re)create the registry tables in the configured Postgres (DB_* env) with synthetic rows."""
+    import psycopg2
+
+    cfg = config or DbConfig.from_env()
+    conn = psycopg2.connect(host=cfg.host, port=cfg.port, dbname=cfg.name, user=cfg.user, password=cfg.password)
+    try:
+        with conn.cursor() as cur:
+            for schema in _schemas():
+                _create(cur, schema)
+                _insert_all(cur, schema, row_count(schema.name, rows), "%s", batch)
+            cur.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _schemas() -> List[ResourceSchema]:
+    registry = get_registry()
+    return [registry.resource(name) for name in registry.resource_names_ordered]
+
+
+def _create(target: Any, schema: ResourceSchema) -> None:
+    columns = sorted(schema.columns)  # same order as generate_rows
+    cols = ", ".join(f"{schema.quote(c)} {'INTEGER' if c.endswith('_count') else 'TEXT'}" for c in columns)
+    target.execute(f"DROP TABLE IF EXISTS {schema.table}")
+    target.execute(f"CREATE TABLE {schema.table} ({cols})")
+    for c in sorted(schema.indexed):
+        target.execute(f"CREATE INDEX {schema.table}_{c}_idx ON {schema.table} ({schema.quote(c)})")
+
+
+def _insert_all(target: Any, schema: ResourceSchema, n: int, placeholder: str, batch: int) -> None:
+    sql = f"INSERT INTO {schema.table} VALUES ({', '.join([placeholder] * len(schema.columns))})"
+    chunk: List[tuple] = []
+    for row in generate_rows(schema, n):
+        chunk.append(row)
+        if len(chunk) >= batch:
+            target.executemany(sql, chunk)
+            chunk = []
+    if chunk:
+        target.executemany(sql, chunk)
+
+
+def default_sqlite_path(rows: int) -> str:
+    return os.path.join(os.getenv("BENCH_DATA_DIR", "/tmp"), f"assetbot_bench_{rows}.sqlite3")
@@ -0,0 +1,258 @@
+"""Benchmark / load test for the query pipeline.
+
+    python -m benchmarks.run                                  # 10k, 100k, 1M rows on SQLite
+    python -m benchmarks.run --rows 10000 --concurrency 1 16 --requests 500
+    python -m benchmarks.run --db postgres                    # DB_* env; bench tables are recreated
+    python -m benchmarks.run --baseline benchmarks/reports/<earlier>.json
+
+For each data size it measures the stages separately - parse (LLM JSON to
+QuerySpec), compile (QuerySpec to SQL), execute (SQL on the DB) and format
+(result to response) - then requests/sec end to end through api/main.py at each
+concurrency level (mock LLM, in-process ASGI transport, so no network noise).
+Spec and result caches are off unless --warm-caches. Each run writes one JSON
+report (with git commit, Python and CPU info) to benchmarks/reports/.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(ROOT, "benchmarks", "reports")
+
+QUESTIONS = [
+    "how many ec2 instances by region",
+    "list ec2 instances in us-east-1",
+    "count rds instances by engine",
+    "show aws accounts for Finance",
+    "rds instances owned by user042",
+    "how many postgres databases do we have",
+    "ec2 instances per region as a bar chart",
+    "count aws accounts by department",
+    "ec2 instance types in eu-west-1 by owner",
+    "list ecs clusters",
+]
+
+
+# Env for reproducible runs (cache settings only without --warm-caches)
+CONFIGURED_ENV = {
+    "USE_MOCK_LLM": "1",
+    "ENTITY_INDEX_ENABLED": "0",  # its loader would query the real DB in the background
+    "LOG_LEVEL": "WARNING",
+    "SPEC_CACHE_BACKEND": "none",
+    "RESULT_CACHE_ENABLED": "0",
+}
+_CACHE_KEYS = ("SPEC_CACHE_BACKEND", "RESULT_CACHE_ENABLED")
+
+
+def _configure(warm_caches: bool) -> None:
+    """Must run before the pipeline's caches are first used."""
+    for key, value in CONFIGURED_ENV.items():
+        if key == "LOG_LEVEL":
+            os.environ.setdefault(key, value)
+        elif not (warm_caches and key in _CACHE_KEYS):
+            os.environ[key] = value
+
+
+def stats(latencies_ms: Sequence[float]) -> Dict[str, Any]:
+    ordered = sorted(latencies_ms)
+    n = len(ordered)
+    if not n:
+        return {"n": 0}
+
+    def pct(p: float) -> float:
+        return round(ordered[min(n - 1, int(p / 100.0 * n))], 4)
+
+    total = sum(ordered)
+    return {
+        "n": n,
+        "mean_ms": round(total / n, 4),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "ops_per_s": round(n / (total / 1000.0), 1) if total else None,
+    }
+
+
+def measure(fn: Callable[[Any], Any], items: Sequence[Any], repeat: int) -> Dict[str, Any]:
+    """Call fn on every item, `repeat` times, timing each call."""
+    latencies = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return stats(latencies)
+
+
+def plan_specs(questions: Sequence[str]) -> List[Any]:
+    from src.orchestrator.llm_client import llm_to_spec
+
+    specs = []
+    for q in questions:
+        _, spec, _, _ = llm_to_spec(q)
+        if spec is not None:
+            specs.append(spec)
+    return specs
+
+
+def bench_stages(specs: List[Any], repeat: int, execute_repeat: int) -> Dict[str, Any]:
+    from src.executor.handler import execute_query
+    from src.executor.spec_to_sql import compile_spec
+    from src.formatter.formatter import format_response
+    from src.orchestrator.query_spec import parse_llm_json, spec_to_dict, validate_and_build_spec
+
+    raws = [json.dumps(spec_to_dict(s)) for s in specs]
+    results = [execute_query(s) for s in specs]
+    errors = [r.error for r in results if r.error]
+    if errors:
+        raise RuntimeError(f"benchmark query failed: {errors[0]}")
+    pairs = list(zip(specs, results))
+    return {
+        "parse": measure(lambda raw: validate_and_build_spec(parse_llm_json(raw)), raws, repeat),
+        "compile": measure(compile_spec, specs, repeat),
+        "execute": measure(execute_query, specs, execute_repeat),
+        "format": measure(lambda pair: format_response(*pair), pairs, repeat),
+        "result_rows": {s.resource + ":" + ",".join(s.group_by or []): len(r.rows) for s, r in pairs},
+    }
+
+
+async def load_test(app: Any, questions: Sequence[str], concurrency: int, total: int) -> Dict[str, Any]:
+    """POST /query `total` times from `concurrency` workers; requests/sec and latency."""
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            while (i := next(counter)) < total:
+                start = time.perf_counter()
+                resp = await client.post("/query", json={"question": questions[i % len(questions)]})
+                latencies.append((time.perf_counter() - start) * 1000.0)
+                if resp.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    return {"concurrency": concurrency, "requests": total, "errors": errors, "rps": round(total / wall, 1), **stats(latencies)}
+
+
+def run_scale(rows: int, args: argparse.Namespace, app: Any) -> Dict[str, Any]:
+    from benchmarks import dataset, sqlite_backend
+
+    start = time.perf_counter()
+    restore: Optional[Callable[[], None]] = None
+    if args.db == "postgres":
+        dataset.seed_postgres(rows)
+    else:
+        restore = sqlite_backend.install(dataset.seed_sqlite(dataset.default_sqlite_path(rows), rows))
+    seed_s = round(time.perf_counter() - start, 2)
+    try:
+        specs = plan_specs(QUESTIONS)
+        out: Dict[str, Any] = {"rows": rows, "seed_s": seed_s}
+        out["stages"] = bench_stages(specs, args.repeat, args.execute_repeat)
+        out["e2e"] = [asyncio.run(load_test(app, QUESTIONS, c, args.requests)) for c in args.concurrency]
+        return out
+    finally:
+        if restore:
+            restore()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(report: Dict[str, Any], out_dir: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    path = os.path.join(out_dir, f"{stamp}-{report['run']['git_commit'] or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def summary_lines(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Human-readable table; with a baseline, each value is followed by its ratio to the baseline."""
+    base = {s["rows"]: s for s in (baseline or {}).get("scales", [])}
+
+    def cell(value: Optional[float], old: Optional[float]) -> str:
+        if value is None:
+            return "-"
+        return f"{value:.3f} ({value / old:.2f}x)" if old else f"{value:.3f}"
+
+    lines = []
+    for scale in report["scales"]:
+        old = base.get(scale["rows"], {})
+        lines.append(f"rows={scale['rows']}")
+        for stage in ("parse", "compile", "execute", "format"):
+            s, o = scale["stages"][stage], old.get("stages", {}).get(stage, {})
+            lines.append(f"  {stage:<8} p50_ms {cell(s.get('p50_ms'), o.get('p50_ms'))}  p95_ms {cell(s.get('p95_ms'), o.get('p95_ms'))}")
+        old_e2e = {e["concurrency"]: e for e in old.get("e2e", [])}
+        for e in scale["e2e"]:
+            o = old_e2e.get(e["concurrency"], {})
+            lines.append(
+                f"  e2e c={e['concurrency']:<4} rps {cell(e['rps'], o.get('rps'))}  "
+                f"p95_ms {cell(e.get('p95_ms'), o.get('p95_ms'))}  errors {e['errors']}"
+            )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=400, help="requests per concurrency level")
+    parser.add_argument("--repeat", type=int, default=200, help="iterations over the question set for CPU stages")
+    parser.add_argument("--execute-repeat", type=int, default=5, help="iterations over the question set for DB execution")
+    parser.add_argument("--db", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--warm-caches", action="store_true", help="keep spec/result caches on (measures the hit path)")
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args(argv)
+
+    _configure(args.warm_caches)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from api.main import app
+
+    report = {
+        "run": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "db": args.db,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        },
+        "scales": [run_scale(rows, args, app) for rows in args.rows],
+    }
+    path = write_report(report, args.out)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print("\n".join(summary_lines(report, baseline)))
+    print(f"report: {path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""SQLite stand-in for the Postgres executor (benchmarks only).
+
+install() swaps the executor's DB calls for ones that run the compiled SQL on
+a seeded SQLite file. spec_to_sql output is portable apart from the %s
+placeholders, which become "?". Each thread gets its own connection.
+"""
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Callable, List
+
+from src.executor import handler as executor_handler
+from src.shared.models import ExecutorResult
+
+
+class SqliteExecutor:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params: List[Any], config: Any = None, plan: Any = None) -> ExecutorResult:
+        try:
+            cur = self._conn().execute(sql.replace("%s", "?"), params)
+            rows = cur.fetchall()
+            columns = [d[0] for d in cur.description] if cur.description else []
+            return ExecutorResult.from_tuples(columns, rows)
+        except sqlite3.Error as e:
+            return ExecutorResult(columns=[], rows=[], error=str(e))
+
+    async def execute_async(self, sql: str, params: List[Any], config: Any = None) -> ExecutorResult:
+        return await asyncio.get_running_loop().run_in_executor(None, self.execute, sql, params)
+
+
+def install(path: str) -> Callable[[], None]:
+    """Route executor queries to SQLite at path; returns a function that restores Postgres."""
+    backend = SqliteExecutor(path)
+    saved = (executor_handler.execute_query_raw, executor_handler.execute_query_raw_async)
+    executor_handler.execute_query_raw = backend.execute
+    executor_handler.execute_query_raw_async = backend.execute_async
+
+    def restore() -> None:
+        executor_handler.execute_query_raw, executor_handler.execute_query_raw_async = saved
+
+    return restore
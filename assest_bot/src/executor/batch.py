@@ -0,0 +1,148 @@
+"""Batch execution: run many QuerySpecs with as few SQL statements as possible.
+
+- Specs that compile to the same SQL and params run once.
+- Single-row aggregate specs (aggregates, no group_by / HAVING) on the same
+  resource that differ only in the value of one `=` filter are merged into one
+  statement: `field IN (...) GROUP BY field`, and the result is split back per
+  spec. A value with no rows gets the ungrouped answer (COUNT 0, else NULL).
+
+Other specs (row lists, grouped aggregates) are not merged: their LIMIT applies
+per question and cannot be shared by one statement.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from src.shared.models import ExecutorResult, FilterSpec, QuerySpec
+
+from .handler import execute_query_async
+from .spec_to_sql import compile_spec
+
+
+@dataclass
+class _Group:
+    spec: QuerySpec  # what is executed
+    members: List[int] = field(default_factory=list)  # indexes into the input specs
+    split_field: Optional[str] = None
+    split_values: List[Any] = field(default_factory=list)  # per member, when split_field is set
+
+
+def plan_batch(specs: List[QuerySpec]) -> List[_Group]:
+    """Group specs into statements (see module docstring)."""
+    groups: List[_Group] = []
+    by_sql: Dict[Hashable, _Group] = {}
+    for i, spec in enumerate(specs):
+        try:
+            plan, params = compile_spec(spec)
+        except ValueError:
+            groups.append(_Group(spec=spec, members=[i]))  # the executor reports the error
+            continue
+        key = (plan.sql, repr(params))
+        if key in by_sql:
+            by_sql[key].members.append(i)
+        else:
+            by_sql[key] = _Group(spec=spec, members=[i])
+
+    # Each statement joins the merge key shared by the most other statements
+    unique = list(by_sql.values())
+    options = {id(g): _merge_keys(g.spec) for g in unique}
+    counts = Counter(k for opts in options.values() for k, _ in opts)
+    buckets: Dict[Hashable, List[Tuple[_Group, Any]]] = {}
+    for g in unique:
+        best = max(options[id(g)], key=lambda kv: counts[kv[0]], default=None)
+        if best is None or counts[best[0]] < 2:
+            groups.append(g)
+        else:
+            buckets.setdefault(best[0], []).append((g, best[1]))
+
+    for key, entries in buckets.items():
+        if len(entries) == 1:
+            groups.append(entries[0][0])
+            continue
+        split_field = key[-1]
+        members: List[int] = []
+        values: List[Any] = []
+        for g, value in entries:
+            members += g.members
+            values += [value] * len(g.members)
+        groups.append(_Group(
+            spec=_merged_spec(entries[0][0].spec, split_field, _dedupe(values)),
+            members=members,
+            split_field=split_field,
+            split_values=values,
+        ))
+    return groups
+
+
+async def execute_batch_async(specs: List[QuerySpec], max_concurrency: int = 8) -> Tuple[List[ExecutorResult], int]:
+    """Execute specs; returns (result per spec, number of SQL statements run)."""
+    import asyncio  # deferred: keeps asyncio out of the Lambda cold start
+
+    groups = plan_batch(specs)
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(group: _Group) -> ExecutorResult:
+        async with sem:
+            return await execute_query_async(group.spec)
+
+    outputs = await asyncio.gather(*(run(g) for g in groups))
+    results: List[Optional[ExecutorResult]] = [None] * len(specs)
+    for group, result in zip(groups, outputs):
+        if group.split_field is None or result.error:
+            for i in group.members:
+                results[i] = result
+            continue
+        for i, value in zip(group.members, group.split_values):
+            results[i] = _split(result, specs[i], value)
+    return results, len(groups)  # type: ignore[return-value]
+
+
+def _merge_keys(spec: QuerySpec) -> List[Tuple[Hashable, Any]]:
+    """(merge key, value) for each "=" filter the spec could be merged on; [] if not mergeable."""
+    aliases = {a.alias for a in spec.aggregates}
+    if not spec.aggregates or spec.group_by or any(f.field in aliases for f in spec.filters):
+        return []
+    if any(c not in aliases for c in spec.select):
+        return []  # plain select columns are group keys
+    base = (
+        spec.resource,
+        tuple((a.func, a.field, a.alias) for a in spec.aggregates),
+    )
+    out = []
+    for idx, f in enumerate(spec.filters):
+        if f.op != "=" or isinstance(f.value, (list, dict)):
+            continue
+        others = tuple(sorted((g.field, g.op, repr(g.value)) for j, g in enumerate(spec.filters) if j != idx))
+        out.append(((base, others, f.field), f.value))
+    return out
+
+
+def _merged_spec(spec: QuerySpec, field_name: str, values: List[Any]) -> QuerySpec:
+    others = [f for f in spec.filters if not (f.field == field_name and f.op == "=")]
+    return QuerySpec(
+        resource=spec.resource,
+        filters=others + [FilterSpec(field=field_name, op="in", value=values)],
+        select=[field_name],
+        aggregates=spec.aggregates,
+        group_by=[field_name],
+        limit=max(1, min(len(values), 1000)),
+    )
+
+
+def _split(result: ExecutorResult, spec: QuerySpec, value: Any) -> ExecutorResult:
+    """This spec's row from a merged result (first column is the merge field)."""
+    columns = list(result.columns[1:])
+    for row in result.iter_rows():
+        if str(row[0]) == str(value):
+            return ExecutorResult(columns=columns, rows=[list(row[1:])])
+    empty = [0 if a.func in ("count", "count_distinct") else None for a in spec.aggregates]
+    return ExecutorResult(columns=columns, rows=[empty])
+
+
+def _dedupe(values: List[Any]) -> List[Any]:
+    seen, out = set(), []
+    for v in values:
+        if repr(v) not in seen:
+            seen.add(repr(v))
+            out.append(v)
+    return out
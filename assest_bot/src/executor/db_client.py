@@ -1,42 +1,286 @@
 """Database client for RDS/Aurora."""
-from typing import Any, List, Optional
+import itertools
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from src.shared.config import DbConfig
 from src.shared.models import ExecutorResult
 
+from .plan_cache import CompiledPlan
+from .pool import get_pool
 
-def execute_query_raw(sql: str, params: List[Any], config: Optional[DbConfig] = None) -> ExecutorResult:
+# Upper bound on prepared statements kept per session before DEALLOCATE ALL
+MAX_PREPARED_PER_CONNECTION = 256
+# Upper bound on SQL strings whose result columns / parameter types are kept for asyncpg
+MAX_DESCRIBED = 1024
+# asyncpg's per-connection statement cache (its default); 0 with DB_PREPARED_STATEMENTS=0
+ASYNC_STATEMENT_CACHE_SIZE = 100
+
+
+def execute_query_raw(
+    sql: str, params: List[Any], config: Optional[DbConfig] = None, plan: Optional[CompiledPlan] = None
+) -> ExecutorResult:
     """
     Execute SQL and return ExecutorResult.
-    Uses psycopg2 if available; otherwise returns mock data for local dev.
+    Uses psycopg2 (via the shared connection pool) if available;
+    otherwise returns mock data for local dev.
+    With a CompiledPlan, runs it as a server-side prepared statement (PREPARE once per session).
     """
     cfg = config or DbConfig.from_env()
     try:
-        import psycopg2
-        from psycopg2.extras import RealDictCursor
+        import psycopg2  # noqa: F401
     except ImportError:
         # Fallback: return mock result for local dev without DB
         return _mock_result(sql, params)
 
     try:
-        conn = psycopg2.connect(
-            host=cfg.host,
-            port=cfg.port,
-            dbname=cfg.name,
-            user=cfg.user,
-            password=cfg.password,
-        )
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        pool = get_pool(cfg)
+        with pool.connection() as conn:
+            # Plain tuple cursor: rows are used as returned, columns come from the description
+            cur = conn.cursor()
+            if plan is not None and cfg.prepared_statements:
+                _execute_prepared(conn, cur, plan, params, pool.prepared_statements(conn))
+            else:
+                cur.execute(sql, params)
+            rows = cur.fetchall()
+            columns = [d[0] for d in cur.description] if cur.description else []
+            cur.close()
+        return ExecutorResult.from_tuples(columns, rows)
+    except Exception as e:
+        return ExecutorResult(columns=[], rows=[], error=str(e))
+
+
+def _execute_prepared(conn: Any, cur: Any, plan: CompiledPlan, params: List[Any], prepared: set) -> None:
+    """EXECUTE a prepared plan, preparing it first on this session if needed."""
+    from psycopg2 import errors
+
+    if plan.name not in prepared:
+        if len(prepared) >= MAX_PREPARED_PER_CONNECTION:
+            cur.execute("DEALLOCATE ALL")
+            prepared.clear()
+        try:
+            cur.execute(f"PREPARE {plan.name} AS {plan.prepare_sql}")
+        except errors.DuplicatePreparedStatement:
+            conn.rollback()
+        prepared.add(plan.name)
+
+    execute_sql = f"EXECUTE {plan.name}"
+    if plan.n_params:
+        execute_sql += " (" + ", ".join(["%s"] * plan.n_params) + ")"
+    try:
+        cur.execute(execute_sql, params)
+    except errors.InvalidSqlStatementName:
+        # Session lost the statement (e.g. server-side reset); prepare again and retry once
+        conn.rollback()
+        cur.execute(f"PREPARE {plan.name} AS {plan.prepare_sql}")
+        cur.execute(execute_sql, params)
+
+
+def stream_query_raw(sql: str, params: List[Any], config: Optional[DbConfig] = None, batch_size: int = 500) -> ExecutorResult:
+    """
+    Execute SQL with a server-side (named) cursor and return an ExecutorResult in
+    iterator mode: rows are fetched `batch_size` at a time as `row_stream` is consumed,
+    so memory stays flat for large results. The pooled connection is held until the
+    stream is exhausted or closed.
+    """
+    cfg = config or DbConfig.from_env()
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        mock = _mock_result(sql, params)
+        return ExecutorResult(columns=mock.columns, rows=[], row_stream=iter(mock.rows))
+
+    pool = get_pool(cfg)
+    try:
+        conn = pool.acquire()
+    except Exception as e:
+        return ExecutorResult(columns=[], rows=[], error=str(e))
+    try:
+        # Named cursors live inside the connection's transaction; the pool rolls it back on release
+        import uuid
+
+        cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cur.itersize = batch_size
         cur.execute(sql, params)
-        rows_raw = cur.fetchall()
-        columns = list(rows_raw[0].keys()) if rows_raw else []
-        rows = [[r[c] for c in columns] for r in rows_raw]
-        cur.close()
-        conn.close()
-        return ExecutorResult(columns=columns, rows=rows, error=None)
+        first = cur.fetchmany(batch_size)
+        columns = [d[0] for d in cur.description] if cur.description else []
     except Exception as e:
+        pool.release(conn)
         return ExecutorResult(columns=[], rows=[], error=str(e))
 
+    def _release() -> None:
+        try:
+            cur.close()
+        except Exception:
+            pass
+        pool.release(conn)
+
+    return ExecutorResult(columns=columns, rows=[], row_stream=_CursorStream(cur, first, batch_size, _release))
+
+
+class _CursorStream:
+    """Iterates a named cursor batch by batch; releases the connection exactly once."""
+
+    def __init__(self, cur: Any, first_batch: List[Any], batch_size: int, on_close: Callable[[], None]):
+        self._cur = cur
+        self._first = first_batch
+        self._batch_size = batch_size
+        self._on_close: Optional[Callable[[], None]] = on_close
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            batch = self._first
+            self._first = []
+            while batch:
+                yield from batch
+                if len(batch) < self._batch_size:
+                    break
+                batch = self._cur.fetchmany(self._batch_size)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close()
+
+    def __del__(self):
+        self.close()
+
+
+async def execute_query_raw_async(sql: str, params: List[Any], config: Optional[DbConfig] = None) -> ExecutorResult:
+    """
+    Async variant of execute_query_raw.
+    Uses asyncpg (pooled per process) when installed; otherwise runs the
+    psycopg2 path on the event loop's executor.
+    """
+    import asyncio  # deferred: the Lambda path is synchronous
+
+    cfg = config or DbConfig.from_env()
+    try:
+        import asyncpg  # noqa: F401
+    except ImportError:
+        return await asyncio.get_running_loop().run_in_executor(None, execute_query_raw, sql, params, cfg)
+
+    try:
+        pool = await _get_async_pool(cfg)
+        query = _to_dollar_params(sql)
+        async with pool.acquire() as conn:
+            columns, param_types = await _describe(conn, query)
+            records = await conn.fetch(query, *_coerce_params(params, param_types))
+        return ExecutorResult.from_tuples(columns, [tuple(r) for r in records])
+    except Exception as e:
+        return ExecutorResult(columns=[], rows=[], error=str(e))
+
+
+# Result columns and parameter type names per asyncpg query string
+_DESCRIBED: Dict[str, Tuple[List[str], List[str]]] = {}
+
+
+async def _describe(conn: Any, query: str) -> Tuple[List[str], List[str]]:
+    """
+    Columns (known even for empty results) and the parameter types the server infers.
+    Described once per query string with an unnamed statement (nothing stays prepared on the session).
+    """
+    described = _DESCRIBED.get(query)
+    if described is None:
+        stmt = await conn.prepare(query, name="")
+        described = ([a.name for a in stmt.get_attributes()], [t.name for t in stmt.get_parameters()])
+        if len(_DESCRIBED) >= MAX_DESCRIBED:
+            _DESCRIBED.clear()
+        _DESCRIBED[query] = described
+    return described
+
+
+def _coerce_params(params: List[Any], types: List[str]) -> List[Any]:
+    """
+    Convert params to the Python types asyncpg binds for each parameter type.
+    psycopg2 sends literals the server casts ('5' against an integer column), asyncpg
+    rejects them; values that do not convert are passed through and fail as in psycopg2.
+    """
+    return [_coerce(v, t) for v, t in zip(params, types)] + list(params[len(types):])
+
+
+def _coerce(value: Any, type_name: str) -> Any:
+    if value is None or isinstance(value, (list, tuple)):
+        return value
+    try:
+        if type_name in ("int2", "int4", "int8", "oid"):
+            if isinstance(value, bool) or not isinstance(value, (int, float, str, Decimal)):
+                return value
+            number = Decimal(str(value).strip())
+            return int(number) if number == number.to_integral_value() else value
+        if type_name == "numeric":
+            return value if isinstance(value, Decimal) else Decimal(str(value).strip())
+        if type_name in ("float4", "float8"):
+            return float(value)
+        if type_name in ("text", "varchar", "bpchar", "name"):
+            return value if isinstance(value, str) else str(value)
+        if type_name == "bool" and isinstance(value, str):
+            return {"true": True, "t": True, "1": True, "false": False, "f": False, "0": False}.get(value.strip().lower(), value)
+        if type_name in ("timestamp", "timestamptz") and isinstance(value, str):
+            return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        if type_name == "date" and isinstance(value, str):
+            return date.fromisoformat(value.strip())
+    except (ValueError, TypeError, OverflowError, InvalidOperation):
+        pass
+    return value
+
+
+# asyncpg pools, keyed like the sync pools. Values are futures so concurrent
+# first requests share one pool creation.
+_ASYNC_POOLS: Dict[Tuple[str, int, str, str, bool], "asyncio.Future"] = {}
+
+_PARAM_RE = re.compile(r"%s")
+
+
+def _to_dollar_params(sql: str) -> str:
+    """Convert psycopg2 '%s' placeholders (as emitted by spec_to_sql) to asyncpg '$n'."""
+    counter = itertools.count(1)
+    return _PARAM_RE.sub(lambda _: f"${next(counter)}", sql)
+
+
+async def _get_async_pool(cfg: DbConfig):
+    import asyncio
+
+    import asyncpg
+
+    key = (cfg.host, cfg.port, cfg.name, cfg.user, cfg.prepared_statements)
+    fut = _ASYNC_POOLS.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(
+            asyncpg.create_pool(
+                host=cfg.host,
+                port=cfg.port,
+                database=cfg.name,
+                user=cfg.user,
+                password=cfg.password,
+                min_size=1,
+                max_size=cfg.pool_max_size,
+                max_inactive_connection_lifetime=cfg.pool_idle_timeout,
+                timeout=cfg.connect_timeout,
+                # Without prepared statements (pgbouncer transaction pooling) every query uses an unnamed statement
+                statement_cache_size=ASYNC_STATEMENT_CACHE_SIZE if cfg.prepared_statements else 0,
+            )
+        )
+        _ASYNC_POOLS[key] = fut
+    try:
+        return await asyncio.shield(fut)
+    except Exception:
+        _ASYNC_POOLS.pop(key, None)
+        raise
+
+
+async def close_async_pools() -> None:
+    """Close asyncpg pools (FastAPI shutdown)."""
+    futs = list(_ASYNC_POOLS.values())
+    _ASYNC_POOLS.clear()
+    for fut in futs:
+        if fut.done() and not fut.exception():
+            await fut.result().close()
+
 
 def _mock_result(sql: str, params: List[Any]) -> ExecutorResult:
     """Return mock result when DB is not configured (for demo)."""
@@ -2,18 +2,87 @@
 from typing import Optional
 
 from src.shared.models import ExecutorResult, QuerySpec
+from src.shared.tracing import span
 
-from .db_client import execute_query_raw
-from .spec_to_sql import spec_to_sql
+from .db_client import execute_query_raw, execute_query_raw_async, stream_query_raw
+from .result_cache import get_result_cache, ttl_for_resource
+from .plan_cache import CompiledPlan
+from .spec_to_sql import compile_spec
 
 
 def execute_query(spec: QuerySpec, config=None) -> ExecutorResult:
     """
     Validate QuerySpec, translate to SQL, execute, return ExecutorResult.
+    Successful results are cached by (sql, params) for the resource's TTL.
     """
-    try:
-        sql, params = spec_to_sql(spec)
-    except ValueError as e:
-        return ExecutorResult(columns=[], rows=[], error=str(e))
+    plan, params, ready = _prepare(spec)
+    if ready is not None:
+        return ready
 
-    return execute_query_raw(sql, params, config)
+    with span("db") as s:
+        result = execute_query_raw(plan.sql, params, config, plan=plan)
+        _record(s, result)
+    _store(spec, plan.sql, params, result)
+    return result
+
+
+async def execute_query_async(spec: QuerySpec, config=None) -> ExecutorResult:
+    """Async variant of execute_query (asyncpg when installed)."""
+    plan, params, ready = _prepare(spec)
+    if ready is not None:
+        return ready
+
+    # asyncpg prepares and caches statements per connection on its own
+    with span("db") as s:
+        result = await execute_query_raw_async(plan.sql, params, config)
+        _record(s, result)
+    _store(spec, plan.sql, params, result)
+    return result
+
+
+def execute_query_stream(spec: QuerySpec, config=None, batch_size: int = 500) -> ExecutorResult:
+    """
+    Like execute_query, but returns an ExecutorResult in iterator mode (row_stream)
+    backed by a server-side cursor. A cached result is returned as-is (rows materialized).
+    Streamed results are not cached.
+    """
+    plan, params, ready = _prepare(spec)
+    if ready is not None:
+        return ready
+    with span("db", stream=True) as s:
+        result = stream_query_raw(plan.sql, params, config, batch_size)
+        _record(s, result)
+    return result
+
+
+def _prepare(spec: QuerySpec) -> tuple[Optional[CompiledPlan], list, Optional[ExecutorResult]]:
+    """Compile spec to a plan. Third item is a ready result (validation error or cache hit)."""
+    with span("compile") as s:
+        try:
+            plan, params = compile_spec(spec)
+        except ValueError as e:
+            s.set(error="ValueError")
+            return None, [], ExecutorResult(columns=[], rows=[], error=str(e))
+
+    cache = get_result_cache()
+    if cache:
+        with span("result_cache") as s:
+            cached = cache.get(plan.sql, params)
+            s.set(hit=cached is not None)
+        if cached is not None:
+            return plan, params, cached
+    return plan, params, None
+
+
+def _record(s, result: ExecutorResult) -> None:
+    """Row count / error on the db span (streamed results are counted by the formatter)."""
+    if result.error:
+        s.set(error=result.error[:200])
+    elif result.row_stream is None:
+        s.set(rows=len(result.rows))
+
+
+def _store(spec: QuerySpec, sql: str, params: list, result: ExecutorResult) -> None:
+    cache = get_result_cache()
+    if cache:
+        cache.put(spec.resource, sql, params, result, ttl_for_resource(spec.resource))
@@ -0,0 +1,92 @@
+"""Compiled-SQL plan cache.
+
+Maps a QuerySpec "shape" (resource, columns, aggregates, filter fields/ops/value
+arity, grouping, ordering, limit) to its compiled SQL and a server-side prepared
+statement name. Specs with the same shape differ only in parameter values, so a
+hit skips Python SQL building and, once prepared on a connection, Postgres planning.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from src.shared.models import QuerySpec
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    name: str  # prepared statement name (stable per shape)
+    sql: str  # psycopg2 form with %s placeholders
+    prepare_sql: str  # PREPARE form with $n placeholders
+    n_params: int
+
+
+def spec_shape(spec: QuerySpec) -> Tuple[Hashable, ...]:
+    """Everything that affects the SQL text, but not the parameter values."""
+    filters = tuple(
+        (f.field, f.op.lower(), len(f.value) if isinstance(f.value, list) and f.op.lower() in ("in", "not in") else None)
+        for f in spec.filters
+    )
+    return (
+        spec.resource,
+        tuple(spec.select),
+        tuple((a.func, a.field, a.alias) for a in spec.aggregates),
+        filters,
+        tuple(spec.group_by or ()),
+        tuple(spec.order_by or ()),
+        spec.limit,
+    )
+
+
+def plan_name(shape: Tuple[Hashable, ...]) -> str:
+    return "qs_" + hashlib.sha1(repr(shape).encode("utf-8")).hexdigest()[:16]
+
+
+class PlanCache:
+    """Bounded LRU of shape -> CompiledPlan with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[Tuple[Hashable, ...], CompiledPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compile(self, shape: Tuple[Hashable, ...], compile_fn: Callable[[], CompiledPlan]) -> CompiledPlan:
+        with self._lock:
+            plan = self._data.get(shape)
+            if plan is not None:
+                self._data.move_to_end(shape)
+                self.hits += 1
+                return plan
+            self.misses += 1
+        plan = compile_fn()
+        with self._lock:
+            self._data[shape] = plan
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return plan
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+            }
+
+
+_cache = PlanCache(int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "512")))
+
+
+def get_plan_cache() -> PlanCache:
+    return _cache
@@ -0,0 +1,283 @@
+"""Connection pool for RDS/Aurora.
+
+Pools live at module level so warm connections survive across Lambda
+invocations (same container) and FastAPI requests (same process).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.shared.config import DbConfig
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no connection becomes available within the acquire timeout."""
+
+
+@dataclass
+class _PooledConn:
+    conn: Any
+    created_at: float
+    last_used: float
+    # Names of server-side prepared statements that exist on this session
+    prepared: Set[str] = field(default_factory=set)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool with max-size limit, idle eviction and health checks.
+    Counts hits (warm connection reused) and misses (new connection opened).
+    max_size bounds every open connection: idle, in use, being connected,
+    health-checked or reset. Network round trips and closes run outside the lock.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        health_check_after: float = 30.0,
+        acquire_timeout: float = 5.0,
+    ):
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[_PooledConn] = []
+        self._in_use: Dict[int, _PooledConn] = {}
+        self._open = 0  # connections counted against max_size
+        self._cond = threading.Condition(threading.Lock())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.health_check_failures = 0
+
+    def acquire(self) -> Any:
+        """Return a healthy connection, reusing an idle one when possible."""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            pc, expired = None, []
+            with self._cond:
+                while True:
+                    expired += self._take_expired_locked()
+                    if self._idle:
+                        # LIFO: the most recently used connection is the most likely to be alive
+                        pc = self._idle.pop()
+                        self._in_use[id(pc.conn)] = pc
+                        break
+                    if self._open < self.max_size:
+                        # Reserve the slot; connect outside the lock
+                        self._open += 1
+                        self.misses += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        for old in expired:
+                            _close_quietly(old.conn)
+                        raise PoolExhaustedError(f"No DB connection available (max_size={self.max_size})")
+                    self._cond.wait(remaining)
+            for old in expired:
+                _close_quietly(old.conn)
+
+            if pc is None:
+                return self._open_new()
+            # Health check (possibly a SELECT 1 round trip) runs outside the lock
+            if self._is_healthy(pc):
+                pc.last_used = time.monotonic()
+                with self._cond:
+                    self.hits += 1
+                return pc.conn
+            with self._cond:
+                self._in_use.pop(id(pc.conn), None)
+                self._open -= 1
+                self.health_check_failures += 1
+                self._cond.notify()
+            _close_quietly(pc.conn)
+
+    def _open_new(self) -> Any:
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        now = time.monotonic()
+        with self._cond:
+            self._in_use[id(conn)] = _PooledConn(conn=conn, created_at=now, last_used=now)
+        return conn
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        """Return a connection to the pool. Broken or discarded connections are closed."""
+        with self._cond:
+            pc = self._in_use.pop(id(conn), None)
+        if pc is None:
+            _close_quietly(conn)
+            return
+        # Still counted as open while it is reset, so a waiter cannot open one more
+        keep = not discard and _reset(conn)
+        with self._cond:
+            if keep:
+                pc.last_used = time.monotonic()
+                self._idle.append(pc)
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not keep:
+            _close_quietly(conn)
+
+    def prepared_statements(self, conn: Any) -> Set[str]:
+        """Per-connection set of prepared statement names (empty for unknown connections)."""
+        with self._cond:
+            pc = self._in_use.get(id(conn))
+        return pc.prepared if pc is not None else set()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection for the duration of the block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=_is_closed(conn))
+            raise
+        self.release(conn)
+
+    def close_all(self) -> None:
+        """Close idle connections. In-use connections are closed on release."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for pc in idle:
+            _close_quietly(pc.conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "health_check_failures": self.health_check_failures,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "open": self._open,
+                "max_size": self.max_size,
+            }
+
+    def _take_expired_locked(self) -> List[_PooledConn]:
+        """Remove idle connections past idle_timeout; the caller closes them outside the lock."""
+        if self.idle_timeout <= 0 or not self._idle:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [pc for pc in self._idle if pc.last_used < cutoff]
+        if expired:
+            self._idle = [pc for pc in self._idle if pc.last_used >= cutoff]
+            self._open -= len(expired)
+            self.evictions += len(expired)
+        return expired
+
+    def _is_healthy(self, pc: _PooledConn) -> bool:
+        if _is_closed(pc.conn):
+            return False
+        if time.monotonic() - pc.last_used < self.health_check_after:
+            return True
+        return _ping(pc.conn)
+
+
+# Module-level pools, keyed by connection identity (survive warm invocations)
+_POOLS: Dict[Tuple[str, int, str, str], ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(config: DbConfig) -> ConnectionPool:
+    """Return the shared pool for this DB config, creating it on first use."""
+    key = (config.host, config.port, config.name, config.user)
+    pool = _POOLS.get(key)
+    if pool is not None:
+        return pool
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                connect=lambda: _psycopg2_connect(config),
+                max_size=config.pool_max_size,
+                idle_timeout=config.pool_idle_timeout,
+                health_check_after=config.pool_health_check_after,
+            )
+            _POOLS[key] = pool
+    return pool
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss and size metrics for every pool, keyed by host/dbname."""
+    return {f"{k[0]}:{k[1]}/{k[2]}": p.stats() for k, p in list(_POOLS.items())}
+
+
+def close_pools() -> None:
+    """Close all idle pooled connections (e.g. on FastAPI shutdown)."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for p in pools:
+        p.close_all()
+
+
+def _psycopg2_connect(cfg: DbConfig) -> Any:
+    import psycopg2
+
+    return psycopg2.connect(
+        host=cfg.host,
+        port=cfg.port,
+        dbname=cfg.name,
+        user=cfg.user,
+        password=cfg.password,
+        connect_timeout=cfg.connect_timeout,
+        # TCP keepalives so idle pooled connections are not silently dropped by NAT/RDS proxy
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
+    )
+
+
+def _is_closed(conn: Any) -> bool:
+    return bool(getattr(conn, "closed", False))
+
+
+def _ping(conn: Any) -> bool:
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchone()
+        cur.close()
+        _reset(conn)
+        return True
+    except Exception:
+        return False
+
+
+def _reset(conn: Any) -> bool:
+    """End any open transaction so the connection is clean for the next borrower."""
+    if _is_closed(conn):
+        return False
+    try:
+        if not getattr(conn, "autocommit", True):
+            conn.rollback()
+        return True
+    except Exception:
+        return False
+
+
+def _close_quietly(conn: Optional[Any]) -> None:
+    if conn is None:
+        return
+    try:
+        conn.close()
+    except Exception:
+        pass
@@ -0,0 +1,119 @@
+"""Result cache keyed by compiled (sql, params).
+
+Inventory tables only change when the collectors run, so identical SQL can be
+served from memory. Entries are tagged with their resource so an ingest job can
+flush one resource without touching the rest.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from src.shared.config import ResultCacheConfig
+from src.shared.models import ExecutorResult
+
+from .spec_to_sql import RESOURCE_CACHE_TTL_SECONDS
+
+CacheKey = Tuple[str, Tuple[Hashable, ...]]
+
+
+def _freeze(v: Any) -> Hashable:
+    if isinstance(v, (list, tuple)):
+        return tuple(_freeze(x) for x in v)
+    if isinstance(v, dict):
+        return tuple(sorted((k, _freeze(x)) for k, x in v.items()))
+    return v
+
+
+class ResultCache:
+    """Size-bounded LRU with per-entry TTL and per-resource invalidation."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[CacheKey, Tuple[str, float, ExecutorResult]]" = OrderedDict()
+        self._by_resource: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(sql: str, params: List[Any]) -> CacheKey:
+        return sql, tuple(_freeze(p) for p in params)
+
+    def get(self, sql: str, params: List[Any]) -> Optional[ExecutorResult]:
+        key = self.key(sql, params)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    self._remove_locked(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def put(self, resource: str, sql: str, params: List[Any], result: ExecutorResult, ttl: float) -> None:
+        if ttl <= 0 or result.error:
+            return
+        key = self.key(sql, params)
+        with self._lock:
+            self._data[key] = (resource, time.monotonic() + ttl, result)
+            self._data.move_to_end(key)
+            self._by_resource.setdefault(resource, set()).add(key)
+            while len(self._data) > self.max_entries:
+                self._remove_locked(next(iter(self._data)))
+
+    def invalidate_resource(self, resource: str) -> int:
+        """Drop every cached result for one resource. Returns number of entries removed."""
+        with self._lock:
+            keys = self._by_resource.pop(resource, set())
+            for k in keys:
+                self._data.pop(k, None)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_resource.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+            }
+
+    def _remove_locked(self, key: CacheKey) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            keys = self._by_resource.get(item[0])
+            if keys is not None:
+                keys.discard(key)
+
+
+_config = ResultCacheConfig.from_env()
+_cache = ResultCache(_config.max_entries)
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide result cache, or None when RESULT_CACHE_ENABLED=0."""
+    return _cache if _config.enabled else None
+
+
+def ttl_for_resource(resource: str) -> float:
+    """Per-resource TTL from RESOURCE_CACHE_TTL_SECONDS, else the configured default."""
+    return RESOURCE_CACHE_TTL_SECONDS.get(resource, _config.default_ttl_seconds)
+
+
+def invalidate_resource(resource: str) -> int:
+    """Flush cached results for one resource (call after the collectors ingest it)."""
+    return _cache.invalidate_resource(resource)
+
+
+def clear_result_cache() -> None:
+    _cache.clear()
@@ -1,25 +1,36 @@
 """Query Spec -> SQL translation."""
+import itertools
+import re
+from functools import lru_cache
 from typing import List
 
-from src.shared.models import FilterSpec, QuerySpec
+from src.shared.models import AggregateSpec, FilterSpec, QuerySpec
+from src.shared.schema_registry import ResourceSchema, get_registry
 
-# Resource -> table name mapping (assumed schema)
-RESOURCE_TABLE_MAP = {
-    "aws_account": "aws_accounts",
-    "rds_instance": "rds_instances",
-    "ec2_instance": "ec2_instances",
-    "ecs_cluster": "ecs_clusters",
-    "gcp_project": "gcp_projects",
-    "azure_subscription": "azure_subscriptions",
+from .plan_cache import CompiledPlan, get_plan_cache, plan_name, spec_shape
+
+# Resource -> table name mapping (from schema/resource_tables.json)
+RESOURCE_TABLE_MAP = get_registry().table_map()
+
+# Resource -> result cache TTL in seconds (0 disables caching for that resource).
+# Tables are refreshed by the collectors; resources not listed use RESULT_CACHE_TTL_SECONDS.
+RESOURCE_CACHE_TTL_SECONDS = {
+    "aws_account": 3600,
+    "gcp_project": 3600,
+    "azure_subscription": 3600,
+    "rds_instance": 900,
+    "ecs_cluster": 900,
+    "ec2_instance": 300,
 }
 
 
 def filter_to_sql(f: FilterSpec, idx: int) -> tuple[str, list]:
     """Convert a FilterSpec to SQL WHERE clause fragment and params."""
-    col = _safe_col(f.field)
-    op = f.op.lower()
-    val = f.value
+    return _predicate(_safe_col(f.field), f.op.lower(), f.value)
 
+
+def _predicate(col: str, op: str, val) -> tuple[str, list]:
+    """SQL predicate over a quoted column or aggregate expression."""
     if op == "=":
         return f"{col} = %s", [val]
     if op == "!=":
@@ -41,10 +52,50 @@ def filter_to_sql(f: FilterSpec, idx: int) -> tuple[str, list]:
     return f"{col} = %s", [val]
 
 
+_AGG_SQL = {
+    "count": "COUNT",
+    "count_distinct": "COUNT",
+    "sum": "SUM",
+    "avg": "AVG",
+    "min": "MIN",
+    "max": "MAX",
+}
+
+
+def aggregate_to_sql(a: AggregateSpec) -> str:
+    """Convert an AggregateSpec to a select expression, e.g. COUNT(DISTINCT "owner") AS "n_owners"."""
+    return f"{_aggregate_expr(a)} AS {_safe_col(a.alias or a.func)}"
+
+
+def _aggregate_expr(a: AggregateSpec) -> str:
+    func = _AGG_SQL.get(a.func)
+    if func is None:
+        raise ValueError(f"Invalid aggregate: {a.func}")
+    if a.field is None:
+        if a.func != "count":
+            raise ValueError(f"Aggregate {a.func} requires a field")
+        arg = "*"
+    else:
+        arg = _safe_col(a.field)
+        if a.func == "count_distinct":
+            arg = f"DISTINCT {arg}"
+    return f"{func}({arg})"
+
+
+def _predicate_params(op: str, val) -> list:
+    """Params for _predicate, without building SQL (plan cache hits)."""
+    if op in ("in", "not in") and isinstance(val, list):
+        return list(val)
+    return [val]
+
+
+_SAFE_COL_RE = re.compile(r"[A-Za-z0-9_]*")
+
+
+@lru_cache(maxsize=1024)
 def _safe_col(name: str) -> str:
-    """Simple column name validation (no SQL injection)."""
-    allowed = set("abcdefghijklmnopqrstuvwxyz0123456789_")
-    if all(c in allowed or c == "_" for c in name.lower()):
+    """Simple column name validation (no SQL injection). Memoized: names repeat across queries."""
+    if _SAFE_COL_RE.fullmatch(name):
         return f'"{name}"'
     raise ValueError(f"Invalid column name: {name}")
 
@@ -54,33 +105,89 @@ def spec_to_sql(spec: QuerySpec) -> tuple[str, list]:
     Translate QuerySpec to SQL.
     Returns (sql, params).
     """
-    table = RESOURCE_TABLE_MAP.get(spec.resource)
-    if not table:
+    plan, params = compile_spec(spec)
+    return plan.sql, params
+
+
+def compile_spec(spec: QuerySpec) -> tuple[CompiledPlan, list]:
+    """
+    Translate QuerySpec to a CompiledPlan plus params. Plans are cached by spec shape,
+    so repeated shapes only extract parameter values.
+    """
+    if spec.resource not in RESOURCE_TABLE_MAP:
+        raise ValueError(f"Unknown resource: {spec.resource}")
+    shape = spec_shape(spec)
+    plan = get_plan_cache().get_or_compile(shape, lambda: _compile(spec, plan_name(shape)))
+    return plan, spec_params(spec)
+
+
+def spec_params(spec: QuerySpec) -> list:
+    """Query params in placeholder order: WHERE filters, then HAVING filters."""
+    aliases = {a.alias for a in spec.aggregates}
+    where = [f for f in spec.filters if f.field not in aliases]
+    having = [f for f in spec.filters if f.field in aliases]
+    return [p for f in where + having for p in _predicate_params(f.op.lower(), f.value)]
+
+
+def _compile(spec: QuerySpec, name: str) -> CompiledPlan:
+    sql, params = _build_sql(spec)
+    counter = itertools.count(1)
+    prepare_sql = re.sub(r"%s", lambda _: f"${next(counter)}", sql)
+    return CompiledPlan(name=name, sql=sql, prepare_sql=prepare_sql, n_params=len(params))
+
+
+def _quote(schema: ResourceSchema, aliases: set, name: str) -> str:
+    """Whitelisted, pre-quoted table column; aggregate aliases are validated by name only."""
+    return _safe_col(name) if name in aliases else schema.quote(name)
+
+
+def _build_sql(spec: QuerySpec) -> tuple[str, list]:
+    schema = get_registry().resource(spec.resource)
+    if schema is None:
         raise ValueError(f"Unknown resource: {spec.resource}")
+    table = schema.table
 
-    select_cols = spec.select
-    if not select_cols:
-        select_cols = ["*"]
+    aliases = {a.alias for a in spec.aggregates}
+    if spec.aggregates:
+        # Plain columns are the group keys; aggregate aliases in select are computed below
+        plain = [c for c in spec.select if c not in aliases] or list(spec.group_by or [])
+        group_cols = list(spec.group_by or plain)
+        ungrouped = [c for c in plain if c not in group_cols]
+        if ungrouped:
+            raise ValueError(f"Columns must be in group_by when aggregating: {ungrouped}")
+        select_cols = [schema.quote(c) for c in plain] + [aggregate_to_sql(a) for a in spec.aggregates]
     else:
-        select_cols = [_safe_col(c) for c in select_cols]
+        group_cols = list(spec.group_by or [])
+        select_cols = [schema.quote(c) for c in spec.select] or ["*"]
     select_str = ", ".join(select_cols)
 
     where_parts: List[str] = []
+    having_parts: List[str] = []
     params: List[object] = []
+    having_params: List[object] = []
 
-    for i, f in enumerate(spec.filters):
-        frag, p = filter_to_sql(f, i)
+    for f in spec.filters:
+        if f.field in aliases:
+            # Filter on an aggregate result (e.g. count > 5) goes to HAVING
+            agg = next(a for a in spec.aggregates if a.alias == f.field)
+            frag, p = _predicate(_aggregate_expr(agg), f.op.lower(), f.value)
+            having_parts.append(frag)
+            having_params.extend(p)
+            continue
+        frag, p = _predicate(schema.quote(f.field), f.op.lower(), f.value)
         where_parts.append(frag)
         params.extend(p)
 
     sql = f"SELECT {select_str} FROM {table}"
     if where_parts:
         sql += " WHERE " + " AND ".join(where_parts)
-    if spec.group_by:
-        group_cols = [_safe_col(c) for c in spec.group_by]
-        sql += " GROUP BY " + ", ".join(group_cols)
+    if group_cols:
+        sql += " GROUP BY " + ", ".join(schema.quote(c) for c in group_cols)
+    if having_parts:
+        sql += " HAVING " + " AND ".join(having_parts)
+        params.extend(having_params)
     if spec.order_by:
-        order_cols = [_safe_col(c.split()[0]) for c in spec.order_by]
+        order_cols = [_quote(schema, aliases, c.split()[0]) for c in spec.order_by]
         directions = ["DESC" if "desc" in c.lower() else "ASC" for c in spec.order_by]
         parts = [f"{col} {dir}" for col, dir in zip(order_cols, directions)]
         sql += " ORDER BY " + ", ".join(parts)
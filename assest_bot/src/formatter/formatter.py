@@ -3,10 +3,15 @@
 Output formats are sufficient for Web chat lib to render chats, lists, tables,
 and pivot tables.
 """
-from typing import Any, Dict, List
+import json
+from array import array
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
 from src.shared.models import ExecutorResult, QuerySpec
 
+from .pivot import build_pivot, default_pivot_spec
+
 
 def format_response(spec: QuerySpec, result: ExecutorResult) -> Dict[str, Any]:
     """
@@ -22,30 +27,29 @@ def format_response(spec: QuerySpec, result: ExecutorResult) -> Dict[str, Any]:
     columns = result.columns
     rows = result.rows
 
-    if fmt in ("table", "pivot"):
+    if fmt == "pivot":
+        pivot = _pivot(spec, result)
+        if pivot is not None:
+            return {"format": "pivot", "title": _title_for_resource(spec.resource), "pivot": pivot}
+        fmt = "table"  # Nothing to pivot on (e.g. only numeric columns)
+
+    if fmt == "table":
         return {
             "format": fmt,
             "title": _title_for_resource(spec.resource),
             "columns": columns,
             "rows": rows,
-            "pivot": fmt == "pivot",  # Hint for Web chat lib to render as pivot
+            "pivot": False,
         }
 
     # For pie/bar: first col = labels, second col = values (or first numeric)
     if not rows:
         return {"format": fmt, "title": _title_for_resource(spec.resource), "labels": [], "values": []}
 
-    label_idx = 0
-    value_idx = 1
-    if len(columns) > 1:
-        for i, c in enumerate(columns):
-            if _is_numeric_col(c):
-                value_idx = i
-                label_idx = 0 if i != 0 else 1
-                break
-
-    labels = [str(r[label_idx]) for r in rows]
-    values = [_to_num(r[value_idx]) for r in rows]
+    # Slice the columnar view instead of walking rows
+    label_idx, value_idx = _label_value_idx(columns, result)
+    labels = [str(v) for v in result.column(label_idx)]
+    values = _to_nums(result.column(value_idx))
 
     return {
         "format": fmt,
@@ -55,6 +59,97 @@ def format_response(spec: QuerySpec, result: ExecutorResult) -> Dict[str, Any]:
     }
 
 
+def format_response_stream(spec: QuerySpec, result: ExecutorResult, chunk_rows: int = 200) -> Iterator[str]:
+    """
+    Format ExecutorResult as NDJSON lines for a streaming response.
+    Lines: {"type": "meta", ...} then {"type": "rows"|"points", ...} chunks, then {"type": "end", "row_count": n}.
+    Works with both iterator-mode (row_stream) and materialized results.
+    """
+    if result.error:
+        yield _ndjson({"type": "error", "format": "error", "message": result.error})
+        return
+
+    fmt = (spec.output_format or "table").lower()
+    if fmt not in ("table", "pie", "bar", "pivot"):
+        fmt = "table"
+    if fmt == "pivot":
+        # The pivot matrix needs every row; the result is bounded by LIMIT, so materialize it
+        materialized = ExecutorResult(columns=result.columns, rows=list(result.iter_rows()))
+        yield _ndjson({"type": "meta", **format_response(spec, materialized)})
+        yield _ndjson({"type": "end", "row_count": len(materialized.rows)})
+        return
+
+    columns = result.columns
+    meta = {"type": "meta", "format": fmt, "title": _title_for_resource(spec.resource)}
+    if fmt == "table":
+        meta.update({"columns": columns, "pivot": False})
+    yield _ndjson(meta)
+
+    rows = result.iter_rows()
+    label_idx, value_idx = 0, 1
+    if fmt != "table":
+        # Pick label/value columns as format_response does, from the types of the first fetched row
+        first = next(rows, None)
+        if first is not None:
+            label_idx, value_idx = _label_value_idx(columns, ExecutorResult(columns=columns, rows=[first]))
+            rows = chain([first], rows)
+    count = 0
+    chunk: List[Any] = []
+    for row in rows:
+        chunk.append(row)
+        count += 1
+        if len(chunk) >= chunk_rows:
+            yield _ndjson(_chunk(fmt, chunk, label_idx, value_idx))
+            chunk = []
+    if chunk:
+        yield _ndjson(_chunk(fmt, chunk, label_idx, value_idx))
+    yield _ndjson({"type": "end", "row_count": count})
+
+
+def _pivot(spec: QuerySpec, result: ExecutorResult) -> Optional[Dict[str, Any]]:
+    """Pivot matrix using the spec's layout (or a derived one); None if nothing to pivot on."""
+    layout = spec.pivot or default_pivot_spec(result)
+    if layout is None:
+        return None
+    try:
+        return build_pivot(result, layout)
+    except ValueError:
+        # Layout names columns the query did not return; fall back to a derived one
+        layout = default_pivot_spec(result)
+        return build_pivot(result, layout) if layout else None
+
+
+def _chunk(fmt: str, rows: List[Any], label_idx: int, value_idx: int) -> Dict[str, Any]:
+    if fmt == "table":
+        return {"type": "rows", "rows": rows}
+    return {
+        "type": "points",
+        "labels": [str(r[label_idx]) for r in rows],
+        "values": [_to_num(r[value_idx]) for r in rows],
+    }
+
+
+def _ndjson(obj: Dict[str, Any]) -> str:
+    # default=str covers Decimal / datetime values from the DB driver
+    return json.dumps(obj, default=str) + "\n"
+
+
+def _label_value_idx(columns: List[str], result: ExecutorResult) -> tuple[int, int]:
+    """
+    For pie/bar: first col = labels, second col = values (or first numeric).
+    Numeric columns are known from the data (streaming passes the first fetched row).
+    """
+    label_idx = 0
+    value_idx = 1
+    if len(columns) > 1 and result.rows:
+        for i in range(len(columns)):
+            if result.is_numeric_column(i):
+                value_idx = i
+                label_idx = 0 if i != 0 else 1
+                break
+    return label_idx, value_idx
+
+
 def _title_for_resource(resource: str) -> str:
     m = {
         "aws_account": "AWS Accounts",
@@ -67,9 +162,10 @@ def _title_for_resource(resource: str) -> str:
     return m.get(resource, resource.replace("_", " ").title())
 
 
-def _is_numeric_col(name: str) -> bool:
-    n = name.lower()
-    return "count" in n or "num" in n or "sum" in n or "total" in n or n.endswith("_id") is False
+def _to_nums(col: Sequence[Any]) -> List[float]:
+    if isinstance(col, array) and col.typecode == "d":
+        return col.tolist()
+    return [_to_num(v) for v in col]
 
 
 def _to_num(v: Any) -> float:
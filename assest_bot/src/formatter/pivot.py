@@ -0,0 +1,110 @@
+"""Server-side pivot engine.
+
+Groups an ExecutorResult by row keys x column keys and aggregates one value
+column (sum | count | avg), so the Web chat lib receives a compact matrix with
+totals instead of up to 1000 raw rows to pivot in the browser.
+"""
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.shared.models import ExecutorResult, PivotSpec
+
+PIVOT_AGGS = ("sum", "count", "avg")
+
+
+def default_pivot_spec(result: ExecutorResult) -> Optional[PivotSpec]:
+    """
+    Derive a pivot layout when the QuerySpec has none: first non-numeric column ->
+    rows, second -> columns, first numeric column -> value (sum), else count rows.
+    Returns None when there is no key column to pivot on.
+    """
+    keys: List[str] = []
+    value: Optional[str] = None
+    for i, c in enumerate(result.columns):
+        if result.rows and result.is_numeric_column(i):
+            if value is None:
+                value = c
+        elif len(keys) < 2:
+            keys.append(c)
+    if not keys:
+        return None
+    return PivotSpec(rows=keys[:1], columns=keys[1:], value=value, agg="sum" if value else "count")
+
+
+def build_pivot(result: ExecutorResult, pivot: PivotSpec) -> Dict[str, Any]:
+    """
+    Build the pivot matrix. Grouping walks the columnar view (zip over key/value
+    columns) once; per cell it keeps the sum, the number of numeric values (the
+    avg divisor, NULLs and non-numbers excluded as in SQL AVG) and the row count
+    (for count), so totals are exact.
+    """
+    index = {c: i for i, c in enumerate(result.columns)}
+    missing = [c for c in [*pivot.rows, *pivot.columns, *([pivot.value] if pivot.value else [])] if c not in index]
+    if missing:
+        raise ValueError(f"Pivot columns not in result: {missing}")
+    agg = pivot.agg if pivot.agg in PIVOT_AGGS else "sum"
+
+    n = len(result.rows)
+    row_keys_iter = _keys(result, [index[c] for c in pivot.rows], n)
+    col_keys_iter = _keys(result, [index[c] for c in pivot.columns], n)
+    values: Sequence[Any] = result.column(index[pivot.value]) if pivot.value else repeat(1, n)  # type: ignore[assignment]
+
+    row_pos: Dict[Tuple, int] = {}
+    col_pos: Dict[Tuple, int] = {}
+    cells: Dict[Tuple[int, int], List[float]] = {}  # [sum, numeric values, rows]
+    for rk, ck, v in zip(row_keys_iter, col_keys_iter, values):
+        r = row_pos.setdefault(rk, len(row_pos))
+        c = col_pos.setdefault(ck, len(col_pos))
+        cell = cells.get((r, c))
+        if cell is None:
+            cell = cells[(r, c)] = [0.0, 0, 0]
+        num = _num(v)
+        if num is not None:
+            cell[0] += num
+            cell[1] += 1
+        cell[2] += 1
+
+    n_rows, n_cols = len(row_pos), len(col_pos)
+    matrix: List[List[Optional[float]]] = [[None] * n_cols for _ in range(n_rows)]
+    row_acc = [[0.0, 0, 0] for _ in range(n_rows)]
+    col_acc = [[0.0, 0, 0] for _ in range(n_cols)]
+    grand = [0.0, 0, 0]
+    for (r, c), cell in cells.items():
+        matrix[r][c] = _finish(agg, *cell)
+        for acc in (row_acc[r], col_acc[c], grand):
+            for i in range(3):
+                acc[i] += cell[i]
+
+    return {
+        "row_fields": pivot.rows,
+        "col_fields": pivot.columns,
+        "value": pivot.value,
+        "agg": agg,
+        "row_keys": [list(k) for k in row_pos],
+        "col_keys": [list(k) for k in col_pos],
+        "matrix": matrix,
+        "row_totals": [_finish(agg, *a) for a in row_acc],
+        "col_totals": [_finish(agg, *a) for a in col_acc],
+        "grand_total": _finish(agg, *grand),
+    }
+
+
+def _keys(result: ExecutorResult, idxs: List[int], n: int):
+    if not idxs:
+        return repeat((), n)
+    return zip(*(result.column(i) for i in idxs))
+
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _finish(agg: str, total: float, numeric: int, rows: int) -> Optional[float]:
+    if agg == "count":
+        return rows
+    if agg == "avg":
+        return round(total / numeric, 6) if numeric else None
+    return total
@@ -0,0 +1,232 @@
+"""Entity-value index for fuzzy filter resolution.
+
+Keeps the distinct values of each entity column (resource_tables.json
+"entities": departments, owners, account names, ...) in memory with a trigram
+index. A filter value that does not exist is matched by trigram overlap plus
+edit distance, so "Finanse" snaps to "Finance" and an ambiguous value becomes
+an IN over the close matches, instead of returning zero rows. Only free-text
+columns are entity columns; code-like values (anything with a digit or a dot,
+e.g. "user042", "t3.micro") are matched exactly, ignoring case and spacing,
+because a near miss there is a different, valid value.
+
+Columns load lazily in a background thread on first use (validation never
+waits on the DB) and refresh after the TTL by diffing old and new values.
+"""
+import threading
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.shared.config import EntityIndexConfig
+from src.shared.schema_registry import get_registry
+
+Loader = Callable[[str, str, int], List[str]]
+
+MAX_CANDIDATES = 20  # trigram candidates checked with edit distance
+MAX_MATCHES = 5  # values in an IN produced from an ambiguous filter
+
+
+@dataclass
+class _Column:
+    values: Dict[str, str] = field(default_factory=dict)  # normalized -> canonical
+    grams: Dict[str, Set[str]] = field(default_factory=dict)  # trigram -> normalized values
+    loaded_at: float = 0.0
+
+
+class EntityIndex:
+    def __init__(self, loader: Loader, ttl: float = 900.0, max_values: int = 10000):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_values = max_values
+        self._columns: Dict[Tuple[str, str], _Column] = {}
+        self._loading: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def lookup(self, resource: str, column: str, value: str) -> List[str]:
+        """
+        Real values for a filter value: [canonical] for an exact (case-insensitive) or
+        single best match, several values when matches tie, [] when nothing is close
+        or the column is not loaded yet (a background load is started).
+        Code-like values only match exactly.
+        """
+        col = self._column(resource, column)
+        if col is None:
+            return []
+        norm = _normalize(value)
+        with self._lock:
+            exact = col.values.get(norm)
+            if exact is not None:
+                return [exact]
+            if _code_like(norm):
+                return []
+            candidates = _candidates(col, norm)
+            scored = sorted((d, c) for c in candidates if (d := _distance(norm, c)) is not None)
+            if not scored:
+                return []
+            best = scored[0][0]
+            return [col.values[c] for d, c in scored if d == best][:MAX_MATCHES]
+
+    def contains(self, resource: str, column: str, value: str) -> bool:
+        """True when the value exists (ignoring case and spacing); False if unknown or not loaded yet."""
+        col = self._column(resource, column)
+        if col is None:
+            return False
+        with self._lock:
+            return _normalize(value) in col.values
+
+    def add_values(self, resource: str, column: str, values: Iterable[str]) -> None:
+        """Merge values into a column (e.g. pushed by an ingest job)."""
+        key = (resource, column)
+        with self._lock:
+            col = self._columns.setdefault(key, _Column(loaded_at=time.monotonic()))
+            for v in values:
+                _add(col, str(v))
+
+    def refresh(self, resource: str, column: str) -> bool:
+        """Reload one column from the loader, applying only the added/removed values."""
+        key = (resource, column)
+        try:
+            fresh = {_normalize(v): v for v in self._loader(resource, column, self.max_values)}
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+                col = self._columns.setdefault(key, _Column())
+                col.loaded_at = time.monotonic()  # back off for a TTL before retrying
+            return False
+        with self._lock:
+            col = self._columns.setdefault(key, _Column())
+            for norm in set(col.values) - set(fresh):
+                _remove(col, norm)
+            for norm, v in fresh.items():
+                if col.values.get(norm) != v:
+                    _add(col, v)
+            col.loaded_at = time.monotonic()
+            self.refreshes += 1
+        return True
+
+    def invalidate(self, resource: str) -> None:
+        """Mark a resource's columns stale; they reload on next use."""
+        with self._lock:
+            for (r, _), col in self._columns.items():
+                if r == resource:
+                    col.loaded_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "columns": {f"{r}.{c}": len(col.values) for (r, c), col in self._columns.items()},
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
+
+    def _column(self, resource: str, column: str) -> Optional[_Column]:
+        key = (resource, column)
+        with self._lock:
+            col = self._columns.get(key)
+            stale = col is None or time.monotonic() - col.loaded_at > self.ttl
+            if stale and key not in self._loading:
+                self._loading.add(key)
+                threading.Thread(target=self._refresh_bg, args=key, daemon=True).start()
+        return col
+
+    def _refresh_bg(self, resource: str, column: str) -> None:
+        try:
+            self.refresh(resource, column)
+        finally:
+            with self._lock:
+                self._loading.discard((resource, column))
+
+
+def _normalize(value: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", str(value)).casefold().split())
+
+
+def _code_like(norm: str) -> bool:
+    return any(ch.isdigit() or ch == "." for ch in norm)
+
+
+def _trigrams(norm: str) -> Set[str]:
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _add(col: _Column, value: str) -> None:
+    norm = _normalize(value)
+    col.values[norm] = value
+    for g in _trigrams(norm):
+        col.grams.setdefault(g, set()).add(norm)
+
+
+def _remove(col: _Column, norm: str) -> None:
+    col.values.pop(norm, None)
+    for g in _trigrams(norm):
+        bucket = col.grams.get(g)
+        if bucket is not None:
+            bucket.discard(norm)
+            if not bucket:
+                del col.grams[g]
+
+
+def _candidates(col: _Column, norm: str) -> List[str]:
+    shared: Counter = Counter()
+    for g in _trigrams(norm):
+        shared.update(col.grams.get(g, ()))
+    return [c for c, _ in shared.most_common(MAX_CANDIDATES)]
+
+
+def _distance(norm: str, candidate: str) -> Optional[int]:
+    """Edit distance when close enough (about one typo per 4 chars), prefixes count as 1; else None."""
+    if len(norm) >= 3 and candidate.startswith(norm):
+        return 1
+    limit = min(2, len(norm) // 4)
+    if limit == 0 or abs(len(norm) - len(candidate)) > limit:
+        return None
+    d = _levenshtein(norm, candidate, limit)
+    return d if d <= limit else None
+
+
+def _levenshtein(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, stopping early once every path exceeds limit."""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+def _db_loader(resource: str, column: str, max_values: int) -> List[str]:
+    from src.executor.db_client import execute_query_raw
+
+    schema = get_registry().resource(resource)
+    col = schema.quote(column)
+    result = execute_query_raw(f"SELECT DISTINCT {col} FROM {schema.table} WHERE {col} IS NOT NULL LIMIT %s", [max_values])
+    if result.error:
+        raise RuntimeError(result.error)
+    if result.columns != [column]:
+        return []  # mock executor (no DB configured)
+    return [str(r[0]) for r in result.iter_rows()]
+
+
+_index: Optional[EntityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_entity_index() -> Optional[EntityIndex]:
+    """Shared index, or None when disabled (ENTITY_INDEX_ENABLED=0)."""
+    global _index
+    if _index is None:
+        cfg = EntityIndexConfig.from_env()
+        if not cfg.enabled:
+            return None
+        with _index_lock:
+            if _index is None:
+                _index = EntityIndex(_db_loader, ttl=cfg.ttl_seconds, max_values=cfg.max_values)
+    return _index
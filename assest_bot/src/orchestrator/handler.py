@@ -1,63 +1,235 @@
 """Chat Orchestrator Lambda handler."""
+from src.shared import startup  # first: starts the cold-start clock / import timer
+
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional
 
-from src.executor.handler import execute_query
-from src.formatter.formatter import format_response
+from src.executor.batch import execute_batch_async
+from src.executor.handler import execute_query, execute_query_async, execute_query_stream
+from src.formatter.formatter import format_response, format_response_stream
+from src.shared.config import BatchConfig, ScanPolicyConfig
 from src.shared.models import QueryDecision
+from src.shared.schema_registry import get_registry
+from src.shared.tracing import current_trace, span, trace
 
-from .llm_client import llm_to_spec
+from .llm_client import llm_to_spec, llm_to_spec_async
+from .query_spec import spec_to_dict
+from .spec_cache import normalize_question
 
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     API Gateway / Lambda entry.
     Expects: { "body": "{\"question\": \"...\"}" } or { "question": "..." }
+    Batch mode: { "questions": ["...", ...] } (see handle_batch_async).
+    "debug": true adds the request's stage timings as a "debug" field (TRACE_DEBUG_FIELD).
     """
+    startup.log_cold_start_once()
     try:
         body = event.get("body")
         if isinstance(body, str):
             body = json.loads(body) if body else {}
-        question = (body or event).get("question", "").strip()
-    except (json.JSONDecodeError, TypeError):
+        payload = body or event
+        debug = payload.get("debug") is True
+        if isinstance(payload.get("questions"), list):
+            import asyncio  # deferred: only batch mode needs an event loop in Lambda
+
+            return _resp(*asyncio.run(handle_batch_async(payload["questions"], debug=debug)))
+        question = payload.get("question", "").strip()
+    except (json.JSONDecodeError, TypeError, AttributeError):
         return _resp(400, {"error": "Invalid request body"})
 
+    with trace("query") as t:
+        out = _resp(*handle_question(question, debug=debug))
+        if t:
+            t.set(response_bytes=len(out["body"]))
+    return out
+
+
+def handle_question(question: str, debug: bool = False) -> tuple[int, dict]:
+    """Run the pipeline for one question. Returns (status_code, response body)."""
+    with trace("query") as t:
+        return _with_trace(*_answer(question), t, debug)
+
+
+async def handle_question_async(question: str, debug: bool = False) -> tuple[int, dict]:
+    """Async variant of handle_question for the FastAPI service (no worker thread held per request)."""
+    with trace("query") as t:
+        return _with_trace(*await _answer_async(question), t, debug)
+
+
+def _answer(question: str) -> tuple[int, dict]:
     if not question:
-        return _resp(400, {"error": "question is required"})
+        return 400, {"error": "question is required"}
 
     decision, spec, clarification, _ = llm_to_spec(question)
+    early = _decision_response(decision, spec, clarification)
+    if early:
+        return early
+    rejected, warnings = _scan_check(spec)
+    if rejected:
+        return rejected
+
+    result = execute_query(spec)
+    return _result_response(spec, result, warnings)
 
+
+async def _answer_async(question: str) -> tuple[int, dict]:
+    if not question:
+        return 400, {"error": "question is required"}
+
+    decision, spec, clarification, _ = await llm_to_spec_async(question)
+    early = _decision_response(decision, spec, clarification)
+    if early:
+        return early
+    rejected, warnings = _scan_check(spec)
+    if rejected:
+        return rejected
+
+    result = await execute_query_async(spec)
+    return _result_response(spec, result, warnings)
+
+
+async def handle_batch_async(
+    questions: List[Any], config: Optional[BatchConfig] = None, debug: bool = False
+) -> tuple[int, dict]:
+    """
+    Answer many questions at once. Identical questions (after normalization) are planned
+    once, planning runs concurrently up to BATCH_MAX_CONCURRENCY, and executable specs
+    are merged into as few SQL statements as possible (see executor.batch).
+    Returns one result per input question, in order.
+    """
+    with trace("batch", questions=len(questions)) as t:
+        return _with_trace(*await _answer_batch(questions, config), t, debug)
+
+
+async def _answer_batch(questions: List[Any], config: Optional[BatchConfig]) -> tuple[int, dict]:
+    import asyncio
+
+    cfg = config or BatchConfig.from_env()
+    questions = [str(q or "").strip() for q in questions]
+    if not questions:
+        return 400, {"error": "questions is required"}
+    if len(questions) > cfg.max_questions:
+        return 400, {"error": f"At most {cfg.max_questions} questions per batch"}
+
+    keys = [normalize_question(q) for q in questions]
+    unique = {k: q for k, q in zip(keys, questions) if k}
+    sem = asyncio.Semaphore(max(1, cfg.max_concurrency))
+
+    async def plan(question: str):
+        async with sem:
+            return await llm_to_spec_async(question)
+
+    planned = dict(zip(unique, await asyncio.gather(*(plan(q) for q in unique.values()))))
+
+    responses: Dict[str, tuple[int, dict]] = {}
+    warnings: Dict[str, List[str]] = {}
+    executable: List[str] = []
+    for key, (decision, spec, clarification, _) in planned.items():
+        early = _decision_response(decision, spec, clarification)
+        if not early:
+            early, warnings[key] = _scan_check(spec)
+        if early:
+            responses[key] = early
+        else:
+            executable.append(key)
+
+    results, statements = await execute_batch_async([planned[k][1] for k in executable], cfg.max_concurrency)
+    for key, result in zip(executable, results):
+        responses[key] = _result_response(planned[key][1], result, warnings[key])
+
+    out = []
+    for question, key in zip(questions, keys):
+        status, body = responses.get(key) or (400, {"error": "question is required"})
+        out.append({"question": question, "status": status, "response": body})
+    stats = {"questions": len(questions), "unique": len(unique), "sql_statements": statements}
+    return 200, {"results": out, "stats": stats}
+
+
+async def stream_question_async(question: str) -> tuple[int, Iterator[str]]:
+    """
+    Streaming variant for large results: returns (status_code, NDJSON line iterator).
+    Non-executable decisions and errors are a single line with the usual response body.
+    The iterator blocks on DB fetches, so consume it off the event loop (Starlette's
+    StreamingResponse does this for sync iterators).
+    """
+    if not question:
+        return 400, iter([json.dumps({"error": "question is required"}) + "\n"])
+
+    import asyncio
+
+    # Traces planning and opening the cursor; rows are fetched after the response starts
+    with trace("stream"):
+        decision, spec, clarification, _ = await llm_to_spec_async(question)
+        early = _decision_response(decision, spec, clarification) or _scan_check(spec)[0]
+        if early:
+            return early[0], iter([json.dumps(early[1]) + "\n"])
+        with span("db_open"):
+            result = await asyncio.get_running_loop().run_in_executor(None, execute_query_stream, spec)
+    if result.error:
+        return 500, iter([json.dumps({"error": result.error, "query_spec": spec_to_dict(spec)}) + "\n"])
+    return 200, format_response_stream(spec, result)
+
+
+def _decision_response(decision, spec, clarification) -> Optional[tuple[int, dict]]:
+    """Response for non-executable decisions; None when the spec should be executed."""
     if decision == QueryDecision.CLARIFY:
-        return _resp(200, {"decision": "clarify", "clarification": _clar_to_dict(clarification)})
+        return 200, {"decision": "clarify", "clarification": _clar_to_dict(clarification)}
+    if decision == QueryDecision.ERROR:
+        return 502, {"error": clarification.message if clarification else "LLM call failed"}
     if decision == QueryDecision.UNSUPPORTED:
-        return _resp(200, {"decision": "unsupported", "message": clarification.message if clarification else "Unsupported"})
-
+        return 200, {"decision": "unsupported", "message": clarification.message if clarification else "Unsupported"}
     if not spec:
-        return _resp(500, {"error": "Failed to produce Query Spec"})
+        return 500, {"error": "Failed to produce Query Spec"}
+    return None
 
-    result = execute_query(spec)
-    if result.error:
-        return _resp(500, {"error": result.error, "query_spec": _spec_to_dict(spec)})
 
-    formatted = format_response(spec, result)
-    return _resp(200, {"decision": "executable", "result": formatted})
+def _scan_check(spec) -> tuple[Optional[tuple[int, dict]], List[str]]:
+    """
+    Flag filters that only touch unindexed columns before any SQL is sent:
+    (rejection response under UNINDEXED_FILTERS=reject, else None; warnings for the result body).
+    """
+    unindexed = get_registry().unindexed_filters(spec)
+    if not unindexed:
+        return None, []
+    t = current_trace()
+    if t is not None:
+        t.set(unindexed_filters=unindexed)
+    message = f"Filters on unindexed columns {unindexed} scan the whole {spec.resource} table"
+    if ScanPolicyConfig.from_env().unindexed_filters == "reject":
+        return (400, {"error": message, "query_spec": spec_to_dict(spec)}), []
+    return None, [message]
+
+
+def _result_response(spec, result, warnings: Optional[List[str]] = None) -> tuple[int, dict]:
+    if result.error:
+        return 500, {"error": result.error, "query_spec": spec_to_dict(spec)}
+    # Formatting is pure CPU over an in-memory result; safe to run on the event loop
+    with span("format", output_format=spec.output_format):
+        formatted = format_response(spec, result)
+    body = {"decision": "executable", "result": formatted}
+    if warnings:
+        body["warnings"] = warnings
+    return 200, body
+
+
+def _with_trace(status: int, body: dict, t, debug: bool) -> tuple[int, dict]:
+    """Record the status on the trace; with debug (and TRACE_DEBUG_FIELD) add the timings to the body."""
+    if t is None:
+        return status, body
+    t.set(status=status)
+    if debug and t.config.debug_field:
+        body = {**body, "debug": t.to_dict()}
+    return status, body
 
 
 def _resp(status: int, body: dict) -> dict:
     return {"statusCode": status, "headers": {"Content-Type": "application/json"}, "body": json.dumps(body)}
 
 
-def _spec_to_dict(spec) -> dict:
-    return {
-        "resource": spec.resource,
-        "filters": [{"field": f.field, "op": f.op, "value": f.value} for f in spec.filters],
-        "select": spec.select,
-        "group_by": spec.group_by,
-        "order_by": spec.order_by,
-        "limit": spec.limit,
-        "output_format": spec.output_format,
-    }
-
-
 def _clar_to_dict(c):
     return {"message": c.message, "suggestions": getattr(c, "suggestions", [])}
+
+
+startup.mark_ready()
@@ -0,0 +1,160 @@
+"""Hedged requests over two LLM endpoints.
+
+The primary endpoint is called first; if it has not produced an acceptable
+response after the hedge delay (or fails / returns something unusable), the
+alternate endpoint is called too and the first acceptable response wins.
+Per-endpoint latency histograms drive the delay: by default it is the primary
+endpoint's p95, so only the slow tail is duplicated.
+"""
+import math
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+# Log-scale bucket upper bounds: 50ms .. ~60s
+_BUCKETS_MS: List[float] = [50.0 * (1.25 ** i) for i in range(33)]
+
+
+class LatencyHistogram:
+    """Bucketed latency histogram. Counts are halved when they grow large so recent latency dominates."""
+
+    def __init__(self, max_samples: int = 2000):
+        self.max_samples = max_samples
+        self._counts = [0] * (len(_BUCKETS_MS) + 1)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def record(self, ms: float) -> None:
+        idx = min(_bucket_index(ms), len(_BUCKETS_MS))
+        with self._lock:
+            self._counts[idx] += 1
+            self._total += 1
+            if self._total > self.max_samples:
+                self._counts = [c // 2 for c in self._counts]
+                self._total = sum(self._counts)
+
+    @property
+    def count(self) -> int:
+        return self._total
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding the p-th percentile; None when empty."""
+        with self._lock:
+            if not self._total:
+                return None
+            rank = math.ceil(self._total * p / 100.0)
+            seen = 0
+            for i, c in enumerate(self._counts):
+                seen += c
+                if seen >= rank:
+                    return _BUCKETS_MS[i] if i < len(_BUCKETS_MS) else _BUCKETS_MS[-1]
+        return _BUCKETS_MS[-1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"count": self.count, "p50_ms": self.percentile(50), "p95_ms": self.percentile(95), "p99_ms": self.percentile(99)}
+
+
+def _bucket_index(ms: float) -> int:
+    if ms <= _BUCKETS_MS[0]:
+        return 0
+    return math.ceil(math.log(ms / _BUCKETS_MS[0], 1.25))
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(endpoint: str) -> LatencyHistogram:
+    h = _histograms.get(endpoint)
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault(endpoint, LatencyHistogram())
+    return h
+
+
+def latency_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-endpoint latency percentiles (for /health)."""
+    return {k: h.stats() for k, h in list(_histograms.items())}
+
+
+def hedge_delay(endpoint: str, percentile: float, default_ms: float, min_samples: int = 20) -> float:
+    """Hedge delay in seconds: the endpoint's latency percentile once enough samples exist."""
+    h = histogram(endpoint)
+    ms = h.percentile(percentile) if h.count >= min_samples else None
+    return (ms if ms is not None else default_ms) / 1000.0
+
+
+# Calls run here so an abandoned (slower) call does not hold up the caller's thread.
+# Created on first hedged call (keeps concurrent.futures out of the cold start).
+_executor: Optional["ThreadPoolExecutor"] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> "ThreadPoolExecutor":
+    global _executor
+    if _executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "16")), thread_name_prefix="llm-hedge")
+    return _executor
+
+
+def timed(endpoint: str, fn: Callable[[], str]) -> Callable[[], str]:
+    """Wrap a call so successful latencies feed the endpoint histogram (also for losing calls)."""
+
+    def run() -> str:
+        start = time.monotonic()
+        out = fn()
+        histogram(endpoint).record((time.monotonic() - start) * 1000.0)
+        return out
+
+    return run
+
+
+def hedged_call(
+    primary: Callable[[], str],
+    alternate: Callable[[], str],
+    delay_s: float,
+    accept: Callable[[str], bool],
+) -> str:
+    """
+    Run primary; start alternate after delay_s, or immediately if primary fails or
+    returns an unacceptable response. Returns the first accepted response and cancels
+    the other call if it has not started (boto3 calls in flight cannot be aborted; their
+    result is dropped). If neither is accepted, returns the first response received,
+    or re-raises the last error.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    executor = _get_executor()
+    pending: Set["Future"] = {executor.submit(primary)}
+    hedged = False
+    first_raw: Optional[str] = None
+    last_error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, timeout=None if hedged else delay_s, return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                raw = f.result()
+            except Exception as e:
+                last_error = e
+                continue
+            if accept(raw):
+                for p in pending:
+                    p.cancel()
+                return raw
+            if first_raw is None:
+                first_raw = raw
+        if not hedged:
+            hedged = True
+            pending.add(executor.submit(alternate))
+    if first_raw is not None:
+        return first_raw
+    assert last_error is not None
+    raise last_error
@@ -0,0 +1,345 @@
+"""Rule-based intent matcher (fast path before the LLM).
+
+Common questions ("list AWS accounts for Finance", "EC2 count by region",
+"按区域统计EC2数量") are parsed with a keyword trie over resource/column
+synonyms (columns come from the schema registry) plus a few value regexes.
+The confidence halves for every word the grammar did not understand; only
+high-confidence matches skip Bedrock, everything else falls through. A bare
+"for <Word>" is only trusted as a department when the entity index knows it.
+Questions with a negation or an "or" are never matched: the spec grammar
+here has no != / OR, and dropping the word would invert the question.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.shared.schema_registry import get_registry
+
+from .entity_index import get_entity_index
+
+# Meaning of a phrase: (kind, value).
+# Kinds: resource, column, count, list, group, group_suffix, chart, stop, negation, disjunction
+Meaning = Tuple[str, Optional[str]]
+
+RESOURCE_SYNONYMS: Dict[str, List[str]] = {
+    "aws_account": ["aws account", "account", "aws 账号", "aws账号", "aws 账户", "aws账户", "账号", "账户"],
+    "rds_instance": ["rds", "rds instance", "database", "db instance", "数据库", "rds 实例", "rds实例"],
+    "ec2_instance": ["ec2", "ec2 instance", "vm", "virtual machine", "server", "虚拟机", "服务器", "ec2 实例", "ec2实例"],
+    "ecs_cluster": ["ecs", "ecs cluster", "cluster", "集群", "ecs 集群", "ecs集群"],
+    "gcp_project": ["gcp", "gcp project", "project", "gcp 项目", "gcp项目", "项目"],
+    "azure_subscription": ["azure", "azure subscription", "subscription", "订阅", "azure 订阅", "azure订阅"],
+}
+
+# Extra names per column (the column name and its spaced form are always included)
+COLUMN_SYNONYMS: Dict[str, List[str]] = {
+    "region": ["区域", "地区", "地域"],
+    "owner": ["负责人", "所有者"],
+    "department": ["dept", "部门"],
+    "engine": ["引擎", "数据库引擎"],
+    "version": ["版本"],
+    "instance_type": ["type", "类型", "实例类型"],
+    "status": ["状态"],
+    "account_id": ["account", "账号", "账户"],
+    "tier": ["层级"],
+    "size": ["规格"],
+    "name": ["名称", "名字"],
+}
+
+KEYWORDS: Dict[str, List[str]] = {
+    "count": ["how many", "count", "number of", "total", "多少", "多少个", "数量", "几个", "总数", "统计", "计数"],
+    "list": ["list", "show", "display", "get", "find", "列出", "显示", "查询", "查看", "列表", "给我"],
+    "group": ["by", "per", "group by", "grouped by", "for each", "each", "按", "按照", "每个", "各", "各个"],
+    "group_suffix": ["分布"],
+    "negation": [
+        "not", "no", "non", "none", "never", "except", "excluding", "exclude", "without", "other than",
+        "outside", "besides", "isn't", "aren't", "don't", "doesn't", "不", "非", "除了", "除", "没有", "无",
+    ],
+    "disjunction": ["or", "either", "nor", "或", "或者", "还是"],
+    "stop": [
+        "the", "all", "of", "me", "please", "what", "are", "is", "there", "we", "our", "have", "do", "a", "an",
+        "in", "with", "and", "which", "as", "aws", "cloud", "instance", "instances", "in total",
+        "所有", "全部", "的", "有", "我们", "请", "一下", "个", "哪些", "都", "是", "里", "中", "在", "实例",
+    ],
+}
+
+CHARTS: Dict[str, List[str]] = {
+    "pie": ["pie", "pie chart", "饼图"],
+    "bar": ["bar", "bar chart", "柱状图", "条形图"],
+    "pivot": ["pivot", "pivot table", "透视表"],
+}
+
+# Weights of a matched value; the confidence is scaled by the lowest one used
+FREE_TEXT = 0.9  # explicit free text ("owned by x", "x department")
+GUESS = 0.5  # could be anything ("for Alice", "for March"): below INTENT_MIN_CONFIDENCE unless confirmed
+
+# Filter values recognised by pattern: (column, regex, weight). Earlier patterns win overlapping text.
+VALUE_PATTERNS: List[Tuple[str, "re.Pattern[str]", float]] = [
+    ("region", re.compile(r"\b[a-z]{2}(?:-gov)?-[a-z]+-\d\b", re.I), 1.0),
+    (
+        "engine",
+        re.compile(r"\b(postgres(?:ql)?|mysql|mariadb|aurora(?:-postgresql|-mysql)?|oracle(?:-[a-z0-9]+)?|sqlserver(?:-[a-z]+)?)\b", re.I),
+        1.0,
+    ),
+    ("owner", re.compile(r"\bowned by\s+([\w.@-]+)", re.I), FREE_TEXT),
+    (
+        "department",
+        re.compile(r"\b(?:for\s+(?:the\s+)?)?(?!(?:by|per|each|every|all|the|of|in|for|which|what)\b)([A-Za-z][\w&-]*)\s+(?:department|dept)s?\b", re.I),
+        FREE_TEXT,
+    ),
+    ("department", re.compile(r"\bfor\s+(?:the\s+)?([A-Z][\w&-]*)"), GUESS),
+]
+
+# RDS engine values (the engine column) and the names people use for them; a family becomes IN
+RDS_ENGINES = frozenset([
+    "postgres", "mysql", "mariadb", "aurora", "aurora-mysql", "aurora-postgresql",
+    "oracle-ee", "oracle-ee-cdb", "oracle-se2", "oracle-se2-cdb",
+    "sqlserver-ee", "sqlserver-se", "sqlserver-ex", "sqlserver-web",
+])
+ENGINE_ALIASES: Dict[str, List[str]] = {
+    "postgresql": ["postgres"],
+    "aurora": ["aurora", "aurora-mysql", "aurora-postgresql"],
+    "oracle": ["oracle-ee", "oracle-ee-cdb", "oracle-se2", "oracle-se2-cdb"],
+    "sqlserver": ["sqlserver-ee", "sqlserver-se", "sqlserver-ex", "sqlserver-web"],
+}
+
+_PUNCT_RE = re.compile(r"[，。！？；：、“”‘’（）【】《》「」…,;:!?\"()\[\]<>]")
+_QUOTE_RE = re.compile(r"(?<![A-Za-z])'|'(?![A-Za-z])")  # quotes, not apostrophes (isn't)
+_WORD_RE = re.compile(r"[A-Za-z0-9_.@&'-]+|[^\sA-Za-z0-9_.@&'-]")
+_ASCII_WORD = re.compile(r"[a-z0-9_]")
+_END = "\0"
+
+
+@dataclass
+class IntentMatch:
+    spec: Dict[str, Any]  # QuerySpec dict, to be checked by validate_and_build_spec
+    confidence: float
+
+
+class _Trie:
+    """Character trie for longest-phrase matching (works for spaced EN and unspaced CN text)."""
+
+    def __init__(self) -> None:
+        self.root: Dict[str, Any] = {}
+
+    def add(self, phrase: str, meaning: Meaning) -> None:
+        node = self.root
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        meanings = node.setdefault(_END, [])
+        if meaning not in meanings:
+            meanings.append(meaning)
+
+    def longest(self, text: str, start: int) -> Optional[Tuple[int, List[Meaning]]]:
+        node, best = self.root, None
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if _END in node and _bounded(text, start, i + 1):
+                best = (i + 1, node[_END])
+        return best
+
+
+def _bounded(text: str, start: int, end: int) -> bool:
+    """ASCII phrases must sit on word boundaries; CJK phrases need not."""
+    if _ASCII_WORD.match(text[start]) and start > 0 and _ASCII_WORD.match(text[start - 1]):
+        return False
+    if _ASCII_WORD.match(text[end - 1]) and end < len(text) and _ASCII_WORD.match(text[end]):
+        return False
+    return True
+
+
+def _build_trie() -> _Trie:
+    trie = _Trie()
+
+    def add_en(phrase: str, meaning: Meaning) -> None:
+        trie.add(phrase, meaning)
+        if phrase[-1].isascii() and phrase[-1].isalpha():
+            trie.add(phrase + "s", meaning)
+            trie.add(phrase + "es", meaning)
+
+    for resource, phrases in RESOURCE_SYNONYMS.items():
+        for p in [resource.replace("_", " "), *phrases]:
+            add_en(p, ("resource", resource))
+    columns = {c for name in get_registry().resource_names for c in get_registry().resource(name).columns}
+    for col in columns:
+        for p in {col, col.replace("_", " "), *COLUMN_SYNONYMS.get(col, [])}:
+            add_en(p, ("column", col))
+    for kind, phrases in KEYWORDS.items():
+        for p in phrases:
+            trie.add(p, (kind, None))
+    for chart, phrases in CHARTS.items():
+        for p in phrases:
+            trie.add(p, ("chart", chart))
+    return trie
+
+
+_TRIE = _build_trie()
+
+
+def match_intent(question: str) -> Optional[IntentMatch]:
+    """Parse a question into a QuerySpec dict with a confidence in [0, 1]; None if no resource is recognised."""
+    text = _clean(question).strip()
+    if not text:
+        return None
+    lower = text.lower()
+    consumed = [False] * len(text)
+
+    values: List[Tuple[int, int, str, str, float]] = []
+    for col, pattern, weight in VALUE_PATTERNS:
+        for m in pattern.finditer(text):
+            if any(consumed[m.start():m.end()]):
+                continue
+            values.append((m.start(), m.end(), col, m.group(m.lastindex or 0), weight))
+            consumed[m.start():m.end()] = [True] * (m.end() - m.start())
+
+    tokens: List[Tuple[int, List[Meaning]]] = []
+    i = 0
+    while i < len(text):
+        if consumed[i] or text[i].isspace():
+            i += 1
+            continue
+        hit = _TRIE.longest(lower, i)
+        if hit is None:
+            i += 1
+            continue
+        end, meanings = hit
+        tokens.append((i, meanings))
+        consumed[i:end] = [True] * (end - i)
+        i = end
+
+    if any(k in ("negation", "disjunction") for _, meanings in tokens for k, _ in meanings):
+        return None
+    resource = _resolve_resource(tokens)
+    if resource is None:
+        return None
+    schema = get_registry().resource(resource)
+    # Start of the text after each value: a column word there names the value's column ("postgres engine")
+    after_value = {len(text) - len(text[end:].lstrip()): col for _, end, col, _, _ in values if col in schema.columns}
+
+    group_by: List[str] = []
+    columns: List[str] = []
+    counting, chart, unresolved = False, None, 0
+    prev_kind: Optional[str] = None
+    for start, meanings in tokens:
+        kinds = {k for k, _ in meanings}
+        col = next((v for k, v in meanings if k == "column" and v in schema.columns), None)
+        if col and prev_kind != "group" and after_value.get(start) == col:
+            prev_kind = "column"
+            continue
+        if prev_kind == "group" and col:
+            group_by.append(col)
+            prev_kind = "column"
+            continue
+        if "resource" in kinds and any(v == resource for k, v in meanings if k == "resource"):
+            prev_kind = "resource"
+            continue
+        if col:
+            columns.append(col)
+            prev_kind = "column"
+            continue
+        if "group_suffix" in kinds and prev_kind == "column" and columns:
+            group_by.append(columns.pop())
+        elif "count" in kinds:
+            counting = True
+        elif "chart" in kinds:
+            chart = next(v for k, v in meanings if k == "chart")
+        elif not kinds & {"list", "group", "group_suffix", "stop"}:
+            unresolved += 1
+        prev_kind = next(iter(kinds)) if len(kinds) == 1 else None
+
+    # Several values for one column ("in us-east-1 and us-west-2") mean any of them
+    by_column: Dict[str, List[str]] = {}
+    value_weight = 1.0
+    for _, _, col, v, weight in sorted(values):
+        if col in schema.columns:
+            vs, weight = _canonical(resource, col, v, weight)
+            by_column.setdefault(col, []).extend(vs)
+            value_weight = min(value_weight, weight)
+    filters = [
+        {"field": col, "op": "=", "value": vs[0]} if len(vs) == 1 else {"field": col, "op": "in", "value": vs}
+        for col, vs in ((c, _dedupe(v)) for c, v in by_column.items())
+    ]
+    # Values for columns this resource does not have are not understood
+    for start, end, col, _, _ in values:
+        if col not in schema.columns:
+            consumed[start:end] = [False] * (end - start)
+
+    spec: Dict[str, Any] = {"resource": resource, "filters": filters, "limit": 100}
+    if counting or group_by:
+        # Aggregating: every plain column mentioned is a group key
+        group_by = _dedupe(group_by + columns)
+        spec["select"] = list(group_by)
+        spec["aggregates"] = [{"func": "count", "alias": "count"}]
+        if group_by:
+            spec["group_by"] = group_by
+            spec["order_by"] = ["count desc"]
+    else:
+        spec["select"] = _dedupe(columns)
+    spec["output_format"] = chart or "table"
+
+    # Every word (or CJK character) not fully understood halves the confidence
+    unknown = sum(1 for m in _WORD_RE.finditer(text) if not all(consumed[m.start():m.end()]))
+    confidence = value_weight * (0.5 ** (unresolved + unknown))
+    return IntentMatch(spec=spec, confidence=round(confidence, 4))
+
+
+def _canonical(resource: str, col: str, value: str, weight: float) -> Tuple[List[str], float]:
+    """Column values for a matched value and its weight: engine names mapped, guesses confirmed by the entity index."""
+    if col == "engine":
+        v = value.lower()
+        if v in ENGINE_ALIASES:
+            return ENGINE_ALIASES[v], weight
+        return [v], weight if v in RDS_ENGINES else GUESS
+    if weight < FREE_TEXT:
+        index = get_entity_index()
+        if index is not None and index.contains(resource, col, value):
+            return [value], FREE_TEXT
+    return [value], weight
+
+
+def mentioned_resources(question: str) -> List[str]:
+    """Every resource a question names (synonyms included), in order of appearance."""
+    return _mentioned(question, "resource")
+
+
+def mentioned_columns(question: str) -> List[str]:
+    """Every column a question names (synonyms included, of any resource), in order of appearance."""
+    return _mentioned(question, "column")
+
+
+def _mentioned(question: str, kind: str) -> List[str]:
+    text = _clean(question).lower()
+    found: List[str] = []
+    i = 0
+    while i < len(text):
+        hit = _TRIE.longest(text, i)
+        if hit is None:
+            i += 1
+            continue
+        end, meanings = hit
+        found += [v for k, v in meanings if k == kind]
+        i = end
+    return _dedupe(found)
+
+
+def _clean(question: str) -> str:
+    return _QUOTE_RE.sub(" ", _PUNCT_RE.sub(" ", unicodedata.normalize("NFKC", question)))
+
+
+def _resolve_resource(tokens: List[Tuple[int, List[Meaning]]]) -> Optional[str]:
+    """The single resource named in the question. Words that are also columns count only outside 'by X'."""
+    found: List[str] = []
+    prev_group = False
+    for _, meanings in tokens:
+        kinds = {k for k, _ in meanings}
+        if not (prev_group and "column" in kinds):
+            found += [v for k, v in meanings if k == "resource"]
+        prev_group = "group" in kinds
+    distinct = _dedupe(found)
+    return distinct[0] if len(distinct) == 1 else None
+
+
+def _dedupe(items: List[str]) -> List[str]:
+    return list(dict.fromkeys(items))
@@ -0,0 +1,104 @@
+"""Incremental JSON object scanner for streamed LLM output.
+
+Fed text deltas as they arrive, it tracks string/escape state and brace depth
+so the caller knows the moment the top-level object is complete (and can stop
+generation), and rejects output that cannot become a Query Spec as early as
+possible: anything other than an object (optionally in a ```json fence), or a
+"resource" that is not allowed.
+"""
+import json
+import re
+from typing import Any, Collection, Dict, Optional
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*", re.I)
+_RESOURCE_KEY = '"resource"'
+_RESOURCE_RE = re.compile(r'\{\s*"resource"\s*:\s*"([^"\\]*)"')
+
+
+class LlmOutputError(ValueError):
+    """LLM output can no longer become a valid Query Spec / decision object."""
+
+
+class JsonObjectScanner:
+    def __init__(self, allowed_resources: Optional[Collection[str]] = None, max_chars: int = 16000):
+        self.allowed_resources = allowed_resources
+        self.max_chars = max_chars
+        self._buf = ""
+        self._start: Optional[int] = None  # offset of the opening brace
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._resource_checked = False
+        self.result: Optional[Dict[str, Any]] = None
+        self.text = ""
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a delta. True once a complete object has been parsed (see .result / .text)."""
+        if self.result is not None:
+            return True
+        offset = len(self._buf)
+        self._buf += chunk
+        if len(self._buf) > self.max_chars:
+            raise LlmOutputError("LLM output too long without a complete JSON object")
+        for i, ch in enumerate(chunk, offset):
+            if self._start is None:
+                if ch == "{":
+                    self._start, self._depth = i, 1
+                    continue
+                if not self._prefix_ok(self._buf[: i + 1]):
+                    raise LlmOutputError("LLM output is not a JSON object")
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._finish(self._buf[self._start : i + 1])
+        if self._start is not None and not self._resource_checked:
+            self._check_resource(self._buf[self._start :])
+        return False
+
+    def _prefix_ok(self, prefix: str) -> bool:
+        """Text before the object may only be whitespace or (part of) a code fence."""
+        rest = prefix.lstrip()
+        if not rest or "```json".startswith(rest.lower()):
+            return True
+        m = _FENCE_RE.match(rest)
+        return bool(m) and not rest[m.end():].strip()
+
+    def _check_resource(self, text: str) -> None:
+        if self.allowed_resources is None:
+            self._resource_checked = True
+            return
+        body = text[1:].lstrip()
+        if not body:
+            return
+        if not (_RESOURCE_KEY.startswith(body) or body.startswith(_RESOURCE_KEY)):
+            # First key is something else (e.g. "decision"); nothing to check early
+            self._resource_checked = True
+            return
+        m = _RESOURCE_RE.match(text)
+        if m:
+            self._resource_checked = True
+            if m.group(1) not in self.allowed_resources:
+                raise LlmOutputError(f"Invalid resource: {m.group(1)}")
+
+    def _finish(self, text: str) -> bool:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise LlmOutputError(f"Invalid JSON from LLM: {e}") from e
+        if not isinstance(data, dict):
+            raise LlmOutputError("LLM output is not a JSON object")
+        self.text, self.result = text, data
+        return True
@@ -1,13 +1,21 @@
 """LLM client - supports dual API selection by config (Bedrock / Bedrock-alt / Mock)."""
 import json
+import logging
 import os
+import re
 from typing import Any, Optional
 
-from src.orchestrator.prompts import SYSTEM_PROMPT, user_prompt
-from src.shared.config import LlmConfig, LlmProvider
+from src.orchestrator.prompts import PromptParts, build_prompt
+from src.shared.aws_clients import get_client
+from src.shared.config import FastPathConfig, LlmConfig, LlmProvider
 from src.shared.models import ClarificationRequest, QueryDecision, QuerySpec
+from src.shared.tracing import span
 
-from .query_spec import parse_llm_json, validate_and_build_spec
+from .hedge import hedge_delay, hedged_call, timed
+from .intent_matcher import match_intent
+from .json_stream import JsonObjectScanner, LlmOutputError
+from .query_spec import ALLOWED_RESOURCES, parse_llm_json, spec_to_dict, validate_and_build_spec
+from .spec_cache import get_spec_cache
 
 
 def _mock_llm(question: str) -> str:
@@ -23,14 +31,16 @@ def _mock_llm(question: str) -> str:
     if "rds" in q or "postgres" in q:
         return json.dumps({
             "resource": "rds_instance",
-            "select": ["engine", "version", "count"],
+            "select": ["engine", "version"],
+            "aggregates": [{"func": "count", "alias": "count"}],
             "group_by": ["engine", "version"],
             "limit": 100,
         })
     if "ec2" in q and "region" in q:
         return json.dumps({
             "resource": "ec2_instance",
-            "select": ["region", "count"],
+            "select": ["region"],
+            "aggregates": [{"func": "count", "alias": "count"}],
             "group_by": ["region"],
             "output_format": "bar",
             "limit": 50,
@@ -38,56 +48,292 @@ def _mock_llm(question: str) -> str:
     return json.dumps({"decision": "unsupported", "message": "Demo: try AWS accounts, RDS, or EC2 by region."})
 
 
-def _invoke_bedrock_one(region: str, model_id: str, prompt: str) -> str:
-    """Call a single Bedrock endpoint."""
-    import boto3
-    client = boto3.client("bedrock-runtime", region_name=region)
-    body = {
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+# Claude models with Bedrock prompt caching (cache_control on system blocks)
+_PROMPT_CACHE_MODELS = re.compile(r"claude-(3-5-haiku|3-7-sonnet|sonnet-4|opus-4|haiku-4)")
+# Shortest prefix Bedrock caches (tokens); a shorter checkpoint is ignored
+_PROMPT_CACHE_MIN_TOKENS = 1024
+_PROMPT_CACHE_MIN_TOKENS_HAIKU = 2048
+
+
+def _request_body(prompt: PromptParts, cache: bool) -> dict:
+    system: dict = {"type": "text", "text": prompt.system}
+    if cache:
+        system["cache_control"] = {"type": "ephemeral"}
+    return {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": 1024,
-        "messages": [{"role": "user", "content": prompt}],
+        "system": [system],
+        "messages": [{"role": "user", "content": prompt.user}],
         "temperature": 0.2,
     }
+
+
+def _prompt_cache_enabled(setting: str, model_id: str, system: str) -> bool:
+    """auto: only for models with prompt caching, and only when the system prompt reaches their minimum prefix."""
+    if setting in ("1", "on", "true"):
+        return True
+    if setting in ("0", "off", "false"):
+        return False
+    if not _PROMPT_CACHE_MODELS.search(model_id):
+        return False
+    minimum = _PROMPT_CACHE_MIN_TOKENS_HAIKU if "haiku" in model_id else _PROMPT_CACHE_MIN_TOKENS
+    return len(system) // 4 >= minimum  # ~4 characters per token: a lower bound for this JSON-heavy text
+
+
+def _log_usage(model_id: str, prompt: PromptParts, usage: dict, streamed: bool) -> None:
+    """One structured log line per LLM call, to measure prompt size and cache savings."""
+    logger.info(json.dumps({
+        "event": "llm_usage",
+        "model_id": model_id,
+        "streamed": streamed,
+        "prompt_chars": len(prompt.system) + len(prompt.user),
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        "cache_read_input_tokens": usage.get("cache_read_input_tokens"),
+        "cache_creation_input_tokens": usage.get("cache_creation_input_tokens"),
+    }))
+
+
+def _invoke_bedrock_one(region: str, model_id: str, prompt: PromptParts, cache: bool = False) -> str:
+    """Call a single Bedrock endpoint (shared client, reused connections)."""
+    client = get_client("bedrock-runtime", region)
     response = client.invoke_model(
         modelId=model_id,
         contentType="application/json",
         accept="application/json",
-        body=json.dumps(body),
+        body=json.dumps(_request_body(prompt, cache)),
     )
     out = json.loads(response["body"].read())
+    _log_usage(model_id, prompt, out.get("usage") or {}, streamed=False)
     return out.get("content", [{}])[0].get("text", "")
 
 
+def _invoke_bedrock_stream(region: str, model_id: str, prompt: PromptParts, cache: bool = False) -> str:
+    """
+    Call a single Bedrock endpoint with a response stream. Text deltas are fed to an
+    incremental JSON scanner; the stream is closed (ending generation) as soon as one
+    complete object has arrived, and LlmOutputError is raised as soon as the output
+    cannot become a valid spec.
+    """
+    client = get_client("bedrock-runtime", region)
+    response = client.invoke_model_with_response_stream(
+        modelId=model_id,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(_request_body(prompt, cache)),
+    )
+    stream = response["body"]
+    scanner = JsonObjectScanner(ALLOWED_RESOURCES)
+    usage: dict = {}
+    try:
+        for event in stream:
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            data = json.loads(chunk["bytes"])
+            kind = data.get("type")
+            if kind == "message_start":
+                usage.update((data.get("message") or {}).get("usage") or {})
+            elif kind == "message_delta":
+                usage.update(data.get("usage") or {})
+            elif kind == "content_block_delta" and scanner.feed(data.get("delta", {}).get("text", "")):
+                return scanner.text
+    finally:
+        stream.close()
+        # On early stop output_tokens is the count reported at message start
+        _log_usage(model_id, prompt, usage, streamed=True)
+    raise LlmOutputError("LLM stream ended without a complete JSON object")
+
+
 def invoke_llm(question: str, config: Optional[LlmConfig] = None) -> str:
     """
     Invoke LLM and return raw response. Selects one of two API calls by LLM_PROVIDER:
     - bedrock: primary Bedrock (BEDROCK_MODEL_ID)
     - bedrock_alt: alternative Bedrock (BEDROCK_ALT_MODEL_ID)
     - mock: no real API (for demo)
+    With LLM_HEDGE=1 the other endpoint is called too when the selected one is slow.
+    Endpoint errors propagate (no silent fallback to demo data).
     """
     cfg = config or LlmConfig.from_env()
-    if cfg.provider == LlmProvider.MOCK or os.getenv("USE_MOCK_LLM", "0") == "1":
+    if _use_mock(cfg):
         return _mock_llm(question)
+    return _invoke(cfg, _build_prompt(question))
 
-    prompt = f"{SYSTEM_PROMPT}\n\n{user_prompt(question)}"
-    try:
-        if cfg.provider == LlmProvider.BEDROCK_ALT and cfg.alt_model_id:
-            return _invoke_bedrock_one(cfg.alt_region or cfg.region, cfg.alt_model_id, prompt)
-        return _invoke_bedrock_one(cfg.region, cfg.model_id, prompt)
-    except Exception:
+
+async def invoke_llm_async(question: str, config: Optional[LlmConfig] = None) -> str:
+    """
+    Async variant of invoke_llm. boto3 has no native asyncio API, so the blocking
+    Bedrock call runs on the event loop's executor (the GIL is released during network I/O).
+    """
+    cfg = config or LlmConfig.from_env()
+    if _use_mock(cfg):
         return _mock_llm(question)
+    import asyncio  # deferred: the Lambda path is synchronous
+
+    prompt = _build_prompt(question)
+    return await asyncio.get_running_loop().run_in_executor(None, _invoke, cfg, prompt)
+
+
+def _build_prompt(question: str) -> PromptParts:
+    with span("prompt") as s:
+        prompt = build_prompt(question)
+        s.set(prompt_chars=len(prompt.system) + len(prompt.user))
+    return prompt
+
+
+def _invoke(cfg: LlmConfig, prompt: PromptParts) -> str:
+    primary = _endpoint(cfg)
+    alternate = _alternate_endpoint(cfg)
+    invoke_one = _invoke_bedrock_stream if cfg.stream else _invoke_bedrock_one
+
+    def call_endpoint(endpoint: tuple[str, str]) -> str:
+        return invoke_one(*endpoint, prompt, _prompt_cache_enabled(cfg.prompt_cache, endpoint[1], prompt.system))
+
+    call = timed(_endpoint_key(primary), lambda: call_endpoint(primary))
+    if not cfg.hedge or alternate is None or alternate == primary:
+        return call()
+    delay = (
+        cfg.hedge_delay_ms / 1000.0
+        if cfg.hedge_delay_ms is not None
+        else hedge_delay(_endpoint_key(primary), cfg.hedge_percentile, cfg.hedge_default_delay_ms)
+    )
+    return hedged_call(
+        call,
+        timed(_endpoint_key(alternate), lambda: call_endpoint(alternate)),
+        delay,
+        accept=_is_usable,
+    )
+
+
+def _use_mock(cfg: LlmConfig) -> bool:
+    return cfg.provider == LlmProvider.MOCK or os.getenv("USE_MOCK_LLM", "0") == "1"
+
+
+def _endpoint(cfg: LlmConfig) -> tuple[str, str]:
+    """(region, model_id) for the configured provider."""
+    if cfg.provider == LlmProvider.BEDROCK_ALT and cfg.alt_model_id:
+        return cfg.alt_region or cfg.region, cfg.alt_model_id
+    return cfg.region, cfg.model_id
+
+
+def _alternate_endpoint(cfg: LlmConfig) -> Optional[tuple[str, str]]:
+    """The endpoint not selected by LLM_PROVIDER (hedge target), if configured."""
+    if not cfg.alt_model_id:
+        return None
+    if cfg.provider == LlmProvider.BEDROCK_ALT:
+        return cfg.region, cfg.model_id
+    return cfg.alt_region or cfg.region, cfg.alt_model_id
+
+
+def _endpoint_key(endpoint: tuple[str, str]) -> str:
+    return f"{endpoint[0]}/{endpoint[1]}"
+
+
+def _is_usable(raw: str) -> bool:
+    """A response wins the hedge only if it is a valid decision or a spec that validates."""
+    data = parse_llm_json(raw)
+    if data is None:
+        return False
+    if (data.get("decision") or "").lower() in ("clarify", "unsupported"):
+        return True
+    return validate_and_build_spec(data)[1] is None
 
 
 def llm_to_spec(question: str, config: Optional[LlmConfig] = None) -> tuple[QueryDecision, Optional[QuerySpec], Optional[ClarificationRequest], Optional[str]]:
     """
     Call LLM and parse output into QuerySpec or clarification.
+    High-confidence rule matches skip the LLM (see intent_matcher).
+    Validated results are cached by normalized question (see spec_cache).
     Returns (decision, query_spec, clarification, raw_llm_output).
     """
-    try:
-        raw = invoke_llm(question, config)
-    except Exception as e:
-        return QueryDecision.UNSUPPORTED, None, None, str(e)
+    fast = _fast_path(question)
+    if fast:
+        return fast
+    cfg = config or LlmConfig.from_env()
+    hit = _cache_lookup(question, cfg)
+    if hit:
+        return hit
+
+    with span("llm", provider=cfg.provider.value) as s:
+        try:
+            raw = invoke_llm(question, cfg)
+        except Exception as e:
+            s.set(error=type(e).__name__)
+            return _llm_error(e)
+        s.set(output_chars=len(raw))
+    return _decide_and_cache(question, cfg, raw)
+
+
+async def llm_to_spec_async(question: str, config: Optional[LlmConfig] = None) -> tuple[QueryDecision, Optional[QuerySpec], Optional[ClarificationRequest], Optional[str]]:
+    """Async variant of llm_to_spec."""
+    fast = _fast_path(question)
+    if fast:
+        return fast
+    cfg = config or LlmConfig.from_env()
+    hit = _cache_lookup(question, cfg)
+    if hit:
+        return hit
+
+    with span("llm", provider=cfg.provider.value) as s:
+        try:
+            raw = await invoke_llm_async(question, cfg)
+        except Exception as e:
+            s.set(error=type(e).__name__)
+            return _llm_error(e)
+        s.set(output_chars=len(raw))
+    return _decide_and_cache(question, cfg, raw)
+
+
+def _llm_error(e: Exception):
+    """A failed LLM call (e.g. Bedrock outage) is an error response, not an unsupported question."""
+    return QueryDecision.ERROR, None, ClarificationRequest(message=f"LLM call failed: {e}"), str(e)
+
+
+def _fast_path(question: str):
+    """Executable decision from the intent matcher, or None to fall through to the LLM."""
+    cfg = FastPathConfig.from_env()
+    if not cfg.enabled:
+        return None
+    with span("fast_path") as s:
+        match = match_intent(question)
+        if match is None or match.confidence < cfg.min_confidence:
+            s.set(hit=False)
+            return None
+        spec, err = validate_and_build_spec(match.spec)
+        s.set(hit=err is None)
+    if err:
+        return None
+    return QueryDecision.EXECUTABLE, spec, None, None
 
+
+def _cache_lookup(question: str, cfg: LlmConfig):
+    cache = get_spec_cache()
+    if not cache:
+        return None
+    with span("spec_cache") as s:
+        cached = cache.get(question, _cache_namespace(cfg))
+        hit = _from_cache_entry(cached) if cached else None
+        s.set(hit=hit is not None)
+    return hit
+
+
+def _decide_and_cache(question: str, cfg: LlmConfig, raw: str):
+    with span("parse") as s:
+        decision, spec, clarification, raw = _decide(raw)
+        s.set(decision=decision.value)
+    cache = get_spec_cache()
+    if cache:
+        entry = _to_cache_entry(decision, spec, clarification)
+        if entry:
+            cache.put(question, entry, _cache_namespace(cfg))
+    return decision, spec, clarification, raw
+
+
+def _decide(raw: str) -> tuple[QueryDecision, Optional[QuerySpec], Optional[ClarificationRequest], Optional[str]]:
+    """Parse raw LLM output into a decision."""
     data = parse_llm_json(raw)
     if data is None:
         return QueryDecision.UNSUPPORTED, None, None, raw
@@ -115,3 +361,53 @@ def llm_to_spec(question: str, config: Optional[LlmConfig] = None) -> tuple[Quer
     if err:
         return QueryDecision.UNSUPPORTED, None, ClarificationRequest(message=err), raw
     return QueryDecision.EXECUTABLE, spec, None, raw
+
+
+def _cache_namespace(cfg: LlmConfig) -> str:
+    """Separate cache entries per provider/model so switching models never serves stale specs."""
+    if cfg.provider == LlmProvider.BEDROCK_ALT and cfg.alt_model_id:
+        return f"{cfg.provider.value}:{cfg.alt_model_id}"
+    return f"{cfg.provider.value}:{cfg.model_id}"
+
+
+def _to_cache_entry(decision: QueryDecision, spec: Optional[QuerySpec], clarification: Optional[ClarificationRequest]) -> Optional[dict]:
+    """Only validated results are cached; unsupported/failed calls may be transient."""
+    if decision == QueryDecision.EXECUTABLE and spec:
+        return {"decision": decision.value, "spec": spec_to_dict(spec)}
+    if decision == QueryDecision.CLARIFY and clarification:
+        return {
+            "decision": decision.value,
+            "clarification": {"message": clarification.message, "suggestions": clarification.suggestions},
+        }
+    return None
+
+
+def _from_cache_entry(entry: dict) -> Optional[tuple[QueryDecision, Optional[QuerySpec], Optional[ClarificationRequest], Optional[str]]]:
+    if entry.get("decision") == QueryDecision.CLARIFY.value:
+        c = entry.get("clarification") or {}
+        return QueryDecision.CLARIFY, None, ClarificationRequest(c.get("message", ""), c.get("suggestions", [])), None
+    spec, err = validate_and_build_spec(entry.get("spec") or {})
+    if err:
+        return None
+    return QueryDecision.EXECUTABLE, spec, None, None
+
+
+def prewarm_clients(config: Optional[LlmConfig] = None) -> None:
+    """Build the Bedrock clients for the configured endpoints ahead of the first question."""
+    cfg = config or LlmConfig.from_env()
+    if _use_mock(cfg):
+        return
+    regions = {_endpoint(cfg)[0]}
+    alternate = _alternate_endpoint(cfg)
+    if cfg.hedge and alternate:
+        regions.add(alternate[0])
+    for region in regions:
+        get_client("bedrock-runtime", region)
+
+
+# Cold start: build clients during Lambda init (or API import) rather than on the first request
+if os.getenv("LLM_PROVIDER"):
+    try:
+        prewarm_clients()
+    except Exception:
+        pass
@@ -1,14 +1,80 @@
-"""System prompts for LLM. Supports English and Chinese queries."""
-QUERY_SPEC_SCHEMA = """
-{
-  "resource": "aws_account | rds_instance | ec2_instance | ecs_cluster | gcp_project | azure_subscription",
-  "filters": [{"field": "string", "op": "= | != | in | like | > | <", "value": "any"}],
+"""System prompts for LLM. Supports English and Chinese queries.
+
+The prompt has two parts: SYSTEM_PROMPT, a static prefix (rules, spec schema,
+every resource's columns from schema/resource_tables.json and worked examples)
+that is identical for every question and can be cached by Bedrock, and a short
+per-question user message: the question, plus a resource hint when the question
+unambiguously names one. Bedrock only caches a prefix above a per-model minimum
+(1024 tokens, 2048 for Haiku), so the stable text belongs in the system block.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+from src.shared.schema_registry import get_registry
+
+from .intent_matcher import mentioned_columns, mentioned_resources
+
+_RESOURCES = " | ".join(get_registry().resource_names_ordered)
+
+QUERY_SPEC_SCHEMA = f"""
+{{
+  "resource": "{_RESOURCES}",
+  "filters": [{{"field": "string", "op": "= | != | in | like | > | <", "value": "any"}}],
   "select": ["field1", "field2"],
+  "aggregates": [{{"func": "count | count_distinct | sum | avg | min | max", "field": "field (omit for count of rows)", "alias": "output_name"}}],
   "group_by": ["field1"],
   "order_by": ["field1"],
   "limit": 100,
-  "output_format": "table | pie | bar | pivot"
+  "output_format": "table | pie | bar | pivot",
+  "pivot": {{"rows": ["field1"], "columns": ["field2"], "value": "numeric_field", "agg": "sum | count | avg"}}
+}}
+"""
+
+# One "- resource: col, col" line per resource
+_COLUMN_LINES = {
+    name: f"- {name}: {', '.join(sorted(get_registry().resource(name).columns))}"
+    for name in get_registry().resource_names_ordered
 }
+
+EXAMPLES = """
+Q: list AWS accounts for the Finance department
+A: {"resource": "aws_account", "filters": [{"field": "department", "op": "=", "value": "Finance"}], "select": ["account_id", "account_name", "owner"], "limit": 100, "output_format": "table"}
+
+Q: 按区域统计EC2数量，用柱状图
+A: {"resource": "ec2_instance", "select": ["region"], "aggregates": [{"func": "count", "alias": "count"}], "group_by": ["region"], "order_by": ["count desc"], "output_format": "bar"}
+
+Q: How many RDS instances per engine? Show a pie chart
+A: {"resource": "rds_instance", "select": ["engine"], "aggregates": [{"func": "count", "alias": "count"}], "group_by": ["engine"], "order_by": ["count desc"], "output_format": "pie"}
+
+Q: rds postgres instances in us-east-1 that are not owned by alice
+A: {"resource": "rds_instance", "filters": [{"field": "engine", "op": "=", "value": "postgres"}, {"field": "region", "op": "=", "value": "us-east-1"}, {"field": "owner", "op": "!=", "value": "alice"}], "select": [], "limit": 100, "output_format": "table"}
+
+Q: owners with more than 5 EC2 instances
+A: {"resource": "ec2_instance", "select": ["owner"], "aggregates": [{"func": "count", "alias": "count"}], "group_by": ["owner"], "filters": [{"field": "count", "op": ">", "value": 5}], "order_by": ["count desc"], "output_format": "table"}
+
+Q: 每个部门有多少个AWS账号，做成透视表
+A: {"resource": "aws_account", "select": ["department"], "aggregates": [{"func": "count", "alias": "count"}], "group_by": ["department"], "output_format": "pivot"}
+
+Q: EC2 instance types by region as a pivot table
+A: {"resource": "ec2_instance", "select": ["region", "instance_type"], "aggregates": [{"func": "count", "alias": "count"}], "group_by": ["region", "instance_type"], "output_format": "pivot", "pivot": {"rows": ["region"], "columns": ["instance_type"], "agg": "sum", "value": "count"}}
+
+Q: total databases per Azure tier
+A: {"resource": "azure_subscription", "select": ["tier"], "aggregates": [{"func": "sum", "field": "db_count", "alias": "total_db_count"}], "group_by": ["tier"], "output_format": "bar"}
+
+Q: ECS clusters running more than 20 services
+A: {"resource": "ecs_cluster", "filters": [{"field": "services_count", "op": ">", "value": 20}], "select": ["cluster_name", "account_id", "services_count"], "order_by": ["services_count desc"], "limit": 100, "output_format": "table"}
+
+Q: how many distinct owners have GCP projects
+A: {"resource": "gcp_project", "aggregates": [{"func": "count_distinct", "field": "owner", "alias": "owners"}], "output_format": "table"}
+
+Q: top 10 GCP projects by resource count
+A: {"resource": "gcp_project", "select": ["project_name", "owner", "resource_count"], "order_by": ["resource_count desc"], "limit": 10, "output_format": "table"}
+
+Q: which servers were patched last week
+A: {"decision": "unsupported", "message": "Patch history is not in the inventory. I can list EC2 instances by type, region, account or owner."}
+
+Q: show me the big ones
+A: {"decision": "clarify", "message": "Which resources do you mean, and what makes one big?", "suggestions": ["RDS instances by size", "ECS clusters with the most services", "GCP projects with the most resources"]}
 """
 
 SYSTEM_PROMPT = f"""You are a query specifier for a cloud resource database. Given a user question in English or Chinese, output a JSON Query Spec that describes what data to fetch. You MUST NOT write SQL or touch the database.
@@ -16,18 +82,52 @@ SYSTEM_PROMPT = f"""You are a query specifier for a cloud resource database. Giv
 Rules:
 - Output ONLY valid JSON matching this schema. No markdown, no explanation outside the JSON.
 - User may ask in English or Chinese; interpret intent correctly.
-- resource: one of aws_account, rds_instance, ec2_instance, ecs_cluster, gcp_project, azure_subscription.
+- resource: one of the resources in the schema. Use only the columns listed for it under Columns.
 - filters: conditions to filter rows (e.g. department=Finance, region=us-east-1).
 - select: columns to return. Use empty [] for "all" or common columns.
-- group_by: for aggregations (e.g. count by owner).
+- aggregates: summaries computed by the database (e.g. {{"func": "count"}} for "how many", {{"func": "sum", "field": "db_count"}}). Never put "count" in select; use aggregates.
+- group_by: for aggregations (e.g. count by owner -> select ["owner"], aggregates [{{"func": "count"}}], group_by ["owner"]).
+- filters on an aggregate alias (e.g. {{"field": "count", "op": ">", "value": 5}}) filter the grouped result.
 - output_format: "table" for list/table, "pie" or "bar" for charts, "pivot" for pivot table.
+- pivot: only with output_format "pivot". rows/columns are the key fields, value is the field to aggregate (omit to count rows). Omit pivot to let the server choose.
 - If the question is ambiguous or needs clarification, output: {{"decision": "clarify", "message": "...", "suggestions": [...]}}.
 - If unsupported: {{"decision": "unsupported", "message": "..."}}.
 
 Schema:
 {QUERY_SPEC_SCHEMA}
-"""
+Columns:
+{chr(10).join(_COLUMN_LINES.values())}
+
+Examples:
+{EXAMPLES}"""
+
+
+@dataclass
+class PromptParts:
+    system: str  # static, cacheable prefix
+    user: str  # per-question suffix
+
+
+def likely_resources(question: str) -> List[str]:
+    """
+    The one resource the question names, when that is unambiguous: exactly one resource is
+    mentioned and every column word it uses belongs to it. Otherwise every resource, so the
+    model never loses the columns of a resource the matcher did not recognise.
+    """
+    named = mentioned_resources(question)
+    if len(named) == 1:
+        columns = get_registry().resource(named[0]).columns
+        if all(c in columns for c in mentioned_columns(question)):
+            return named
+    return list(get_registry().resource_names_ordered)
+
+
+def user_prompt(question: str, resources: Optional[List[str]] = None) -> str:
+    """User message: a hint when one resource is likely (columns are in SYSTEM_PROMPT), then the question."""
+    names = resources or likely_resources(question)
+    hint = f"Likely resource: {names[0]}\n\n" if len(names) == 1 else ""
+    return f"{hint}User question: {question}\n\nOutput the Query Spec JSON:"
 
 
-def user_prompt(question: str) -> str:
-    return f"User question: {question}\n\nOutput the Query Spec JSON:"
+def build_prompt(question: str) -> PromptParts:
+    return PromptParts(system=SYSTEM_PROMPT, user=user_prompt(question))
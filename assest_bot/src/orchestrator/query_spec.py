@@ -1,17 +1,20 @@
 """Query Spec model and validation.
 
-Extensible: add new resources in ALLOWED_RESOURCES and resource_tables.json.
+Extensible: add new resources in schema/resource_tables.json (loaded by the schema registry).
 """
 import json
 from typing import Any, List, Optional
 
-from src.shared.models import FilterSpec, QuerySpec
+from src.shared.models import AggregateSpec, FilterSpec, PivotSpec, QuerySpec
+from src.shared.schema_registry import get_registry
 
-# Extensible: add new resource types here and in schema/resource_tables.json
-ALLOWED_RESOURCES = frozenset(
-    ["aws_account", "rds_instance", "ec2_instance", "ecs_cluster", "gcp_project", "azure_subscription"]
-)
+from .entity_index import get_entity_index
+
+# Resources come from schema/resource_tables.json
+ALLOWED_RESOURCES = get_registry().resource_names
 ALLOWED_OPS = frozenset(["=", "!=", "in", "not in", "like", ">", "<", ">=", "<="])
+ALLOWED_AGGREGATES = frozenset(["count", "count_distinct", "sum", "avg", "min", "max"])
+ALLOWED_PIVOT_AGGS = frozenset(["sum", "count", "avg"])
 DEFAULT_SELECT_LIMIT = 100
 
 
@@ -56,6 +59,17 @@ def validate_and_build_spec(data: dict) -> tuple[Optional[QuerySpec], Optional[s
     else:
         select = []
 
+    aggregates, err = _parse_aggregates(data.get("aggregates"))
+    if err:
+        return None, err
+    group_by = data.get("group_by") or None
+    if group_by and not aggregates:
+        # LLMs often select a literal "count" column for "X by Y" questions; make it COUNT(*)
+        counts = [s for s in select if s.lower().replace(" ", "") in ("count", "count(*)")]
+        if counts:
+            aggregates = [AggregateSpec(func="count", field=None, alias="count")]
+            select = [s for s in select if s not in counts]
+
     limit = data.get("limit", DEFAULT_SELECT_LIMIT)
     try:
         limit = int(limit)
@@ -71,9 +85,105 @@ def validate_and_build_spec(data: dict) -> tuple[Optional[QuerySpec], Optional[s
         resource=resource,
         filters=filters,
         select=select,
-        group_by=data.get("group_by") or None,
+        aggregates=aggregates,
+        group_by=group_by,
         order_by=data.get("order_by") or None,
         limit=limit,
         output_format=output_format,
+        pivot=_parse_pivot(data.get("pivot")) if output_format == "pivot" else None,
     )
+    unknown = get_registry().unknown_columns(spec)
+    if unknown:
+        cols = sorted(get_registry().resource(resource).columns)
+        return None, f"Unknown columns for {resource}: {unknown}. Allowed: {cols}"
+    spec.filters = _resolve_entities(resource, spec.filters)
     return spec, None
+
+
+def _resolve_entities(resource: str, filters: List[FilterSpec]) -> List[FilterSpec]:
+    """
+    Snap = / in filter values on entity columns to real values (see entity_index).
+    A value with several equally close matches widens = to IN over them; unknown values are kept.
+    """
+    index = get_entity_index()
+    schema = get_registry().resource(resource)
+    if index is None or schema is None or not schema.entities:
+        return filters
+    out = []
+    for f in filters:
+        values = f.value if isinstance(f.value, list) else [f.value]
+        if f.field not in schema.entities or f.op not in ("=", "in") or not all(isinstance(v, str) for v in values):
+            out.append(f)
+            continue
+        resolved: List[str] = []
+        for v in values:
+            resolved += index.lookup(resource, f.field, v) or [v]
+        resolved = list(dict.fromkeys(resolved))
+        if resolved == values:
+            out.append(f)
+        elif len(resolved) == 1 and not isinstance(f.value, list):
+            out.append(FilterSpec(field=f.field, op="=", value=resolved[0]))
+        else:
+            out.append(FilterSpec(field=f.field, op="in", value=resolved))
+    return out
+
+
+def _parse_aggregates(raw: Any) -> tuple[List[AggregateSpec], Optional[str]]:
+    """Parse aggregates: [{"func": "count"}, {"func": "sum", "field": "x", "alias": "total_x"}]."""
+    if not raw:
+        return [], None
+    if not isinstance(raw, list):
+        return [], "aggregates must be a list"
+    out: List[AggregateSpec] = []
+    for a in raw:
+        if not isinstance(a, dict):
+            return [], "Each aggregate must be an object"
+        func = str(a.get("func") or "").lower().strip().replace(" ", "_")
+        if func not in ALLOWED_AGGREGATES:
+            return [], f"Invalid aggregate: {a.get('func')}. Allowed: {sorted(ALLOWED_AGGREGATES)}"
+        fld = a.get("field")
+        fld = str(fld) if fld not in (None, "", "*") else None
+        if fld is None and func != "count":
+            return [], f"Aggregate {func} requires a field"
+        alias = str(a.get("alias") or (func if fld is None else f"{func}_{fld}"))
+        out.append(AggregateSpec(func=func, field=fld, alias=alias))
+    return out, None
+
+
+def _parse_pivot(p: Any) -> Optional[PivotSpec]:
+    """Parse optional pivot layout. Invalid layouts are dropped (formatter derives one)."""
+    if not isinstance(p, dict):
+        return None
+    rows = p.get("rows") or []
+    columns = p.get("columns") or []
+    if not isinstance(rows, list) or not isinstance(columns, list) or not rows:
+        return None
+    agg = str(p.get("agg") or "sum").lower()
+    if agg not in ALLOWED_PIVOT_AGGS:
+        agg = "sum"
+    value = p.get("value")
+    return PivotSpec(
+        rows=[str(r) for r in rows],
+        columns=[str(c) for c in columns],
+        value=str(value) if value else None,
+        agg=agg,
+    )
+
+
+def spec_to_dict(spec: QuerySpec) -> dict:
+    """Serialize QuerySpec to its JSON form (inverse of validate_and_build_spec)."""
+    return {
+        "resource": spec.resource,
+        "filters": [{"field": f.field, "op": f.op, "value": f.value} for f in spec.filters],
+        "select": spec.select,
+        "aggregates": [{"func": a.func, "field": a.field, "alias": a.alias} for a in spec.aggregates],
+        "group_by": spec.group_by,
+        "order_by": spec.order_by,
+        "limit": spec.limit,
+        "output_format": spec.output_format,
+        "pivot": (
+            {"rows": spec.pivot.rows, "columns": spec.pivot.columns, "value": spec.pivot.value, "agg": spec.pivot.agg}
+            if spec.pivot
+            else None
+        ),
+    }
@@ -0,0 +1,179 @@
+"""QuerySpec cache keyed on normalized questions.
+
+Repeated questions ("show Finance AWS accounts") skip the Bedrock call.
+Only validated results (executable QuerySpec or clarification) are cached.
+Backends are pluggable: in-process LRU (per Lambda container / API process)
+or a local SQLite file (shared by workers on the same host, survives restarts).
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Protocol
+
+from src.shared.config import SpecCacheConfig
+
+# CN/full-width sentence punctuation -> space (NFKC already folds most full-width ASCII forms).
+# Comparison operators (< > != =) change the meaning, so they are kept; "!" only as in "!=".
+_PUNCT_RE = re.compile(r"[，。？；：、“”‘’（）【】《》「」…,;:?\"'()\[\]]|!(?!=)")
+_OPERATOR_RE = re.compile(r"\s*(!=|<=|>=|<|>|=)\s*")
+_TRAILING_DOT_RE = re.compile(r"\.+(\s|$)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize case, whitespace and CN/EN punctuation so equivalent questions share a key."""
+    q = unicodedata.normalize("NFKC", question).casefold()
+    q = _PUNCT_RE.sub(" ", q)
+    q = _OPERATOR_RE.sub(r" \1 ", q)
+    q = _TRAILING_DOT_RE.sub(" ", q)
+    return _SPACE_RE.sub(" ", q).strip()
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SqliteBackend:
+    """Local on-disk cache. LRU by last access time, TTL per entry."""
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        import sqlite3  # only the sqlite backend needs it
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spec_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM spec_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM spec_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE spec_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spec_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now),
+            )
+            self._conn.execute(
+                "DELETE FROM spec_cache WHERE key IN ("
+                " SELECT key FROM spec_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM spec_cache")
+
+
+class SpecCache:
+    """Normalizes questions, delegates storage to a backend and counts hits/misses."""
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: float = 3600.0):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, question: str, namespace: str = "") -> str:
+        raw = f"{namespace}\x00{normalize_question(question)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, namespace: str = "") -> Optional[Dict[str, Any]]:
+        try:
+            value = self.backend.get(self.key(question, namespace))
+        except Exception:
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, question: str, value: Dict[str, Any], namespace: str = "") -> None:
+        try:
+            self.backend.set(self.key(question, namespace), value, self.ttl_seconds)
+        except Exception:
+            pass  # Cache is best effort; never fail a query because of it
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_cache: Optional[SpecCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_spec_cache(config: Optional[SpecCacheConfig] = None) -> Optional[SpecCache]:
+    """Return the process-wide cache, or None when SPEC_CACHE_BACKEND=none."""
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is None:
+            cfg = config or SpecCacheConfig.from_env()
+            if cfg.backend == "none":
+                return None
+            if cfg.backend == "sqlite":
+                backend: CacheBackend = SqliteBackend(cfg.sqlite_path, cfg.max_entries)
+            else:
+                backend = MemoryBackend(cfg.max_entries)
+            _cache = SpecCache(backend, cfg.ttl_seconds)
+    return _cache
@@ -0,0 +1,60 @@
+"""Shared boto3 client registry.
+
+Clients are created once per (service, region, config) and kept at module level,
+so endpoint resolution and the HTTP connection pool survive across Lambda
+invocations (same container) and FastAPI requests (same process). boto3 clients
+are thread-safe once built; creation is serialized here because the session is not.
+"""
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from src.shared.config import AwsClientConfig
+
+_CLIENTS: Dict[Tuple[str, str, AwsClientConfig], Any] = {}
+_LOCK = threading.Lock()
+_session = None
+
+
+def get_client(service: str, region: str, config: Optional[AwsClientConfig] = None) -> Any:
+    """Return the shared client for this service/region/config, creating it on first use."""
+    cfg = config or AwsClientConfig.from_env()
+    key = (service, region, cfg)
+    client = _CLIENTS.get(key)
+    if client is not None:
+        return client
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _session_locked().client(service, region_name=region, config=_botocore_config(cfg))
+            _CLIENTS[key] = client
+    return client
+
+
+def client_count() -> int:
+    return len(_CLIENTS)
+
+
+def clear_clients() -> None:
+    with _LOCK:
+        _CLIENTS.clear()
+
+
+def _session_locked() -> Any:
+    global _session
+    if _session is None:
+        import boto3
+
+        _session = boto3.session.Session()
+    return _session
+
+
+def _botocore_config(cfg: AwsClientConfig) -> Any:
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=cfg.max_pool_connections,
+        connect_timeout=cfg.connect_timeout,
+        read_timeout=cfg.read_timeout,
+        retries={"max_attempts": cfg.max_attempts, "mode": cfg.retry_mode},
+        tcp_keepalive=cfg.tcp_keepalive,
+    )
@@ -4,9 +4,19 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
-from dotenv import load_dotenv
 
-load_dotenv()
+def _load_dotenv() -> None:
+    """Load .env for local dev. Skipped in Lambda (env comes from the function config) to keep cold start lean."""
+    if os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+_load_dotenv()
 
 
 class LlmProvider(str, Enum):
@@ -23,6 +33,13 @@ class DbConfig:
     name: str
     user: str
     password: str
+    # Connection pool (kept warm across Lambda invocations / API requests)
+    pool_max_size: int = 4
+    pool_idle_timeout: float = 300.0
+    pool_health_check_after: float = 30.0
+    connect_timeout: int = 5
+    # Server-side prepared statements per query shape (disable behind pgbouncer transaction pooling)
+    prepared_statements: bool = True
 
     @classmethod
     def from_env(cls) -> "DbConfig":
@@ -32,6 +49,11 @@ class DbConfig:
             name=os.getenv("DB_NAME", "cloud_resources"),
             user=os.getenv("DB_USER", "app_user"),
             password=os.getenv("DB_PASSWORD", ""),
+            pool_max_size=int(os.getenv("DB_POOL_MAX_SIZE", "4")),
+            pool_idle_timeout=float(os.getenv("DB_POOL_IDLE_SECONDS", "300")),
+            pool_health_check_after=float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", "30")),
+            connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+            prepared_statements=os.getenv("DB_PREPARED_STATEMENTS", "1") == "1",
         )
 
 
@@ -44,6 +66,15 @@ class LlmConfig:
     # Alternative endpoint (e.g. different Bedrock model or team API)
     alt_model_id: Optional[str] = None
     alt_region: Optional[str] = None
+    # Hedged requests: also call the other endpoint when the first is slow
+    hedge: bool = False
+    hedge_delay_ms: Optional[float] = None  # fixed delay; None = adaptive (latency percentile)
+    hedge_percentile: float = 95.0
+    hedge_default_delay_ms: float = 2000.0  # until enough latency samples exist
+    # Stream the completion and stop as soon as a complete JSON object has arrived
+    stream: bool = False
+    # Bedrock prompt caching of the static system prompt: auto (by model id) | on | off
+    prompt_cache: str = "auto"
 
     @classmethod
     def from_env(cls) -> "LlmConfig":
@@ -61,4 +92,141 @@ class LlmConfig:
             provider=provider,
             alt_model_id=os.getenv("BEDROCK_ALT_MODEL_ID"),
             alt_region=os.getenv("BEDROCK_ALT_REGION", os.getenv("AWS_REGION", "us-east-1")),
+            hedge=os.getenv("LLM_HEDGE", "0") == "1",
+            hedge_delay_ms=float(os.environ["LLM_HEDGE_DELAY_MS"]) if os.getenv("LLM_HEDGE_DELAY_MS") else None,
+            hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+            hedge_default_delay_ms=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "2000")),
+            stream=os.getenv("LLM_STREAM", "0") == "1",
+            prompt_cache=os.getenv("LLM_PROMPT_CACHE", "auto").lower(),
+        )
+
+
+@dataclass
+class FastPathConfig:
+    """Rule-based intent matcher that answers common questions without the LLM."""
+    enabled: bool = True
+    min_confidence: float = 0.9
+
+    @classmethod
+    def from_env(cls) -> "FastPathConfig":
+        return cls(
+            enabled=os.getenv("INTENT_FAST_PATH", "1") == "1",
+            min_confidence=float(os.getenv("INTENT_MIN_CONFIDENCE", "0.9")),
+        )
+
+
+@dataclass
+class EntityIndexConfig:
+    """In-memory distinct values of entity columns, used to snap misspelled filter values."""
+    enabled: bool = True
+    ttl_seconds: float = 900.0
+    max_values: int = 10000  # per column
+
+    @classmethod
+    def from_env(cls) -> "EntityIndexConfig":
+        return cls(
+            enabled=os.getenv("ENTITY_INDEX_ENABLED", "1") == "1",
+            ttl_seconds=float(os.getenv("ENTITY_INDEX_TTL_SECONDS", "900")),
+            max_values=int(os.getenv("ENTITY_INDEX_MAX_VALUES", "10000")),
+        )
+
+
+@dataclass
+class BatchConfig:
+    """Batch questions (/query/batch): size limit and planning/execution concurrency."""
+    max_questions: int = 50
+    max_concurrency: int = 8
+
+    @classmethod
+    def from_env(cls) -> "BatchConfig":
+        return cls(
+            max_questions=int(os.getenv("BATCH_MAX_QUESTIONS", "50")),
+            max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", "8")),
+        )
+
+
+@dataclass
+class ScanPolicyConfig:
+    """What to do before running a spec whose filters only touch unindexed columns (a sequential scan)."""
+    unindexed_filters: str = "warn"  # warn | reject
+
+    @classmethod
+    def from_env(cls) -> "ScanPolicyConfig":
+        return cls(unindexed_filters=os.getenv("UNINDEXED_FILTERS", "warn").lower())
+
+
+@dataclass
+class TracingConfig:
+    """Per-stage timings: one structured log line per request, optional EMF metrics and debug field."""
+    enabled: bool = True
+    emf: bool = False  # also print a CloudWatch Embedded Metric Format document
+    namespace: str = "AssetBot"
+    debug_field: bool = False  # honour "debug": true in the request body (exposes internals; opt in)
+
+    @classmethod
+    def from_env(cls) -> "TracingConfig":
+        return cls(
+            enabled=os.getenv("TRACE_ENABLED", "1") == "1",
+            emf=os.getenv("TRACE_EMF", "0") == "1",
+            namespace=os.getenv("TRACE_EMF_NAMESPACE", "AssetBot"),
+            debug_field=os.getenv("TRACE_DEBUG_FIELD", "0") == "1",
+        )
+
+
+@dataclass
+class SpecCacheConfig:
+    """QuerySpec cache (skips the LLM for repeated questions)."""
+    backend: str = "memory"  # memory | sqlite | none
+    ttl_seconds: float = 3600.0
+    max_entries: int = 1024
+    sqlite_path: str = "/tmp/spec_cache.sqlite3"
+
+    @classmethod
+    def from_env(cls) -> "SpecCacheConfig":
+        backend = os.getenv("SPEC_CACHE_BACKEND", "memory").lower()
+        if backend not in ("memory", "sqlite", "none"):
+            backend = "memory"
+        return cls(
+            backend=backend,
+            ttl_seconds=float(os.getenv("SPEC_CACHE_TTL_SECONDS", "3600")),
+            max_entries=int(os.getenv("SPEC_CACHE_MAX_ENTRIES", "1024")),
+            sqlite_path=os.getenv("SPEC_CACHE_PATH", "/tmp/spec_cache.sqlite3"),
+        )
+
+
+@dataclass
+class ResultCacheConfig:
+    """Query result cache (keyed by compiled SQL + params)."""
+    enabled: bool = True
+    max_entries: int = 256
+    default_ttl_seconds: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> "ResultCacheConfig":
+        return cls(
+            enabled=os.getenv("RESULT_CACHE_ENABLED", "1") == "1",
+            max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256")),
+            default_ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300")),
+        )
+
+
+@dataclass(frozen=True)
+class AwsClientConfig:
+    """botocore client tuning (keep-alive, connection pool, retries). Hashable: part of the client registry key."""
+    max_pool_connections: int = 32
+    connect_timeout: float = 3.0
+    read_timeout: float = 60.0
+    max_attempts: int = 3
+    retry_mode: str = "standard"  # legacy | standard | adaptive
+    tcp_keepalive: bool = True
+
+    @classmethod
+    def from_env(cls) -> "AwsClientConfig":
+        return cls(
+            max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "32")),
+            connect_timeout=float(os.getenv("AWS_CONNECT_TIMEOUT", "3")),
+            read_timeout=float(os.getenv("AWS_READ_TIMEOUT", "60")),
+            max_attempts=int(os.getenv("AWS_MAX_ATTEMPTS", "3")),
+            retry_mode=os.getenv("AWS_RETRY_MODE", "standard"),
+            tcp_keepalive=os.getenv("AWS_TCP_KEEPALIVE", "1") == "1",
         )
@@ -1,13 +1,16 @@
 """Shared data models."""
+from array import array
 from dataclasses import dataclass, field
+from decimal import Decimal
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
 
 class QueryDecision(str, Enum):
     EXECUTABLE = "executable"
     CLARIFY = "clarify"
     UNSUPPORTED = "unsupported"
+    ERROR = "error"  # the LLM call itself failed; the clarification carries the error message
 
 
 @dataclass
@@ -17,15 +20,32 @@ class FilterSpec:
     value: Any
 
 
+@dataclass
+class AggregateSpec:
+    func: str  # count | count_distinct | sum | avg | min | max
+    field: Optional[str] = None  # None = COUNT(*)
+    alias: str = ""  # output column name; filters on it become HAVING
+
+
+@dataclass
+class PivotSpec:
+    rows: List[str]  # row key columns
+    columns: List[str] = field(default_factory=list)  # column key columns
+    value: Optional[str] = None  # column to aggregate; None = count rows
+    agg: str = "sum"  # sum | count | avg
+
+
 @dataclass
 class QuerySpec:
     resource: str
     filters: List[FilterSpec] = field(default_factory=list)
     select: List[str] = field(default_factory=list)
+    aggregates: List[AggregateSpec] = field(default_factory=list)
     group_by: Optional[List[str]] = None
     order_by: Optional[List[str]] = None
     limit: int = 100
     output_format: str = "table"  # table | pie | bar | pivot
+    pivot: Optional[PivotSpec] = None  # layout for output_format=pivot (derived if omitted)
 
 
 @dataclass
@@ -45,8 +65,50 @@ class OrchestratorResponse:
 @dataclass
 class ExecutorResult:
     columns: List[str]
-    rows: List[List[Any]]
+    rows: Sequence[Sequence[Any]]  # list of lists, or tuples straight from the DB cursor
     error: Optional[str] = None
+    # Iterator mode: rows are pulled from a server-side cursor instead of `rows`.
+    # Consume once; closing the stream returns the DB connection to the pool.
+    row_stream: Optional[Iterator[Any]] = None
+    # Columnar view (one sequence per column), built once on first access.
+    # All-int / all-numeric columns are packed into array('q') / array('d').
+    column_data: Optional[List[Sequence[Any]]] = None
+
+    @classmethod
+    def from_tuples(cls, columns: List[str], rows: Sequence[Sequence[Any]]) -> "ExecutorResult":
+        """Wrap tuple-cursor rows as-is (no per-row copy)."""
+        return cls(columns=columns, rows=rows)
+
+    def iter_rows(self) -> Iterator[Any]:
+        return iter(self.row_stream) if self.row_stream is not None else iter(self.rows)
+
+    def column(self, idx: int) -> Sequence[Any]:
+        """Values of one column, without re-walking rows after the first call."""
+        if self.column_data is None:
+            self.column_data = _to_columns(self.rows, len(self.columns))
+        return self.column_data[idx]
+
+    def is_numeric_column(self, idx: int) -> bool:
+        return isinstance(self.column(idx), array)
+
+
+def _to_columns(rows: Sequence[Sequence[Any]], width: int) -> List[Sequence[Any]]:
+    """Transpose rows into column sequences (single C-level pass via zip)."""
+    if not rows:
+        return [() for _ in range(width)]
+    return [_pack(col) for col in zip(*rows)]
+
+
+def _pack(col: Sequence[Any]) -> Sequence[Any]:
+    if all(type(v) is int for v in col):
+        try:
+            return array("q", col)
+        except OverflowError:
+            return col
+    if all(type(v) in (int, float, Decimal) for v in col):
+        # NUMERIC/SUM/AVG come back as Decimal; charts only need float precision
+        return array("d", map(float, col))
+    return col
 
 
 @dataclass
@@ -0,0 +1,106 @@
+"""Schema registry loaded once from schema/resource_tables.json.
+
+Holds, per resource, the table name, the column whitelist (frozen set),
+precomputed quoted identifiers, the indexed columns and the entity columns
+(categorical text values that filters are matched against, see entity_index). Loaded at import
+(cold start) so validation of a QuerySpec is pure in-memory set lookups.
+
+Extensible: add new resources to schema/resource_tables.json.
+"""
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+from src.shared.models import QuerySpec
+
+DEFAULT_SCHEMA_PATH = Path(__file__).resolve().parents[2] / "schema" / "resource_tables.json"
+
+
+@dataclass(frozen=True)
+class ResourceSchema:
+    name: str
+    table: str
+    columns: FrozenSet[str]
+    indexed: FrozenSet[str]
+    quoted: Mapping[str, str]  # column -> '"column"'
+    entities: FrozenSet[str] = frozenset()
+
+    def quote(self, column: str) -> str:
+        """Quoted identifier for a whitelisted column; ValueError otherwise."""
+        q = self.quoted.get(column)
+        if q is None:
+            raise ValueError(f"Unknown column for {self.name}: {column}")
+        return q
+
+
+class SchemaRegistry:
+    def __init__(self, resources: Dict[str, ResourceSchema]):
+        self._resources = MappingProxyType(dict(resources))
+        self.resource_names: FrozenSet[str] = frozenset(resources)
+        self.resource_names_ordered: List[str] = list(resources)  # file order (prompts, docs)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "SchemaRegistry":
+        with open(path or os.getenv("RESOURCE_TABLES_PATH") or DEFAULT_SCHEMA_PATH, encoding="utf-8") as f:
+            raw = json.load(f)
+        resources = {}
+        for name, entry in raw.items():
+            columns = frozenset(entry.get("columns", []))
+            resources[name] = ResourceSchema(
+                name=name,
+                table=entry["table"],
+                columns=columns,
+                indexed=frozenset(entry.get("indexed", [])) & columns,
+                quoted=MappingProxyType({c: f'"{c}"' for c in columns}),
+                entities=frozenset(entry.get("entities", [])) & columns,
+            )
+        return cls(resources)
+
+    def resource(self, name: str) -> Optional[ResourceSchema]:
+        return self._resources.get(name)
+
+    def table_map(self) -> Dict[str, str]:
+        return {name: r.table for name, r in self._resources.items()}
+
+    def unknown_columns(self, spec: QuerySpec) -> List[str]:
+        """Columns referenced by the spec that the resource does not have (aggregate aliases allowed)."""
+        schema = self._resources.get(spec.resource)
+        if schema is None:
+            return []
+        aliases = {a.alias for a in spec.aggregates}
+        refs: List[str] = [c for c in spec.select if c not in aliases]
+        refs += [f.field for f in spec.filters if f.field not in aliases]
+        refs += [a.field for a in spec.aggregates if a.field]
+        refs += list(spec.group_by or [])
+        refs += [c.split()[0] for c in spec.order_by or [] if c.split() and c.split()[0] not in aliases]
+        if spec.pivot:
+            refs += [c for c in [*spec.pivot.rows, *spec.pivot.columns, spec.pivot.value] if c and c not in aliases]
+        return _dedupe(c for c in refs if c not in schema.columns)
+
+    def unindexed_filters(self, spec: QuerySpec) -> List[str]:
+        """
+        Filter columns without an index. When every WHERE filter is unindexed the
+        query will be a sequential scan of the table.
+        """
+        schema = self._resources.get(spec.resource)
+        if schema is None:
+            return []
+        aliases = {a.alias for a in spec.aggregates}
+        fields = [f.field for f in spec.filters if f.field not in aliases]
+        if not fields or any(f in schema.indexed for f in fields):
+            return []
+        return _dedupe(fields)
+
+
+def _dedupe(items: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(items))
+
+
+_registry = SchemaRegistry.load()
+
+
+def get_registry() -> SchemaRegistry:
+    return _registry
@@ -0,0 +1,133 @@
+"""Cold-start / import-time profile.
+
+In Lambda: import this module first in the handler module and call mark_ready()
+at its end. With STARTUP_PROFILE=1, every module import in between is timed and
+the first invocation logs one "cold_start" JSON line (init duration + slowest
+imports), so init duration can be tracked per release.
+
+Offline: `python -m src.shared.startup [module]` imports the module in a fresh
+interpreter with `-X importtime` and prints a JSON report (total and the
+modules with the highest cumulative import time).
+"""
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+_T0 = time.perf_counter()
+_ready_ms: Optional[float] = None
+_logged = False
+_import_ms: Dict[str, float] = {}
+
+
+class _TimedLoader:
+    """Delegates to the real loader; records how long exec_module takes (children included)."""
+
+    def __init__(self, loader: Any, name: str):
+        self._loader = loader
+        self._name = name
+
+    def create_module(self, spec: Any) -> Any:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            _import_ms[self._name] = (time.perf_counter() - start) * 1000.0
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._loader, attr)
+
+
+class _ImportTimer:
+    """sys.meta_path finder that wraps other finders' loaders with _TimedLoader."""
+
+    def find_spec(self, name: str, path: Any, target: Any = None) -> Any:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, name)
+                return spec
+        return None
+
+
+def _profile_enabled() -> bool:
+    return os.getenv("STARTUP_PROFILE", "0") == "1"
+
+
+if _profile_enabled():
+    sys.meta_path.insert(0, _ImportTimer())
+
+
+def mark_ready() -> None:
+    """Call at the end of the handler module: init (import) phase is complete."""
+    global _ready_ms
+    if _ready_ms is None:
+        _ready_ms = (time.perf_counter() - _T0) * 1000.0
+    for finder in [f for f in sys.meta_path if isinstance(f, _ImportTimer)]:
+        sys.meta_path.remove(finder)
+
+
+def cold_start_report(top: int = 15) -> Dict[str, Any]:
+    slowest = sorted(_import_ms.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "event": "cold_start",
+        "init_ms": round(_ready_ms, 2) if _ready_ms is not None else None,
+        "python": sys.version.split()[0],
+        "release": os.getenv("AWS_LAMBDA_FUNCTION_VERSION") or os.getenv("APP_RELEASE"),
+        "imports": [{"module": m, "ms": round(ms, 2)} for m, ms in slowest],
+    }
+
+
+def log_cold_start_once() -> None:
+    """First invocation of the container logs the cold-start report (STARTUP_PROFILE=1)."""
+    global _logged
+    if _logged or not _profile_enabled():
+        return
+    _logged = True
+    logger.info(json.dumps(cold_start_report()))
+
+
+def importtime_report(module: str, top: int = 15) -> Dict[str, Any]:
+    """Import `module` in a fresh interpreter with -X importtime and summarize it."""
+    import subprocess
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        env={**os.environ, "AWS_LAMBDA_FUNCTION_NAME": os.getenv("AWS_LAMBDA_FUNCTION_NAME", "startup-profile")},
+    )
+    wall_ms = (time.perf_counter() - start) * 1000.0
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} failed")
+    rows: List[Dict[str, Any]] = []
+    for line in proc.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append({"module": parts[2].strip(), "self_ms": int(parts[0]) / 1000.0, "cumulative_ms": int(parts[1]) / 1000.0})
+    total = next((r["cumulative_ms"] for r in reversed(rows) if r["module"] == module), None)
+    return {
+        "module": module,
+        "import_ms": total,
+        "process_ms": round(wall_ms, 2),
+        "python": sys.version.split()[0],
+        "slowest": sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top],
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(importtime_report(sys.argv[1] if len(sys.argv) > 1 else "src.orchestrator.handler"), indent=2))
@@ -0,0 +1,178 @@
+"""Lightweight request tracing: per-stage span timings, row counts and payload sizes.
+
+A request opens a trace (`with trace("query")`); pipeline stages wrap their work
+in `with span("llm") as s:` and attach attributes (`s.set(rows=...)`). Outside a
+trace, span() is a no-op. When the trace ends it is logged as one
+`{"event": "trace", ...}` JSON line and, with TRACE_EMF=1, printed as a
+CloudWatch Embedded Metric Format document (one metric per stage).
+
+The current trace lives in a ContextVar, so concurrent requests (asyncio tasks)
+do not mix spans. Note that run_in_executor does not carry the context into the
+worker thread: wrap the await, not the blocking function.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.shared.config import TracingConfig
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+# Numeric span/trace attributes that are also published as EMF metrics
+_METRIC_ATTRS = {"rows": "Count", "prompt_chars": "Count", "output_chars": "Count", "response_bytes": "Bytes"}
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    ms: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@dataclass
+class Trace:
+    name: str
+    config: TracingConfig
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    start: float = field(default_factory=time.perf_counter)
+    total_ms: Optional[float] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    spans: List[Span] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, s: Span) -> None:
+        with self._lock:
+            self.spans.append(s)
+
+    def stage_ms(self) -> Dict[str, float]:
+        """Total ms per span name (a stage can run several times, e.g. in a batch)."""
+        out: Dict[str, float] = {}
+        for s in self.spans:
+            out[s.name] = out.get(s.name, 0.0) + s.ms
+        return {k: round(v, 2) for k, v in out.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.total_ms if self.total_ms is not None else (time.perf_counter() - self.start) * 1000.0
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "total_ms": round(total, 2),
+            "stages_ms": self.stage_ms(),
+            "spans": [
+                {"name": s.name, "start_ms": round((s.start - self.start) * 1000.0, 2), "ms": round(s.ms, 2), **s.attrs}
+                for s in sorted(self.spans, key=lambda s: s.start)
+            ],
+            **self.attrs,
+        }
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Optional[Trace]]:
+    """
+    Open a trace for one request; yields the Trace (None when TRACE_ENABLED=0).
+    Inside another trace it joins it: yields the outer trace, which is emitted once.
+    """
+    outer = _current.get()
+    if outer is not None:
+        outer.set(**attrs)
+        yield outer
+        return
+    cfg = TracingConfig.from_env()
+    if not cfg.enabled:
+        yield None
+        return
+    t = Trace(name=name, config=cfg, attrs=dict(attrs))
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+        t.total_ms = (time.perf_counter() - t.start) * 1000.0
+        emit(t)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Any]:
+    """Time a stage of the current trace; yields an object with .set(**attrs)."""
+    t = _current.get()
+    if t is None:
+        yield _NOOP
+        return
+    s = Span(name=name, start=time.perf_counter(), attrs=dict(attrs))
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        s.ms = (time.perf_counter() - s.start) * 1000.0
+        t.add(s)
+
+
+def emit(t: Trace) -> None:
+    data = t.to_dict()
+    logger.info(json.dumps({"event": "trace", **data}, default=str))
+    if t.config.emf:
+        sys.stdout.write(json.dumps(emf_document(t, data), default=str) + "\n")
+        sys.stdout.flush()
+
+
+def emf_document(t: Trace, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """CloudWatch Embedded Metric Format: total and per-stage ms, plus row/size counts, by Operation."""
+    data = data or t.to_dict()
+    values: Dict[str, Any] = {"total_ms": data["total_ms"]}
+    units = {"total_ms": "Milliseconds"}
+    for stage, ms in data["stages_ms"].items():
+        values[f"{stage}_ms"] = ms
+        units[f"{stage}_ms"] = "Milliseconds"
+    for key, unit in _METRIC_ATTRS.items():
+        nums = [s.attrs[key] for s in t.spans if isinstance(s.attrs.get(key), (int, float))]
+        if isinstance(t.attrs.get(key), (int, float)):
+            nums.append(t.attrs[key])
+        if nums:
+            values[key] = sum(nums)
+            units[key] = unit
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": t.config.namespace,
+                "Dimensions": [["Operation"]],
+                "Metrics": [{"Name": k, "Unit": units[k]} for k in values],
+            }],
+        },
+        "Operation": t.name,
+        "TraceId": t.trace_id,
+        **values,
+    }
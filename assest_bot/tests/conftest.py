@@ -0,0 +1,11 @@
+"""Shared test setup."""
+import pytest
+
+from src.orchestrator import entity_index
+
+
+@pytest.fixture(autouse=True)
+def _no_entity_index(monkeypatch):
+    """validate_and_build_spec must not start background DB loads; tests that need an index patch one in."""
+    monkeypatch.setenv("ENTITY_INDEX_ENABLED", "0")
+    monkeypatch.setattr(entity_index, "_index", None)
@@ -0,0 +1,16 @@
+"""Tests for the shared boto3 client registry."""
+from src.shared.aws_clients import clear_clients, client_count, get_client
+from src.shared.config import AwsClientConfig
+
+
+def test_get_client_reuses_per_region_and_config():
+    clear_clients()
+    cfg = AwsClientConfig(max_pool_connections=8, max_attempts=2)
+    a = get_client("bedrock-runtime", "us-east-1", cfg)
+    assert get_client("bedrock-runtime", "us-east-1", AwsClientConfig(max_pool_connections=8, max_attempts=2)) is a
+    assert get_client("bedrock-runtime", "us-west-2", cfg) is not a
+    assert get_client("bedrock-runtime", "us-east-1", AwsClientConfig(max_pool_connections=16)) is not a
+    assert client_count() == 3
+    assert a.meta.config.max_pool_connections == 8
+    assert a.meta.config.retries["mode"] == "standard"
+    clear_clients()
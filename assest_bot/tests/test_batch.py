@@ -0,0 +1,62 @@
+"""Tests for batch questions and spec merging."""
+import asyncio
+
+from src.executor.batch import execute_batch_async, plan_batch
+from src.executor.spec_to_sql import spec_to_sql
+from src.orchestrator.handler import handle_batch_async
+from src.shared.models import AggregateSpec, ExecutorResult, FilterSpec, QuerySpec
+
+
+def _count_in(region):
+    return QuerySpec(
+        resource="ec2_instance",
+        filters=[FilterSpec(field="region", op="=", value=region)],
+        aggregates=[AggregateSpec(func="count", alias="count")],
+    )
+
+
+def test_plan_batch_dedupes_and_merges_single_row_aggregates():
+    specs = [_count_in("us-east-1"), _count_in("us-west-2"), _count_in("us-east-1"), QuerySpec(resource="rds_instance"), QuerySpec(resource="rds_instance")]
+    groups = plan_batch(specs)
+    assert len(groups) == 2
+    merged = next(g for g in groups if g.split_field)
+    assert sorted(merged.members) == [0, 1, 2]
+    sql, params = spec_to_sql(merged.spec)
+    assert sql == 'SELECT "region", COUNT(*) AS "count" FROM ec2_instances WHERE "region" IN (%s, %s) GROUP BY "region" LIMIT 2'
+    assert params == ["us-east-1", "us-west-2"]
+
+
+def test_grouped_or_listing_specs_are_not_merged():
+    grouped = [QuerySpec(resource="ec2_instance", select=["owner"], aggregates=[AggregateSpec(func="count", alias="count")], filters=[FilterSpec("region", "=", r)]) for r in ("a", "b")]
+    listing = [QuerySpec(resource="ec2_instance", filters=[FilterSpec("region", "=", r)]) for r in ("a", "b")]
+    assert len(plan_batch(grouped)) == 2
+    assert len(plan_batch(listing)) == 2
+
+
+def test_execute_batch_splits_merged_result(monkeypatch):
+    calls = []
+
+    async def fake_execute(spec, config=None):
+        calls.append(spec)
+        return ExecutorResult(columns=["region", "count"], rows=[("us-east-1", 28)])
+
+    monkeypatch.setattr("src.executor.batch.execute_query_async", fake_execute)
+    results, statements = asyncio.run(execute_batch_async([_count_in("us-east-1"), _count_in("eu-west-1")]))
+    assert statements == 1 and len(calls) == 1
+    assert (results[0].columns, results[0].rows) == (["count"], [[28]])
+    assert results[1].rows == [[0]]  # no rows for this value: COUNT is 0
+
+
+def test_handle_batch_dedupes_questions(monkeypatch):
+    monkeypatch.setenv("USE_MOCK_LLM", "1")
+
+    async def fake_execute(spec, config=None):
+        return ExecutorResult(columns=["region", "count"], rows=[("us-east-1", 28)])
+
+    monkeypatch.setattr("src.executor.batch.execute_query_async", fake_execute)
+    status, body = asyncio.run(handle_batch_async(["EC2 count by region", "ec2 count by region!", "what is the weather", ""]))
+    assert status == 200
+    assert body["stats"]["unique"] == 2
+    assert [r["status"] for r in body["results"]] == [200, 200, 200, 400]
+    assert body["results"][0]["response"] == body["results"][1]["response"]
+    assert body["results"][2]["response"]["decision"] == "unsupported"
@@ -0,0 +1,23 @@
+"""Smoke test for the benchmark harness (tiny data set)."""
+import json
+
+from benchmarks import run
+
+
+def test_benchmark_run_writes_report(tmp_path, monkeypatch):
+    # run.main writes these into os.environ; setting them through monkeypatch first
+    # records the previous values so they are restored after the test
+    for key, value in run.CONFIGURED_ENV.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv("BENCH_DATA_DIR", str(tmp_path))
+    report = run.main([
+        "--rows", "200", "--concurrency", "2", "--requests", "10",
+        "--repeat", "1", "--execute-repeat", "1", "--out", str(tmp_path / "reports"),
+    ])
+    scale = report["scales"][0]
+    assert scale["rows"] == 200
+    assert set(scale["stages"]) >= {"parse", "compile", "execute", "format"}
+    assert scale["e2e"][0]["errors"] == 0 and scale["e2e"][0]["rps"] > 0
+    (path,) = (tmp_path / "reports").iterdir()
+    assert json.loads(path.read_text())["run"]["db"] == "sqlite"
+    assert any("x)" in line for line in run.summary_lines(report, report))
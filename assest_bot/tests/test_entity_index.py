@@ -0,0 +1,68 @@
+"""Tests for fuzzy filter value resolution."""
+from src.orchestrator import query_spec
+from src.orchestrator.entity_index import EntityIndex
+from src.orchestrator.query_spec import validate_and_build_spec
+
+
+def _index(values):
+    data = {"department": list(values)}
+    index = EntityIndex(lambda resource, column, n: data.get(column, []), ttl=3600)
+    index.refresh("aws_account", "department")
+    return index, data
+
+
+def test_lookup_exact_typo_prefix_and_miss():
+    index, _ = _index(["Finance", "FinOps", "HR", "Engineering"])
+    assert index.lookup("aws_account", "department", "finance") == ["Finance"]
+    assert index.lookup("aws_account", "department", "Finanse") == ["Finance"]
+    assert index.lookup("aws_account", "department", "Enginering") == ["Engineering"]
+    assert sorted(index.lookup("aws_account", "department", "fin")) == ["FinOps", "Finance"]
+    assert index.lookup("aws_account", "department", "Marketing") == []
+
+
+def test_refresh_applies_added_and_removed_values():
+    index, data = _index(["Finance", "HR"])
+    data["department"] = ["Finance", "Legal"]
+    assert index.refresh("aws_account", "department")
+    assert index.lookup("aws_account", "department", "HR") == []
+    assert index.lookup("aws_account", "department", "legal") == ["Legal"]
+    index.add_values("aws_account", "department", ["Sales"])
+    assert index.lookup("aws_account", "department", "sales") == ["Sales"]
+
+
+def test_validate_snaps_filter_values(monkeypatch):
+    index, _ = _index(["Finance", "FinOps", "HR"])
+    monkeypatch.setattr(query_spec, "get_entity_index", lambda: index)
+    spec, err = validate_and_build_spec({
+        "resource": "aws_account",
+        "filters": [{"field": "department", "op": "=", "value": "finanse"}],
+    })
+    assert err is None
+    assert (spec.filters[0].op, spec.filters[0].value) == ("=", "Finance")
+
+    spec, _ = validate_and_build_spec({
+        "resource": "aws_account",
+        "filters": [{"field": "department", "op": "=", "value": "fin"}, {"field": "account_id", "op": "=", "value": "fin"}],
+    })
+    assert spec.filters[0].op == "in" and sorted(spec.filters[0].value) == ["FinOps", "Finance"]
+    assert spec.filters[1].value == "fin"  # not an entity column
+
+
+def test_code_like_values_are_not_snapped():
+    index = EntityIndex(lambda resource, column, n: ["user042", "t2.micro", "Alice Smith"], ttl=3600)
+    index.refresh("ec2_instance", "owner")
+    assert index.lookup("ec2_instance", "owner", "USER042") == ["user042"]
+    assert index.lookup("ec2_instance", "owner", "user043") == []
+    assert index.lookup("ec2_instance", "owner", "t3.micro") == []
+    assert index.lookup("ec2_instance", "owner", "alice smyth") == ["Alice Smith"]
+
+
+def test_code_columns_are_not_entity_columns(monkeypatch):
+    index = EntityIndex(lambda resource, column, n: ["us-east-1"], ttl=3600)
+    index.refresh("ec2_instance", "region")
+    monkeypatch.setattr(query_spec, "get_entity_index", lambda: index)
+    spec, _ = validate_and_build_spec({
+        "resource": "ec2_instance",
+        "filters": [{"field": "region", "op": "=", "value": "us-east-2"}],
+    })
+    assert spec.filters[0].value == "us-east-2"
@@ -0,0 +1,60 @@
+"""Tests for response formatting."""
+from decimal import Decimal
+
+from src.formatter.formatter import format_response
+from src.shared.models import ExecutorResult, PivotSpec, QuerySpec
+
+
+def test_format_table_keeps_cursor_rows():
+    rows = [("123456789012", "finance-prod"), ("210987654321", "finance-dev")]
+    result = ExecutorResult.from_tuples(["account_id", "account_name"], rows)
+    out = format_response(QuerySpec(resource="aws_account"), result)
+    assert out["format"] == "table"
+    assert out["rows"] is rows
+
+
+def test_format_bar_uses_numeric_column():
+    result = ExecutorResult.from_tuples(["region", "count"], [("us-east-1", 28), ("us-west-2", 15)])
+    out = format_response(QuerySpec(resource="ec2_instance", output_format="bar"), result)
+    assert out["labels"] == ["us-east-1", "us-west-2"]
+    assert out["values"] == [28.0, 15.0]
+
+
+def test_columnar_view():
+    result = ExecutorResult.from_tuples(["owner", "total"], [("a", Decimal("1.5")), ("b", 2)])
+    assert list(result.column(0)) == ["a", "b"]
+    assert result.is_numeric_column(1)
+    assert not result.is_numeric_column(0)
+
+
+def test_format_pivot_matrix():
+    rows = [("alice", "postgres", 2), ("alice", "mysql", 1), ("bob", "postgres", 3), ("alice", "postgres", 4)]
+    result = ExecutorResult.from_tuples(["owner", "engine", "count"], rows)
+    out = format_response(QuerySpec(resource="rds_instance", output_format="pivot"), result)
+    pivot = out["pivot"]
+    assert pivot["row_keys"] == [["alice"], ["bob"]]
+    assert pivot["col_keys"] == [["postgres"], ["mysql"]]
+    assert pivot["matrix"] == [[6.0, 1.0], [3.0, None]]
+    assert pivot["row_totals"] == [7.0, 3.0]
+    assert pivot["col_totals"] == [9.0, 1.0]
+    assert pivot["grand_total"] == 10.0
+
+
+def test_format_pivot_explicit_avg():
+    rows = [("alice", 2), ("alice", 4), ("bob", 3)]
+    result = ExecutorResult.from_tuples(["owner", "size"], rows)
+    spec = QuerySpec(resource="rds_instance", output_format="pivot", pivot=PivotSpec(rows=["owner"], value="size", agg="avg"))
+    pivot = format_response(spec, result)["pivot"]
+    assert pivot["matrix"] == [[3.0], [3.0]]
+    assert pivot["grand_total"] == 3.0
+
+
+def test_format_pivot_avg_ignores_null_values():
+    rows = [("alice", None), ("alice", 4), ("bob", "n/a"), ("bob", None)]
+    result = ExecutorResult.from_tuples(["owner", "size"], rows)
+    spec = QuerySpec(resource="rds_instance", output_format="pivot", pivot=PivotSpec(rows=["owner"], value="size", agg="avg"))
+    pivot = format_response(spec, result)["pivot"]
+    assert pivot["matrix"] == [[4.0], [None]]
+    assert pivot["grand_total"] == 4.0
+    spec.pivot.agg = "count"
+    assert format_response(spec, result)["pivot"]["matrix"] == [[2], [2]]
@@ -0,0 +1,147 @@
+"""Tests for orchestrator request handling."""
+import asyncio
+import json
+import sys
+import types
+from decimal import Decimal
+
+from src.executor import db_client
+from src.executor.db_client import _coerce_params, _to_dollar_params
+from src.shared.config import DbConfig
+from src.formatter.formatter import format_response, format_response_stream
+from src.orchestrator.handler import handle_question, handle_question_async, handler
+from src.shared.models import ExecutorResult, FilterSpec, QueryDecision, QuerySpec
+
+
+def test_handler_requires_question():
+    resp = handler({"body": json.dumps({"question": "  "})}, None)
+    assert resp["statusCode"] == 400
+
+
+def test_handle_question_async_matches_sync(monkeypatch):
+    monkeypatch.setenv("USE_MOCK_LLM", "1")
+    sync = handle_question("what is the weather")
+    status, body = asyncio.run(handle_question_async("what is the weather"))
+    assert (status, body) == sync
+    assert body["decision"] == "unsupported"
+
+
+def test_to_dollar_params():
+    sql = 'SELECT "a" FROM t WHERE "b" = %s AND "c" IN (%s, %s) LIMIT 10'
+    assert _to_dollar_params(sql) == 'SELECT "a" FROM t WHERE "b" = $1 AND "c" IN ($2, $3) LIMIT 10'
+
+
+def test_coerce_params_to_server_types():
+    params = ["5", 3, "1.5", "2024-01-02T03:04:05Z", "x", "n/a"]
+    out = _coerce_params(params, ["int4", "text", "numeric", "timestamptz", "text", "int8"])
+    assert out[:3] == [5, "3", Decimal("1.5")]
+    assert out[3].year == 2024 and out[3].utcoffset().total_seconds() == 0
+    assert out[4:] == ["x", "n/a"]  # not convertible: the server reports the error, as with psycopg2
+
+
+def test_execute_query_raw_async_binds_coerced_params(monkeypatch):
+    calls = []
+
+    class Conn:
+        async def prepare(self, query, name=None):
+            calls.append(("prepare", name))
+            attrs = [types.SimpleNamespace(name="instance_id")]
+            params = [types.SimpleNamespace(name="int4")]
+            return types.SimpleNamespace(get_attributes=lambda: attrs, get_parameters=lambda: params)
+
+        async def fetch(self, query, *args):
+            calls.append(("fetch", args))
+            return []
+
+    class Pool:
+        def acquire(self):
+            conn = Conn()
+
+            class Ctx:
+                async def __aenter__(self):
+                    return conn
+
+                async def __aexit__(self, *exc):
+                    return False
+
+            return Ctx()
+
+    async def get_pool(cfg):
+        return Pool()
+
+    monkeypatch.setitem(sys.modules, "asyncpg", types.ModuleType("asyncpg"))
+    monkeypatch.setattr(db_client, "_get_async_pool", get_pool)
+    monkeypatch.setattr(db_client, "_DESCRIBED", {})
+    sql = 'SELECT "instance_id" FROM ec2_instances WHERE "size_gb" > %s'
+    for _ in range(2):
+        result = asyncio.run(db_client.execute_query_raw_async(sql, ["5"]))
+        assert result.error is None and result.columns == ["instance_id"]
+    assert calls == [("prepare", ""), ("fetch", (5,)), ("fetch", (5,))]
+
+
+def test_async_pool_statement_cache_follows_prepared_statements(monkeypatch):
+    created = []
+
+    async def create_pool(**kwargs):
+        created.append(kwargs["statement_cache_size"])
+        return object()
+
+    fake = types.ModuleType("asyncpg")
+    fake.create_pool = create_pool
+    monkeypatch.setitem(sys.modules, "asyncpg", fake)
+    monkeypatch.setattr(db_client, "_ASYNC_POOLS", {})
+    for prepared in (True, False):
+        cfg = DbConfig(host="h", port=5432, name="n", user="u", password="", prepared_statements=prepared)
+        asyncio.run(db_client._get_async_pool(cfg))
+    assert created == [db_client.ASYNC_STATEMENT_CACHE_SIZE, 0]
+
+
+def test_format_response_stream_ndjson():
+    spec = QuerySpec(resource="ec2_instance", output_format="bar")
+    result = ExecutorResult(columns=["instance_id", "count"], rows=[], row_stream=iter([("i-01", 28), ("i-02", 15)]))
+    lines = [json.loads(line) for line in format_response_stream(spec, result, chunk_rows=1)]
+    assert lines[0]["type"] == "meta"
+    assert [ln["labels"] for ln in lines[1:3]] == [["i-01"], ["i-02"]]
+    assert lines[-1] == {"type": "end", "row_count": 2}
+
+
+def test_format_response_stream_matches_format_response():
+    rows = [("us-east-1", 28), ("us-west-2", 15)]
+    for fmt in ("bar", "pie"):
+        spec = QuerySpec(resource="ec2_instance", output_format=fmt)
+        expected = format_response(spec, ExecutorResult.from_tuples(["region", "count"], rows))
+        streamed = ExecutorResult(columns=["region", "count"], rows=[], row_stream=iter(rows))
+        points = [json.loads(line) for line in format_response_stream(spec, streamed)][1]
+        assert (points["labels"], points["values"]) == (expected["labels"], expected["values"])
+
+
+def test_llm_failure_is_an_error_not_unsupported(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "bedrock")
+
+    def outage(*args, **kwargs):
+        raise RuntimeError("ThrottlingException: rate exceeded")
+
+    monkeypatch.setattr("src.orchestrator.llm_client.invoke_llm", outage)
+    status, body = handle_question("which databases were created last week")
+    assert status == 502
+    assert "ThrottlingException" in body["error"]
+
+
+def test_unindexed_filters_are_flagged_before_execution(monkeypatch):
+    spec = QuerySpec(resource="rds_instance", filters=[FilterSpec(field="size", op="=", value="large")])
+    executed = []
+
+    def fake_execute(s):
+        executed.append(s)
+        return ExecutorResult(columns=["db_instance_id"], rows=[("db-1",)])
+
+    monkeypatch.setattr("src.orchestrator.handler.llm_to_spec", lambda q: (QueryDecision.EXECUTABLE, spec, None, None))
+    monkeypatch.setattr("src.orchestrator.handler.execute_query", fake_execute)
+    status, body = handle_question("large databases")
+    assert status == 200 and "size" in body["warnings"][0]
+    assert len(executed) == 1
+
+    monkeypatch.setenv("UNINDEXED_FILTERS", "reject")
+    status, body = handle_question("large databases")
+    assert status == 400 and "size" in body["error"]
+    assert len(executed) == 1
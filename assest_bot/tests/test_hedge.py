@@ -0,0 +1,54 @@
+"""Tests for hedged LLM requests."""
+import time
+
+import pytest
+
+from src.orchestrator.hedge import LatencyHistogram, hedged_call
+
+
+def _sleepy(seconds, out, calls=None, name=None):
+    def run():
+        if calls is not None:
+            calls.append(name)
+        time.sleep(seconds)
+        return out
+    return run
+
+
+def _fail():
+    raise RuntimeError("throttled")
+
+
+def test_hedged_call_fast_primary_skips_alternate():
+    calls = []
+    out = hedged_call(_sleepy(0, "p", calls, "p"), _sleepy(0, "a", calls, "a"), 0.5, accept=lambda r: True)
+    assert out == "p"
+    assert calls == ["p"]
+
+
+def test_hedged_call_slow_primary_alternate_wins():
+    start = time.monotonic()
+    out = hedged_call(_sleepy(1.0, "p"), _sleepy(0, "a"), 0.05, accept=lambda r: True)
+    assert out == "a"
+    assert time.monotonic() - start < 0.9
+
+
+def test_hedged_call_invalid_or_failed_primary_hedges_immediately():
+    assert hedged_call(_sleepy(0, "bad"), _sleepy(0, "good"), 5.0, accept=lambda r: r == "good") == "good"
+    assert hedged_call(_fail, _sleepy(0, "good"), 5.0, accept=lambda r: True) == "good"
+    # Nothing acceptable: first response is returned; all failed: error is raised
+    assert hedged_call(_sleepy(0, "bad"), _sleepy(0, "worse"), 0.01, accept=lambda r: False) == "bad"
+    with pytest.raises(RuntimeError):
+        hedged_call(_fail, _fail, 0.01, accept=lambda r: True)
+
+
+def test_latency_histogram_percentiles():
+    h = LatencyHistogram()
+    assert h.percentile(95) is None
+    for _ in range(95):
+        h.record(100)
+    for _ in range(5):
+        h.record(5000)
+    assert 100 <= h.percentile(50) < 125
+    assert h.percentile(95) < 200
+    assert h.percentile(99) >= 5000
@@ -0,0 +1,98 @@
+"""Tests for the rule-based intent matcher (LLM fast path)."""
+from src.orchestrator import intent_matcher
+from src.orchestrator.entity_index import EntityIndex
+from src.orchestrator.intent_matcher import match_intent
+from src.orchestrator.llm_client import llm_to_spec
+from src.shared.models import QueryDecision
+
+
+def test_count_by_region_en_and_cn_match_same_spec():
+    en = match_intent("EC2 count by region")
+    cn = match_intent("按区域统计EC2数量")
+    assert en.confidence == cn.confidence == 1.0
+    assert en.spec == cn.spec
+    assert en.spec["group_by"] == ["region"]
+    assert en.spec["aggregates"] == [{"func": "count", "alias": "count"}]
+
+
+def test_list_with_filters_and_chart():
+    m = match_intent("list rds postgres instances in us-east-1")
+    assert m.confidence == 1.0
+    assert m.spec["resource"] == "rds_instance"
+    assert m.spec["filters"] == [
+        {"field": "engine", "op": "=", "value": "postgres"},
+        {"field": "region", "op": "=", "value": "us-east-1"},
+    ]
+    assert match_intent("How many RDS instances by engine? pie chart").spec["output_format"] == "pie"
+
+
+def test_column_word_after_by_is_not_a_resource():
+    m = match_intent("show ec2 instances by account")
+    assert m.spec["resource"] == "ec2_instance"
+    assert m.spec["group_by"] == ["account_id"]
+
+
+def test_group_word_before_department_is_not_a_value():
+    m = match_intent("count aws accounts by department")
+    assert m.spec["filters"] == []
+    assert m.spec["group_by"] == ["department"]
+    assert match_intent("aws accounts in the Finance department").spec["filters"] == [
+        {"field": "department", "op": "=", "value": "Finance"}
+    ]
+
+
+def test_unrecognised_questions_have_low_confidence():
+    assert match_intent("what is the weather") is None
+    assert match_intent("rds and ec2 in one list") is None  # two resources
+    assert match_intent("which databases were created last week").confidence < 0.9
+
+
+def test_llm_to_spec_uses_fast_path(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "bedrock")
+    monkeypatch.setattr("src.orchestrator.llm_client.invoke_llm", lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+    decision, spec, _, raw = llm_to_spec("AWS账号有多少个")
+    assert decision == QueryDecision.EXECUTABLE
+    assert spec.resource == "aws_account"
+    assert spec.aggregates[0].func == "count"
+    assert raw is None
+
+
+def test_negation_and_disjunction_fall_through_to_llm():
+    assert match_intent("show me all of the ec2 instances which are not in us-east-1") is None
+    assert match_intent("ec2 instances that aren't in us-east-1") is None
+    assert match_intent("list all ec2 instances in us-east-1 or us-west-2") is None
+    assert match_intent("rds instances with engine mysql or postgres") is None
+    assert match_intent("除了us-east-1以外的EC2") is None
+
+
+def test_repeated_values_for_one_column_become_in():
+    m = match_intent("list ec2 instances in us-east-1 and us-west-2")
+    assert m.spec["filters"] == [{"field": "region", "op": "in", "value": ["us-east-1", "us-west-2"]}]
+
+
+def test_confidence_drops_per_unknown_word():
+    assert match_intent("list ec2 instances in us-east-1 created yesterday").confidence == 0.25
+
+
+def test_bare_for_word_is_only_a_department_when_known(monkeypatch):
+    assert match_intent("list accounts for Alice").confidence < 0.9
+    assert match_intent("list accounts for March").confidence < 0.9
+    index = EntityIndex(lambda *a: [])
+    index.add_values("aws_account", "department", ["Finance"])
+    monkeypatch.setattr(intent_matcher, "get_entity_index", lambda: index)
+    assert match_intent("list accounts for Finance").confidence == 0.9
+    assert match_intent("list accounts for March").confidence < 0.9
+
+
+def test_column_word_after_its_value_is_not_selected():
+    m = match_intent("list accounts for the Finance department")
+    assert m.confidence == 0.9
+    assert m.spec["filters"] == [{"field": "department", "op": "=", "value": "Finance"}]
+    assert m.spec["select"] == []
+    assert match_intent("list rds postgres engine instances").spec["select"] == []
+
+
+def test_engine_aliases_map_to_rds_engine_names():
+    m = match_intent("how many postgresql databases")
+    assert m.spec["filters"] == [{"field": "engine", "op": "=", "value": "postgres"}]
+    assert match_intent("count aurora databases").spec["filters"][0]["op"] == "in"
@@ -0,0 +1,62 @@
+"""Tests for streamed LLM output parsing."""
+import json
+
+import pytest
+
+from src.orchestrator import llm_client
+from src.orchestrator.json_stream import JsonObjectScanner, LlmOutputError
+from src.orchestrator.prompts import build_prompt
+
+
+def _feed(chunks, allowed=("rds_instance",)):
+    scanner = JsonObjectScanner(allowed)
+    for i, c in enumerate(chunks):
+        if scanner.feed(c):
+            return i, scanner.result
+    return None, None
+
+
+def test_scanner_completes_on_closing_brace():
+    i, result = _feed(['```js', 'on\n{"res', 'ource": "rds_', 'instance", "f": "a}{\\""}', "\n```", "ignored"])
+    assert i == 3
+    assert result == {"resource": "rds_instance", "f": 'a}{"'}
+    i, result = _feed(['{"decision": "clarify", "message": "x"} trailing'])
+    assert result["decision"] == "clarify"
+
+
+def test_scanner_fails_fast():
+    with pytest.raises(LlmOutputError, match="not a JSON object"):
+        _feed(["Sure! Here is", " the spec: {}"])
+    with pytest.raises(LlmOutputError, match="Invalid resource"):
+        _feed(['{"resource": "s3_bucket"', ', "limit": 1'])
+    with pytest.raises(LlmOutputError, match="Invalid JSON"):
+        _feed(['{"resource": "rds_instance", "limit": 1,,}'])
+
+
+class _Stream:
+    def __init__(self, texts):
+        self.events = [{"chunk": {"bytes": json.dumps({"type": "content_block_delta", "delta": {"text": t}}).encode()}} for t in texts]
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for e in self.events:
+            self.consumed += 1
+            yield e
+
+    def close(self):
+        self.closed = True
+
+
+def test_invoke_bedrock_stream_stops_after_object(monkeypatch):
+    stream = _Stream(['{"resource": "rds_instance",', ' "limit": 5}', " extra", " tokens"])
+
+    class Client:
+        def invoke_model_with_response_stream(self, **kwargs):
+            return {"body": stream}
+
+    monkeypatch.setattr(llm_client, "get_client", lambda *a, **k: Client())
+    out = llm_client._invoke_bedrock_stream("us-east-1", "m", build_prompt("rds by engine"))
+    assert json.loads(out) == {"resource": "rds_instance", "limit": 5}
+    assert stream.consumed == 2
+    assert stream.closed
@@ -0,0 +1,108 @@
+"""Tests for DB connection pool."""
+import time
+
+import pytest
+
+from src.executor.pool import ConnectionPool, PoolExhaustedError
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        raise AssertionError("health check should not run for fresh connections")
+
+
+def test_pool_reuses_warm_connection():
+    pool = ConnectionPool(connect=FakeConn, max_size=2)
+    with pool.connection() as c1:
+        pass
+    with pool.connection() as c2:
+        pass
+    assert c1 is c2
+    stats = pool.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["idle"] == 1
+
+
+def test_pool_max_size():
+    pool = ConnectionPool(connect=FakeConn, max_size=1, acquire_timeout=0.01)
+    conn = pool.acquire()
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+
+def test_pool_discards_closed_and_idle_connections():
+    pool = ConnectionPool(connect=FakeConn, max_size=2, idle_timeout=0.0001)
+    conn = pool.acquire()
+    conn.closed = 1
+    pool.release(conn)
+    assert pool.stats()["idle"] == 0
+
+    conn = pool.acquire()
+    pool.release(conn)
+    time.sleep(0.01)
+    assert pool.acquire() is not conn
+    assert pool.stats()["evictions"] == 1
+
+
+def test_pool_never_exceeds_max_size_under_contention():
+    import threading
+
+    opened = []
+
+    def connect():
+        conn = FakeConn()
+        opened.append(conn)
+        return conn
+
+    pool = ConnectionPool(connect=connect, max_size=2, acquire_timeout=5)
+    peak = []
+
+    def worker():
+        for _ in range(50):
+            with pool.connection():
+                peak.append(pool.stats()["open"])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(opened) <= 2
+    assert max(peak) <= 2
+    assert pool.stats()["open"] == pool.stats()["idle"] == len(opened)
+
+
+def test_health_check_runs_outside_the_lock():
+    import threading
+
+    started, unblock = threading.Event(), threading.Event()
+
+    class SlowPingConn(FakeConn):
+        def cursor(self):
+            started.set()
+            unblock.wait(2)
+            raise RuntimeError("connection lost")
+
+    conns = iter([SlowPingConn(), FakeConn(), FakeConn()])
+    pool = ConnectionPool(connect=lambda: next(conns), max_size=2, health_check_after=0)
+    pool.release(pool.acquire())
+
+    result = {}
+    t = threading.Thread(target=lambda: result.update(conn=pool.acquire()))
+    t.start()
+    assert started.wait(2)
+    other = pool.acquire()  # not blocked by the ping in progress
+    unblock.set()
+    t.join()
+    assert isinstance(other, FakeConn) and not isinstance(result["conn"], SlowPingConn)
+    assert pool.stats()["health_check_failures"] == 1
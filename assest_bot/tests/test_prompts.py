@@ -0,0 +1,53 @@
+"""Tests for the prompt builder (cacheable prefix + per-question hint)."""
+import json
+import logging
+
+from src.orchestrator import llm_client
+from src.orchestrator.prompts import SYSTEM_PROMPT, build_prompt, likely_resources
+from src.shared.schema_registry import get_registry
+
+
+def test_columns_are_in_the_static_prefix_and_the_user_message_hints():
+    parts = build_prompt("按区域统计EC2数量")
+    assert parts.system == SYSTEM_PROMPT
+    assert "- ec2_instance: account_id, instance_id, instance_type, owner, region" in SYSTEM_PROMPT
+    assert parts.user.startswith("Likely resource: ec2_instance\n")
+    assert "Likely resource" not in build_prompt("what changed yesterday").user
+
+
+def test_ambiguous_questions_get_every_resource():
+    everything = list(get_registry().resource_names_ordered)
+    # project (gcp_project) and account (aws_account): both are needed
+    assert likely_resources("list projects with more than 10 resources in the finance account") == everything
+    assert likely_resources("how many ec2 and rds") == everything
+    # engine is not an ec2_instance column
+    assert likely_resources("ec2 instances by engine") == everything
+    assert likely_resources("gcp projects by owner") == ["gcp_project"]
+    assert likely_resources("rds instances by engine") == ["rds_instance"]
+
+
+def test_request_body_marks_system_prompt_cacheable():
+    parts = build_prompt("rds by engine")
+    assert llm_client._prompt_cache_enabled("auto", "anthropic.claude-3-7-sonnet-20250219-v1:0", parts.system)
+    assert not llm_client._prompt_cache_enabled("auto", "anthropic.claude-v2", parts.system)
+    # Below the model's minimum cacheable prefix the checkpoint would be ignored
+    assert not llm_client._prompt_cache_enabled("auto", "anthropic.claude-3-7-sonnet-20250219-v1:0", "short")
+    body = llm_client._request_body(parts, cache=True)
+    assert body["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in llm_client._request_body(parts, cache=False)["system"][0]
+
+
+def test_invoke_logs_token_usage(monkeypatch, caplog):
+    class Body:
+        def read(self):
+            return json.dumps({"content": [{"text": "{}"}], "usage": {"input_tokens": 321, "output_tokens": 9}})
+
+    class Client:
+        def invoke_model(self, **kwargs):
+            return {"body": Body()}
+
+    monkeypatch.setattr(llm_client, "get_client", lambda *a, **k: Client())
+    with caplog.at_level(logging.INFO, logger=llm_client.__name__):
+        llm_client._invoke_bedrock_one("us-east-1", "m", build_prompt("rds by engine"))
+    usage = json.loads(caplog.records[-1].getMessage())
+    assert usage["input_tokens"] == 321 and usage["output_tokens"] == 9
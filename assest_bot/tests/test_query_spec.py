@@ -42,3 +42,43 @@ def test_validate_and_build_spec_invalid_resource():
     spec, err = validate_and_build_spec(data)
     assert spec is None
     assert "Invalid resource" in err
+
+
+def test_validate_and_build_spec_pivot():
+    data = {
+        "resource": "rds_instance",
+        "output_format": "pivot",
+        "pivot": {"rows": ["owner"], "columns": ["engine"], "agg": "COUNT"},
+    }
+    spec, err = validate_and_build_spec(data)
+    assert err is None
+    assert spec.pivot.rows == ["owner"]
+    assert spec.pivot.columns == ["engine"]
+    assert spec.pivot.value is None
+    assert spec.pivot.agg == "count"
+
+
+def test_validate_and_build_spec_aggregates():
+    data = {
+        "resource": "rds_instance",
+        "select": ["engine"],
+        "aggregates": [{"func": "count distinct", "field": "owner"}, {"func": "sum", "field": "size", "alias": "total"}],
+        "group_by": ["engine"],
+    }
+    spec, err = validate_and_build_spec(data)
+    assert err is None
+    assert [(a.func, a.field, a.alias) for a in spec.aggregates] == [
+        ("count_distinct", "owner", "count_distinct_owner"),
+        ("sum", "size", "total"),
+    ]
+
+
+def test_validate_and_build_spec_literal_count_becomes_aggregate():
+    data = {"resource": "ec2_instance", "select": ["region", "count"], "group_by": ["region"]}
+    spec, err = validate_and_build_spec(data)
+    assert err is None
+    assert spec.select == ["region"]
+    assert spec.aggregates[0].func == "count"
+    spec, err = validate_and_build_spec({"resource": "ec2_instance", "aggregates": [{"func": "median"}]})
+    assert spec is None
+    assert "Invalid aggregate" in err
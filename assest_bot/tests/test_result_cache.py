@@ -0,0 +1,36 @@
+"""Tests for query result cache."""
+from src.executor.result_cache import ResultCache
+from src.shared.models import ExecutorResult
+
+
+def _result(n: int) -> ExecutorResult:
+    return ExecutorResult(columns=["n"], rows=[[n]])
+
+
+def test_result_cache_hit_by_sql_and_params():
+    cache = ResultCache(max_entries=8)
+    sql = 'SELECT "account_id" FROM aws_accounts WHERE "department" = %s LIMIT 100'
+    cache.put("aws_account", sql, ["Finance"], _result(1), ttl=60)
+    assert cache.get(sql, ["Finance"]).rows == [[1]]
+    assert cache.get(sql, ["HR"]) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_result_cache_lru_and_errors():
+    cache = ResultCache(max_entries=2)
+    cache.put("ec2_instance", "q1", [], _result(1), ttl=60)
+    cache.put("ec2_instance", "q2", [], _result(2), ttl=60)
+    cache.get("q1", [])
+    cache.put("ec2_instance", "q3", [], _result(3), ttl=60)
+    assert cache.get("q2", []) is None
+    cache.put("ec2_instance", "q4", [], ExecutorResult(columns=[], rows=[], error="boom"), ttl=60)
+    assert cache.get("q4", []) is None
+
+
+def test_result_cache_invalidate_resource():
+    cache = ResultCache()
+    cache.put("ec2_instance", "q1", [], _result(1), ttl=60)
+    cache.put("aws_account", "q2", [], _result(2), ttl=60)
+    assert cache.invalidate_resource("ec2_instance") == 1
+    assert cache.get("q1", []) is None
+    assert cache.get("q2", []) is not None
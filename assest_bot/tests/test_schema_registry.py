@@ -0,0 +1,59 @@
+"""Tests for the schema registry (column whitelist, index hints)."""
+import pytest
+
+from src.executor.spec_to_sql import spec_to_sql
+from src.orchestrator.query_spec import validate_and_build_spec
+from src.shared.models import AggregateSpec, FilterSpec, QuerySpec
+from src.shared.schema_registry import get_registry
+
+
+def test_registry_loads_resource_tables():
+    reg = get_registry()
+    rds = reg.resource("rds_instance")
+    assert rds.table == "rds_instances"
+    assert "engine" in rds.columns and "engine" in rds.indexed
+    assert rds.quote("engine") == '"engine"'
+    with pytest.raises(ValueError, match="Unknown column"):
+        rds.quote("department")
+
+
+def test_validate_rejects_unknown_column():
+    spec, err = validate_and_build_spec({"resource": "rds_instance", "select": ["engine", "cost"]})
+    assert spec is None
+    assert "Unknown columns for rds_instance" in err and "cost" in err
+
+
+def test_validate_allows_aggregate_alias_in_filters_and_order():
+    spec, err = validate_and_build_spec({
+        "resource": "rds_instance",
+        "select": ["engine", "n"],
+        "aggregates": [{"func": "count", "alias": "n"}],
+        "group_by": ["engine"],
+        "filters": [{"field": "n", "op": ">", "value": 5}],
+        "order_by": ["n desc"],
+    })
+    assert err is None
+    assert spec.aggregates[0].alias == "n"
+
+
+def test_spec_to_sql_rejects_unknown_column():
+    with pytest.raises(ValueError, match="Unknown column"):
+        spec_to_sql(QuerySpec(resource="ec2_instance", select=["instance_id", "password"]))
+
+
+def test_unindexed_filters_only_when_no_indexed_filter():
+    reg = get_registry()
+    scan = QuerySpec(resource="rds_instance", filters=[FilterSpec(field="size", op="=", value="large")])
+    assert reg.unindexed_filters(scan) == ["size"]
+    mixed = QuerySpec(
+        resource="rds_instance",
+        filters=[FilterSpec(field="size", op="=", value="large"), FilterSpec(field="engine", op="=", value="postgres")],
+    )
+    assert reg.unindexed_filters(mixed) == []
+    having = QuerySpec(
+        resource="rds_instance",
+        aggregates=[AggregateSpec(func="count", alias="n")],
+        group_by=["engine"],
+        filters=[FilterSpec(field="n", op=">", value=1)],
+    )
+    assert reg.unindexed_filters(having) == []
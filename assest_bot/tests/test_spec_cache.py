@@ -0,0 +1,46 @@
+"""Tests for QuerySpec cache."""
+from src.orchestrator.spec_cache import MemoryBackend, SpecCache, SqliteBackend, normalize_question
+
+
+def test_normalize_question():
+    assert normalize_question("  Show Finance   AWS accounts? ") == "show finance aws accounts"
+    assert normalize_question("显示财务部的AWS账号？") == normalize_question("显示财务部的aws账号")
+    assert normalize_question("RDS version 14.3.") == "rds version 14.3"
+
+
+def test_normalize_question_keeps_comparison_operators():
+    assert normalize_question("rds size > 100") != normalize_question("rds size < 100")
+    assert normalize_question("accounts department != Finance") != normalize_question("accounts department = Finance")
+    assert normalize_question("rds size>100") == normalize_question("rds size > 100")
+    assert normalize_question("show accounts!") == "show accounts"
+
+
+def test_memory_backend_lru_and_ttl():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", {"v": 1}, ttl=60)
+    backend.set("b", {"v": 2}, ttl=60)
+    backend.get("a")
+    backend.set("c", {"v": 3}, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1}
+    backend.set("d", {"v": 4}, ttl=-1)
+    assert backend.get("d") is None
+
+
+def test_sqlite_backend(tmp_path):
+    backend = SqliteBackend(str(tmp_path / "cache.db"), max_entries=2)
+    backend.set("a", {"v": 1}, ttl=60)
+    backend.set("b", {"v": 2}, ttl=60)
+    backend.set("c", {"v": 3}, ttl=60)
+    assert backend.get("c") == {"v": 3}
+    assert [backend.get(k) is None for k in ("a", "b")].count(True) == 1
+
+
+def test_spec_cache_hit_rate():
+    cache = SpecCache(MemoryBackend(), ttl_seconds=60)
+    assert cache.get("Show Finance AWS accounts", "m1") is None
+    cache.put("Show Finance AWS accounts", {"decision": "executable"}, "m1")
+    assert cache.get("show finance aws accounts!", "m1") == {"decision": "executable"}
+    assert cache.get("show finance aws accounts", "m2") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
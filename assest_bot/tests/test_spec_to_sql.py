@@ -1,8 +1,9 @@
 """Tests for Spec -> SQL translation."""
 import pytest
 
-from src.executor.spec_to_sql import spec_to_sql
-from src.shared.models import FilterSpec, QuerySpec
+from src.executor.plan_cache import get_plan_cache
+from src.executor.spec_to_sql import compile_spec, spec_to_sql
+from src.shared.models import AggregateSpec, FilterSpec, QuerySpec
 
 
 def test_spec_to_sql_simple():
@@ -32,3 +33,64 @@ def test_spec_to_sql_invalid_resource():
     spec = QuerySpec(resource="unknown")
     with pytest.raises(ValueError, match="Unknown resource"):
         spec_to_sql(spec)
+
+
+def test_spec_to_sql_aggregates_group_by():
+    spec = QuerySpec(
+        resource="ec2_instance",
+        select=["region"],
+        aggregates=[AggregateSpec(func="count", alias="count"), AggregateSpec(func="count_distinct", field="owner", alias="owners")],
+        group_by=["region"],
+        order_by=["count desc"],
+    )
+    sql, params = spec_to_sql(spec)
+    assert sql.startswith('SELECT "region", COUNT(*) AS "count", COUNT(DISTINCT "owner") AS "owners" FROM ec2_instances')
+    assert 'GROUP BY "region"' in sql
+    assert 'ORDER BY "count" DESC' in sql
+    assert params == []
+
+
+def test_spec_to_sql_having_on_aggregate_alias():
+    spec = QuerySpec(
+        resource="rds_instance",
+        filters=[FilterSpec(field="engine", op="=", value="postgres"), FilterSpec(field="count", op=">", value=5)],
+        aggregates=[AggregateSpec(func="count", alias="count")],
+        group_by=["owner"],
+    )
+    sql, params = spec_to_sql(spec)
+    assert 'WHERE "engine" = %s' in sql
+    assert 'GROUP BY "owner" HAVING COUNT(*) > %s' in sql
+    assert params == ["postgres", 5]
+
+
+def test_spec_to_sql_ungrouped_column():
+    spec = QuerySpec(
+        resource="ec2_instance",
+        select=["region", "owner"],
+        aggregates=[AggregateSpec(func="count", alias="count")],
+        group_by=["region"],
+    )
+    with pytest.raises(ValueError, match="group_by"):
+        spec_to_sql(spec)
+
+
+def test_compile_spec_reuses_plan_for_same_shape():
+    cache = get_plan_cache()
+    before = cache.stats()["hits"]
+
+    def spec(owner, regions):
+        return QuerySpec(
+            resource="ec2_instance",
+            filters=[FilterSpec(field="owner", op="=", value=owner), FilterSpec(field="region", op="in", value=regions)],
+            select=["instance_id"],
+        )
+
+    plan1, params1 = compile_spec(spec("Finance", ["us-east-1", "us-west-2"]))
+    plan2, params2 = compile_spec(spec("HR", ["eu-west-1", "eu-central-1"]))
+    plan3, _ = compile_spec(spec("HR", ["eu-west-1"]))
+    assert plan1 is plan2
+    assert plan3 is not plan1
+    assert params2 == ["HR", "eu-west-1", "eu-central-1"]
+    assert cache.stats()["hits"] == before + 1
+    assert plan1.prepare_sql.endswith('WHERE "owner" = $1 AND "region" IN ($2, $3) LIMIT 100')
+    assert plan1.n_params == 3
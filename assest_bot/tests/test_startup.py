@@ -0,0 +1,30 @@
+"""Tests for the cold-start profile."""
+import json
+import logging
+
+from src.shared import startup
+
+
+def test_cold_start_report_after_mark_ready():
+    startup.mark_ready()
+    report = startup.cold_start_report()
+    assert report["event"] == "cold_start"
+    assert report["init_ms"] is not None and report["init_ms"] >= 0
+    assert isinstance(report["imports"], list)
+
+
+def test_log_cold_start_once(monkeypatch, caplog):
+    monkeypatch.setenv("STARTUP_PROFILE", "1")
+    monkeypatch.setattr(startup, "_logged", False)
+    with caplog.at_level(logging.INFO, logger=startup.__name__):
+        startup.log_cold_start_once()
+        startup.log_cold_start_once()
+    lines = [r.getMessage() for r in caplog.records if r.name == startup.__name__]
+    assert len(lines) == 1
+    assert json.loads(lines[0])["event"] == "cold_start"
+
+
+def test_importtime_report():
+    report = startup.importtime_report("src.shared.schema_registry", top=3)
+    assert report["import_ms"] is not None and report["import_ms"] > 0
+    assert len(report["slowest"]) <= 3
@@ -0,0 +1,67 @@
+"""Tests for request tracing."""
+import asyncio
+
+from src.orchestrator import handler as orchestrator
+from src.shared.models import ExecutorResult
+from src.shared.tracing import current_trace, emf_document, span, trace
+
+
+def test_span_outside_trace_is_noop():
+    with span("db") as s:
+        s.set(rows=3)
+    assert current_trace() is None
+
+
+def test_trace_records_spans_and_stage_totals():
+    with trace("query") as t:
+        with span("db") as s:
+            s.set(rows=3)
+        with span("db") as s:
+            s.set(rows=2)
+        with trace("query"):  # nested: joins the outer trace
+            with span("format"):
+                pass
+    data = t.to_dict()
+    assert [s["name"] for s in data["spans"]] == ["db", "db", "format"]
+    assert set(data["stages_ms"]) == {"db", "format"}
+    doc = emf_document(t)
+    metrics = {m["Name"] for m in doc["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+    assert {"total_ms", "db_ms", "format_ms", "rows"} <= metrics
+    assert doc["rows"] == 5 and doc["Operation"] == "query"
+
+
+def test_concurrent_traces_do_not_mix():
+    async def one(name):
+        with trace(name) as t:
+            with span(name):
+                await asyncio.sleep(0.01)
+        return t
+
+    async def main():
+        return await asyncio.gather(one("a"), one("b"))
+
+    a, b = asyncio.run(main())
+    assert [s.name for s in a.spans] == ["a"]
+    assert [s.name for s in b.spans] == ["b"]
+
+
+def test_debug_field(monkeypatch):
+    monkeypatch.setenv("TRACE_DEBUG_FIELD", "1")
+    monkeypatch.setattr(
+        "src.executor.handler.execute_query_raw",
+        lambda sql, params, config=None, plan=None: ExecutorResult(columns=["region", "count"], rows=[("us-east-1", 3)]),
+    )
+    monkeypatch.setattr("src.executor.handler.get_result_cache", lambda: None)
+    status, body = orchestrator.handle_question("how many ec2 instances by region", debug=True)
+    assert status == 200
+    stages = body["debug"]["stages_ms"]
+    assert {"fast_path", "compile", "db", "format"} <= set(stages)
+    db = next(s for s in body["debug"]["spans"] if s["name"] == "db")
+    assert db["rows"] == 1
+
+    _, plain = orchestrator.handle_question("how many ec2 instances by region")
+    assert "debug" not in plain
+
+    monkeypatch.delenv("TRACE_DEBUG_FIELD")  # off by default: clients cannot ask for internals
+    _, body = orchestrator.handle_question("how many ec2 instances by region", debug=True)
+    assert "debug" not in body
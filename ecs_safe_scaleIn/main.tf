@@ -59,10 +59,15 @@ data "aws_iam_policy_document" "scale_manager_policy" {
   }
 
   statement {
-    actions   = ["dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:GetItem", "dynamodb:Query"]
+    actions   = ["dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:GetItem", "dynamodb:BatchGetItem", "dynamodb:Query"]
     resources = [aws_dynamodb_table.drain_states.arn, "${aws_dynamodb_table.drain_states.arn}/index/*"]
   }
 
+  statement {
+    actions   = ["sqs:ReceiveMessage", "sqs:DeleteMessage", "sqs:GetQueueAttributes"]
+    resources = [aws_sqs_queue.scale_in_attempts.arn]
+  }
+
   statement {
     actions   = ["cloudwatch:PutMetricData"]
     resources = ["*"]
@@ -157,6 +162,19 @@ data "archive_file" "scaler_zip" {
   output_path = "${path.module}/dist/scaler.zip"
 }
 
+data "archive_file" "shared_layer_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/src/shared"
+  output_path = "${path.module}/dist/shared_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "shared" {
+  layer_name          = "${local.name_prefix}-shared"
+  filename            = data.archive_file.shared_layer_zip.output_path
+  source_code_hash    = data.archive_file.shared_layer_zip.output_base64sha256
+  compatible_runtimes = ["python3.12"]
+}
+
 resource "aws_lambda_function" "scale_manager" {
   function_name = "${local.name_prefix}-scale-manager"
   role          = aws_iam_role.scale_manager_role.arn
@@ -164,6 +182,7 @@ resource "aws_lambda_function" "scale_manager" {
   runtime       = "python3.12"
   filename      = data.archive_file.scale_manager_zip.output_path
   timeout       = 60
+  layers        = [aws_lambda_layer_version.shared.arn]
   environment {
     variables = {
       TABLE_NAME               = aws_dynamodb_table.drain_states.name
@@ -176,6 +195,10 @@ resource "aws_lambda_function" "scale_manager" {
       SHARED_TOKEN             = var.shared_token
       COOLDOWN_SECONDS         = "900"
       MAX_DRAINS_PER_HOUR      = "2"
+      BATCH_MAX_PARALLEL_DRAINS = tostring(var.batch_max_parallel_drains)
+      LOAD_AWARE_SELECTION     = tostring(var.load_aware_selection)
+      ASTERISK_CALLS_PATH      = var.asterisk_calls_path
+      METRICS_MODE             = var.metrics_mode
     }
   }
 }
@@ -187,10 +210,12 @@ resource "aws_lambda_function" "scaler" {
   runtime       = "python3.12"
   filename      = data.archive_file.scaler_zip.output_path
   timeout       = 60
+  layers        = [aws_lambda_layer_version.shared.arn]
   environment {
     variables = {
       TABLE_NAME            = aws_dynamodb_table.drain_states.name
       SHARED_TOKEN          = var.shared_token
+      METRICS_MODE          = var.metrics_mode
     }
   }
 }
@@ -230,7 +255,45 @@ resource "aws_cloudwatch_event_rule" "protected_scale_in_attempt" {
 resource "aws_cloudwatch_event_target" "protected_scale_in_target" {
   rule      = aws_cloudwatch_event_rule.protected_scale_in_attempt.name
   target_id = "scale-manager"
-  arn       = aws_lambda_function.scale_manager.arn
+  arn       = var.batch_planning_enabled ? aws_sqs_queue.scale_in_attempts.arn : aws_lambda_function.scale_manager.arn
+}
+
+# Batch planning: scale-in attempts are buffered in SQS and delivered to the
+# scale manager in batches (one invocation per window instead of one per task)
+resource "aws_sqs_queue" "scale_in_attempts" {
+  name                       = "${local.name_prefix}-scale-in-attempts"
+  visibility_timeout_seconds = 360
+  message_retention_seconds  = 3600
+}
+
+data "aws_iam_policy_document" "scale_in_attempts_queue" {
+  statement {
+    actions   = ["sqs:SendMessage"]
+    resources = [aws_sqs_queue.scale_in_attempts.arn]
+    principals {
+      type        = "Service"
+      identifiers = ["events.amazonaws.com"]
+    }
+    condition {
+      test     = "ArnEquals"
+      variable = "aws:SourceArn"
+      values   = [aws_cloudwatch_event_rule.protected_scale_in_attempt.arn]
+    }
+  }
+}
+
+resource "aws_sqs_queue_policy" "scale_in_attempts" {
+  queue_url = aws_sqs_queue.scale_in_attempts.id
+  policy    = data.aws_iam_policy_document.scale_in_attempts_queue.json
+}
+
+resource "aws_lambda_event_source_mapping" "scale_in_attempts" {
+  count                              = var.batch_planning_enabled ? 1 : 0
+  event_source_arn                   = aws_sqs_queue.scale_in_attempts.arn
+  function_name                      = aws_lambda_function.scale_manager.arn
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = var.batch_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
 }
 
 
@@ -1,11 +1,15 @@
 import json
 import os
 import time
+import random
 import hashlib
 import urllib.request
 import boto3
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from botocore.config import Config
 from botocore.exceptions import ClientError, BotoCoreError
+from scalein_metrics import MetricsBuffer  # shared metrics layer (src/shared)
 from typing import Dict, Any, Optional, Tuple
 
 # Environment variables
@@ -19,19 +23,70 @@ SCALER_FUNCTION_URL = os.environ["SCALER_FUNCTION_URL"]
 SHARED_TOKEN = os.environ["SHARED_TOKEN"]
 COOLDOWN_SECONDS = int(os.environ.get("COOLDOWN_SECONDS", "900"))  # 15 minutes
 MAX_DRAINS_PER_HOUR = int(os.environ.get("MAX_DRAINS_PER_HOUR", "2"))
+ADMISSION_MAX_ATTEMPTS = int(os.environ.get("ADMISSION_MAX_ATTEMPTS", "3"))
+# A full counter is recounted from the task items once no reservation can still be in flight
+RESYNC_GRACE_SECONDS = int(os.environ.get("RESYNC_GRACE_SECONDS", "300"))
+
+# Drain start: Kamailio and Asterisk are called concurrently, retried with jittered
+# backoff, and both must succeed before the invocation deadline minus this reserve
+# (kept for the rollback).
+DRAIN_START_MAX_ATTEMPTS = int(os.environ.get("DRAIN_START_MAX_ATTEMPTS", "3"))
+DRAIN_START_RESERVE_SECONDS = float(os.environ.get("DRAIN_START_RESERVE_SECONDS", "5"))
+DRAIN_START_CALL_TIMEOUT_SECONDS = float(os.environ.get("DRAIN_START_CALL_TIMEOUT_SECONDS", "10"))
+BACKOFF_BASE_SECONDS = float(os.environ.get("BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_CAP_SECONDS = float(os.environ.get("BACKOFF_CAP_SECONDS", "4"))
+LAMBDA_CONNECT_TIMEOUT_SECONDS = 3
+# Optional undo actions for the rollback (empty = not supported by the target; logged)
+KAMAILIO_ROLLBACK_ACTION = os.environ.get("KAMAILIO_ROLLBACK_ACTION", "")
+ASTERISK_CANCEL_PATH = os.environ.get("ASTERISK_CANCEL_PATH", "")
+
+# Load-aware selection: drain the service's task with the fewest live calls
+# (GET ASTERISK_CALLS_PATH on each task, concurrently) instead of the event's task
+LOAD_AWARE_SELECTION = os.environ.get("LOAD_AWARE_SELECTION", "false").lower() == "true"
+ASTERISK_CALLS_PATH = os.environ.get("ASTERISK_CALLS_PATH", "/calls/active")
+CALL_COUNT_TIMEOUT_SECONDS = float(os.environ.get("CALL_COUNT_TIMEOUT_SECONDS", "2"))
+CALL_COUNT_MAX_PARALLEL = int(os.environ.get("CALL_COUNT_MAX_PARALLEL", "16"))
+BATCH_GET_MAX = 100
+
+# Batch planning (SQS-buffered events): drains started in parallel per invocation, API page sizes
+BATCH_MAX_PARALLEL_DRAINS = int(os.environ.get("BATCH_MAX_PARALLEL_DRAINS", "4"))
+DESCRIBE_TASKS_MAX = 100
+DESCRIBE_SERVICES_MAX = 10
+DESCRIBE_SCALABLE_TARGETS_MAX = 50
+
+# Per-service counter item, stored in the same table under this key prefix.
+# It carries no serviceArn/state attributes, so it stays out of service-state-index.
+SERVICE_KEY_PREFIX = "SERVICE#"
+HOUR_SECONDS = 3600
 
 # AWS clients
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(TABLE_NAME)
 ecs = boto3.client("ecs")
-cloudwatch = boto3.client("cloudwatch")
 appscaling = boto3.client("application-autoscaling")
-lambda_client = boto3.client("lambda")
+# Retries are done by the drain-start coordinator under its deadline, not by botocore
+lambda_client = boto3.client(
+    "lambda",
+    config=Config(
+        connect_timeout=LAMBDA_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=DRAIN_START_CALL_TIMEOUT_SECONDS,
+        retries={"max_attempts": 1},
+    ),
+)
+# The client's timeouts are fixed, so a Kamailio attempt only starts when a full call fits before the deadline
+LAMBDA_CALL_MAX_SECONDS = LAMBDA_CONNECT_TIMEOUT_SECONDS + DRAIN_START_CALL_TIMEOUT_SECONDS
+# Batch mode drains several tasks at once; each drain uses two drain-start workers
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_PARALLEL_DRAINS)
+drain_start_executor = ThreadPoolExecutor(max_workers=2 * BATCH_MAX_PARALLEL_DRAINS)
+call_count_executor = ThreadPoolExecutor(max_workers=CALL_COUNT_MAX_PARALLEL)
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Datapoints are buffered and written once per invocation (EMF log lines by default)
+metrics = MetricsBuffer.from_env()
+
 
 def _now() -> int:
     return int(time.time())
@@ -42,60 +97,182 @@ def _hash_id(s: str) -> str:
 
 
 def _put_metric(metric_name: str, value: float, unit: str = "Count", dimensions: Optional[Dict] = None):
-    """Put custom CloudWatch metric"""
+    """Buffer custom CloudWatch metric (written when the handler returns)"""
+    metrics.put(metric_name, value, unit, dimensions)
+
+
+def _service_key(service_arn: str) -> Dict[str, str]:
+    return {"taskArn": f"{SERVICE_KEY_PREFIX}{service_arn}"}
+
+
+def _get_service_state(service_arn: str) -> Dict[str, Any]:
+    """Counter item for the service (one consistent get_item); seeded from drain history on first use"""
+    item = table.get_item(Key=_service_key(service_arn), ConsistentRead=True).get("Item")
+    if item is None:
+        item = _bootstrap_service_state(service_arn)
+    state = {
+        "lastDrainAt": int(item.get("lastDrainAt", 0)),
+        "drainTimes": [int(t) for t in item.get("drainTimes", [])],
+        "drainingCount": int(item.get("drainingCount", 0)),
+        "version": int(item.get("version", 0)),
+    }
+    if state["drainingCount"] >= DRAIN_CONCURRENCY_LIMIT:
+        state = _resync_draining_count(service_arn, state)
+    return state
+
+
+def _count_draining_tasks(service_arn: str) -> int:
+    kwargs = {
+        "IndexName": "service-state-index",
+        "KeyConditionExpression": (
+            boto3.dynamodb.conditions.Key("serviceArn").eq(service_arn)
+            & boto3.dynamodb.conditions.Key("state").eq("DRAINING")
+        ),
+        "Select": "COUNT",
+    }
+    count = 0
+    while True:
+        resp = table.query(**kwargs)
+        count += resp.get("Count", 0)
+        if "LastEvaluatedKey" not in resp:
+            return count
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def _resync_draining_count(service_arn: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Self-heal a leaked slot (an invocation died between reserving and releasing it): recount
+    the DRAINING task items and lower drainingCount to match. Skipped while a reservation made
+    within RESYNC_GRACE_SECONDS may still be before its DRAINING mark.
+    """
+    if state["lastDrainAt"] >= _now() - RESYNC_GRACE_SECONDS:
+        return state
+    actual = _count_draining_tasks(service_arn)
+    if actual >= state["drainingCount"]:
+        return state
     try:
-        cloudwatch.put_metric_data(
-            Namespace="ECS/SafeScaleIn",
-            MetricData=[{
-                "MetricName": metric_name,
-                "Value": value,
-                "Unit": unit,
-                "Dimensions": dimensions or []
-            }]
+        table.update_item(
+            Key=_service_key(service_arn),
+            UpdateExpression="SET drainingCount=:c, version=:next",
+            ConditionExpression="version = :v",
+            ExpressionAttributeValues={":c": actual, ":v": state["version"], ":next": state["version"] + 1},
         )
-    except Exception as e:
-        logger.warning(f"Failed to put metric {metric_name}: {e}")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return state  # changed concurrently; the next event re-checks
+    logger.warning(f"drainingCount for {service_arn} resynced from {state['drainingCount']} to {actual}")
+    _put_metric("DrainSlotResynced", state["drainingCount"] - actual, dimensions=[{"Name": "ServiceArn", "Value": service_arn}])
+    return {**state, "drainingCount": actual, "version": state["version"] + 1}
+
+
+def _bootstrap_service_state(service_arn: str) -> Dict[str, Any]:
+    """Create the counter item from the per-task items (one paginated index pass, once per service)"""
+    hour_ago = _now() - HOUR_SECONDS
+    item = {**_service_key(service_arn), "lastDrainAt": 0, "drainTimes": [], "drainingCount": 0, "version": 0}
+    kwargs = {
+        "IndexName": "service-state-index",
+        "KeyConditionExpression": boto3.dynamodb.conditions.Key("serviceArn").eq(service_arn),
+        "ProjectionExpression": "#s, startedAt",
+        "ExpressionAttributeNames": {"#s": "state"},
+    }
+    while True:
+        resp = table.query(**kwargs)
+        for it in resp.get("Items", []):
+            started = int(it.get("startedAt", 0))
+            item["lastDrainAt"] = max(item["lastDrainAt"], started)
+            if started >= hour_ago:
+                item["drainTimes"].append(started)
+            if it.get("state") == "DRAINING":
+                item["drainingCount"] += 1
+        if "LastEvaluatedKey" not in resp:
+            break
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    try:
+        table.put_item(Item=item, ConditionExpression="attribute_not_exists(taskArn)")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        # Another invocation created it first
+        item = table.get_item(Key=_service_key(service_arn), ConsistentRead=True)["Item"]
+    return item
+
+
+def _admission_block_reason(state: Dict[str, Any]) -> Optional[str]:
+    """Cooldown, hourly limit and concurrency limit, evaluated on the counter item"""
+    now = _now()
+    if state["lastDrainAt"] >= now - COOLDOWN_SECONDS:
+        return "cooldown"
+    if len([t for t in state["drainTimes"] if t >= now - HOUR_SECONDS]) >= MAX_DRAINS_PER_HOUR:
+        return "hourly_limit"
+    if state["drainingCount"] >= DRAIN_CONCURRENCY_LIMIT:
+        return "concurrency_limit"
+    return None
 
 
-def _check_cooldown(service_arn: str) -> bool:
-    """Check if service is in cooldown period"""
-    try:
-        # Check for recent drain activity
-        cutoff_time = _now() - COOLDOWN_SECONDS
-        resp = table.query(
-            IndexName="service-state-index",
-            KeyConditionExpression=boto3.dynamodb.conditions.Key("serviceArn").eq(service_arn),
-            FilterExpression=boto3.dynamodb.conditions.Attr("startedAt").gte(cutoff_time)
-        )
-        recent_drains = len(resp.get("Items", []))
-        return recent_drains > 0
-    except Exception as e:
-        logger.error(f"Failed to check cooldown for {service_arn}: {e}")
-        return True  # Fail safe - assume in cooldown
+def _reserve_drain_slots(service_arn: str, state: Dict[str, Any], wanted: int = 1) -> Tuple[Optional[str], int, int]:
+    """
+    Atomically record up to `wanted` drain starts on the counter item (as many as the hourly
+    and concurrency limits allow). The update is conditional on the version read, so concurrent
+    scale-in events cannot both pass the checks; on a conflict the item is re-read and re-checked.
+    Returns (block reason or None, slots granted, draining count after the update).
+    """
+    for attempt in range(ADMISSION_MAX_ATTEMPTS):
+        reason = _admission_block_reason(state)
+        if reason:
+            return reason, 0, state["drainingCount"]
+        now = _now()
+        recent = [t for t in state["drainTimes"] if t >= now - HOUR_SECONDS]
+        granted = min(wanted, DRAIN_CONCURRENCY_LIMIT - state["drainingCount"], MAX_DRAINS_PER_HOUR - len(recent))
+        try:
+            resp = table.update_item(
+                Key=_service_key(service_arn),
+                UpdateExpression=(
+                    "SET lastDrainAt=:now, drainTimes=:times, "
+                    "drainingCount=if_not_exists(drainingCount, :zero) + :n, version=:next"
+                ),
+                ConditionExpression="version = :v AND (attribute_not_exists(drainingCount) OR drainingCount <= :max_before)",
+                ExpressionAttributeValues={
+                    ":now": now,
+                    ":times": recent + [now] * granted,
+                    ":zero": 0,
+                    ":n": granted,
+                    ":v": state["version"],
+                    ":next": state["version"] + 1,
+                    ":max_before": DRAIN_CONCURRENCY_LIMIT - granted,
+                },
+                ReturnValues="UPDATED_NEW",
+            )
+            return None, granted, int(resp["Attributes"]["drainingCount"])
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            logger.info(f"Drain admission for {service_arn} raced another event, attempt {attempt + 1}")
+            state = _get_service_state(service_arn)
+    return "contended", 0, state["drainingCount"]
 
 
-def _check_hourly_limit(service_arn: str) -> bool:
-    """Check if service has exceeded hourly drain limit"""
+def _release_drain_slot(service_arn: str, count: int = 1):
+    """Give back reserved slots (drain not started); cooldown/hourly history is kept"""
     try:
-        hour_ago = _now() - 3600
-        resp = table.query(
-            IndexName="service-state-index",
-            KeyConditionExpression=boto3.dynamodb.conditions.Key("serviceArn").eq(service_arn),
-            FilterExpression=boto3.dynamodb.conditions.Attr("startedAt").gte(hour_ago)
+        table.update_item(
+            Key=_service_key(service_arn),
+            UpdateExpression="ADD drainingCount :minus",
+            ConditionExpression="drainingCount >= :count",
+            ExpressionAttributeValues={":minus": -count, ":count": count},
         )
-        hourly_drains = len(resp.get("Items", []))
-        return hourly_drains >= MAX_DRAINS_PER_HOUR
-    except Exception as e:
-        logger.error(f"Failed to check hourly limit for {service_arn}: {e}")
-        return True  # Fail safe - assume limit reached
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            logger.error(f"Failed to release drain slot for {service_arn}: {e}")
 
 
 def _get_running_tasks(cluster_arn: str, service_arn: str) -> list:
-    task_arns = ecs.list_tasks(cluster=cluster_arn, serviceName=service_arn).get("taskArns", [])
+    task_arns = []
+    for page in ecs.get_paginator("list_tasks").paginate(cluster=cluster_arn, serviceName=service_arn, desiredStatus="RUNNING"):
+        task_arns += page.get("taskArns", [])
     if not task_arns:
         return []
-    desc = ecs.describe_tasks(cluster=cluster_arn, tasks=task_arns)
-    return desc.get("tasks", [])
+    return _describe_tasks_bulk(cluster_arn, task_arns)
 
 
 def _get_task_ip(task: dict) -> str:
@@ -107,58 +284,125 @@ def _get_task_ip(task: dict) -> str:
     return None
 
 
-def _current_draining_count(service_arn: str) -> int:
-    resp = table.query(
-        IndexName="service-state-index",
-        KeyConditionExpression=boto3.dynamodb.conditions.Key("serviceArn").eq(service_arn)
-        & boto3.dynamodb.conditions.Key("state").eq("DRAINING")
-    )
-    return len(resp.get("Items", []))
+def _started_ts(task: dict) -> float:
+    started = task.get("startedAt", 0)
+    return started.timestamp() if hasattr(started, "timestamp") else float(started or 0)
+
+
+def _rank_candidates(tasks: list, active_calls: Optional[Dict[str, int]] = None) -> list:
+    """
+    RUNNING tasks, best drain candidate first: fewest active calls, then most recently started.
+    Tasks whose call count is unknown rank after those with a count.
+    """
+    calls = active_calls or {}
+    running = [t for t in tasks if t.get("lastStatus") == "RUNNING"]
+    return sorted(running, key=lambda t: (
+        active_calls is not None and t.get("taskArn") not in calls,
+        calls.get(t.get("taskArn"), 0),
+        -_started_ts(t),
+    ))
+
+
+def _get_task_states(task_arns: list) -> Dict[str, str]:
+    """{taskArn: state} for the tasks that have a drain_states item, with BatchGetItem (100 keys per call)"""
+    states = {}
+    for i in range(0, len(task_arns), BATCH_GET_MAX):
+        request = {TABLE_NAME: {
+            "Keys": [{"taskArn": arn} for arn in task_arns[i:i + BATCH_GET_MAX]],
+            "ProjectionExpression": "taskArn, #s",
+            "ExpressionAttributeNames": {"#s": "state"},
+            "ConsistentRead": True,
+        }}
+        for attempt in range(ADMISSION_MAX_ATTEMPTS):
+            resp = dynamodb.batch_get_item(RequestItems=request)
+            for item in resp.get("Responses", {}).get(TABLE_NAME, []):
+                states[item["taskArn"]] = item.get("state")
+            request = resp.get("UnprocessedKeys") or {}
+            if not request:
+                break
+            time.sleep(random.uniform(0, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        if request:
+            raise RuntimeError(f"BatchGetItem left {len(request[TABLE_NAME]['Keys'])} keys unprocessed")
+    return states
+
+
+def _get_active_calls(ip: str) -> Optional[int]:
+    """Live call count from the task's Asterisk HTTP API; None when it cannot be read"""
+    url = f"{ASTERISK_HTTP_SCHEME}://{ip}:{ASTERISK_HTTP_PORT}{ASTERISK_CALLS_PATH}"
+    try:
+        with urllib.request.urlopen(url, timeout=CALL_COUNT_TIMEOUT_SECONDS) as r:
+            data = json.loads(r.read().decode("utf-8"))
+        return int(data["activeCalls"] if isinstance(data, dict) else data)
+    except Exception as e:
+        logger.warning(f"Could not read active calls for {ip}: {e}")
+        return None
+
+
+def _poll_active_calls(tasks: list) -> Dict[str, int]:
+    """{taskArn: active calls}, polled concurrently; tasks that did not answer are left out"""
+    futures = {t["taskArn"]: call_count_executor.submit(_get_active_calls, _get_task_ip(t)) for t in tasks if _get_task_ip(t)}
+    calls = {arn: f.result() for arn, f in futures.items()}
+    return {arn: n for arn, n in calls.items() if n is not None}
 
 
 def _pick_task(tasks: list) -> dict:
-    # Strategy: pick the most recently started task that is not already draining
-    candidates = []
-    for t in tasks:
-        if t.get("lastStatus") != "RUNNING":
-            continue
-        task_arn = t.get("taskArn")
-        item = table.get_item(Key={"taskArn": task_arn}).get("Item")
-        if item and item.get("state") == "DRAINING":
-            continue
-        candidates.append(t)
+    # Strategy: among tasks not already draining, pick the one with the fewest live calls
+    # (most recently started on a tie)
+    states = _get_task_states([t["taskArn"] for t in tasks])
+    candidates = [t for t in _rank_candidates(tasks) if states.get(t["taskArn"]) != "DRAINING" and _get_task_ip(t)]
     if not candidates:
         return None
-    candidates.sort(key=lambda x: x.get("startedAt", 0), reverse=True)
-    return candidates[0]
+    ranked = _rank_candidates(candidates, _poll_active_calls(candidates))
+    return ranked[0]
 
 
-def _invoke_kamailio(ip: str, drain_id: str) -> bool:
-    """Invoke Kamailio Lambda with retry logic"""
-    payload = {"action": "comment_out_ip", "target_ip": ip, "drainId": drain_id}
-    max_retries = 3
-    
-    for attempt in range(max_retries):
+def _drain_deadline(context) -> float:
+    """Monotonic deadline for the drain start: the invocation's remaining time minus the rollback reserve"""
+    remaining = context.get_remaining_time_in_millis() / 1000.0 if context else 60.0
+    return time.monotonic() + remaining - DRAIN_START_RESERVE_SECONDS
+
+
+def _time_left(deadline: float) -> float:
+    return deadline - time.monotonic()
+
+
+def _retry_until(action: str, ip: str, attempt_fn, deadline: float, min_call_seconds: float = 0.0) -> bool:
+    """
+    Call attempt_fn(timeout) until it returns True, attempts run out or the deadline passes (full-jitter backoff).
+    An attempt only starts while at least min_call_seconds are left (for calls whose timeout cannot be set per call).
+    """
+    attempts = 0
+    while attempts < DRAIN_START_MAX_ATTEMPTS and _time_left(deadline) > min_call_seconds:
+        attempts += 1
         try:
-            response = lambda_client.invoke(
-                FunctionName=KAMAILIO_LAMBDA_ARN, 
-                InvocationType="Event", 
-                Payload=json.dumps(payload).encode("utf-8")
-            )
-            if response.get("StatusCode") == 202:
-                logger.info(f"Kamailio invocation successful for {ip}, attempt {attempt + 1}")
+            if attempt_fn(min(DRAIN_START_CALL_TIMEOUT_SECONDS, _time_left(deadline))):
+                logger.info(f"{action} successful for {ip}, attempt {attempts}")
                 return True
         except Exception as e:
-            logger.warning(f"Kamailio invocation failed for {ip}, attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-    
-    logger.error(f"Kamailio invocation failed after {max_retries} attempts for {ip}")
+            logger.warning(f"{action} failed for {ip}, attempt {attempts}: {e}")
+        if attempts < DRAIN_START_MAX_ATTEMPTS:
+            backoff = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempts))
+            time.sleep(max(0.0, min(backoff, _time_left(deadline))))
+    logger.error(f"{action} failed after {attempts} attempts for {ip}")
+    return False
+
+
+def _invoke_kamailio(ip: str, drain_id: str, deadline: float) -> bool:
+    """Invoke Kamailio Lambda with retry logic"""
+    payload = json.dumps({"action": "comment_out_ip", "target_ip": ip, "drainId": drain_id}).encode("utf-8")
+
+    def attempt(timeout: float) -> bool:
+        # timeout is not applied here: the client's own timeouts bound the call (see LAMBDA_CALL_MAX_SECONDS)
+        response = lambda_client.invoke(FunctionName=KAMAILIO_LAMBDA_ARN, InvocationType="Event", Payload=payload)
+        return response.get("StatusCode") == 202
+
+    if _retry_until("Kamailio invocation", ip, attempt, deadline, min_call_seconds=LAMBDA_CALL_MAX_SECONDS):
+        return True
     _put_metric("KamailioInvocationFailures", 1, dimensions=[{"Name": "TargetIP", "Value": ip}])
     return False
 
 
-def _call_asterisk_start(ip: str, task_arn: str, drain_id: str) -> bool:
+def _call_asterisk_start(ip: str, task_arn: str, drain_id: str, deadline: float) -> bool:
     """Call Asterisk drain start with retry logic"""
     url = f"{ASTERISK_HTTP_SCHEME}://{ip}:{ASTERISK_HTTP_PORT}/drain/start"
     body = json.dumps({
@@ -168,27 +412,272 @@ def _call_asterisk_start(ip: str, task_arn: str, drain_id: str) -> bool:
         "callbackUrl": SCALER_FUNCTION_URL,
         "token": SHARED_TOKEN,
     }).encode("utf-8")
-    
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
-            with urllib.request.urlopen(req, timeout=10) as r:
-                if r.status in (200, 202):
-                    logger.info(f"Asterisk drain start successful for {ip}, attempt {attempt + 1}")
-                    return True
-                else:
-                    logger.warning(f"Asterisk drain start HTTP {r.status} for {ip}, attempt {attempt + 1}")
-        except Exception as e:
-            logger.warning(f"Asterisk drain start failed for {ip}, attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-    
-    logger.error(f"Asterisk drain start failed after {max_retries} attempts for {ip}")
+
+    def attempt(timeout: float) -> bool:
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            if r.status in (200, 202):
+                return True
+            logger.warning(f"Asterisk drain start HTTP {r.status} for {ip}")
+            return False
+
+    if _retry_until("Asterisk drain start", ip, attempt, deadline):
+        return True
     _put_metric("AsteriskDrainStartFailures", 1, dimensions=[{"Name": "TargetIP", "Value": ip}])
     return False
 
 
+def _start_drain(ip: str, task_arn: str, drain_id: str, deadline: float) -> Dict[str, Optional[bool]]:
+    """
+    Remove the IP from Kamailio and start the Asterisk drain concurrently.
+    Returns {"kamailio": ok, "asterisk": ok}; None means still running at the deadline.
+    """
+    futures = {
+        "kamailio": drain_start_executor.submit(_invoke_kamailio, ip, drain_id, deadline),
+        "asterisk": drain_start_executor.submit(_call_asterisk_start, ip, task_arn, drain_id, deadline),
+    }
+    # Calls are bounded by the deadline; allow the last call's own timeout to expire
+    wait(futures.values(), timeout=max(0.0, _time_left(deadline)) + 1.0)
+    return {name: (f.result() if f.done() and not f.exception() else (False if f.done() else None)) for name, f in futures.items()}
+
+
+def _rollback_drain(task_arn: str, service_arn: str, ip: str, drain_id: str, outcome: Dict[str, Optional[bool]]):
+    """Single rollback for a failed drain start: task back to RUNNING, started actions undone (the caller releases the slot)"""
+    table.update_item(
+        Key={"taskArn": task_arn},
+        UpdateExpression="SET #s = :running",
+        ExpressionAttributeNames={"#s": "state"},
+        ExpressionAttributeValues={":running": "RUNNING"},
+    )
+    # An action that succeeded (or may still complete) is undone when the target supports it
+    if outcome["kamailio"] is not False:
+        _undo(
+            "kamailio",
+            ip,
+            KAMAILIO_ROLLBACK_ACTION,
+            lambda: lambda_client.invoke(
+                FunctionName=KAMAILIO_LAMBDA_ARN,
+                InvocationType="Event",
+                Payload=json.dumps({"action": KAMAILIO_ROLLBACK_ACTION, "target_ip": ip, "drainId": drain_id}).encode("utf-8"),
+            ),
+        )
+    if outcome["asterisk"] is not False:
+        _undo(
+            "asterisk",
+            ip,
+            ASTERISK_CANCEL_PATH,
+            lambda: urllib.request.urlopen(
+                urllib.request.Request(
+                    f"{ASTERISK_HTTP_SCHEME}://{ip}:{ASTERISK_HTTP_PORT}{ASTERISK_CANCEL_PATH}",
+                    data=json.dumps({"taskArn": task_arn, "drainId": drain_id, "token": SHARED_TOKEN}).encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                ),
+                timeout=DRAIN_START_RESERVE_SECONDS / 2,
+            ).close(),
+        )
+
+
+def _undo(target: str, ip: str, configured: str, call):
+    if not configured:
+        logger.warning(f"No rollback action configured for {target}; {ip} left as is")
+        _put_metric("DrainRollbackIncomplete", 1, dimensions=[{"Name": "Reason", "Value": f"{target}_not_undone"}])
+        return
+    try:
+        call()
+        logger.info(f"Rolled back {target} for {ip}")
+    except Exception as e:
+        logger.error(f"Rollback of {target} failed for {ip}: {e}")
+        _put_metric("DrainRollbackIncomplete", 1, dimensions=[{"Name": "Reason", "Value": f"{target}_undo_failed"}])
+
+
+def _drain_task(cluster_arn: str, service_arn: str, task_arn: str, ip: str, deadline: float) -> Dict[str, Any]:
+    """Drain one task whose slot is already reserved: DRAINING transition, drain start, rollback on failure"""
+    drain_id = _hash_id(f"{task_arn}:{_now()//600}")  # bucketed 10min id
+    logger.info(f"Processing task {task_arn} with IP {ip}, drainId: {drain_id}")
+
+    # The reserved slot is given back on every path that does not end with the task DRAINING
+    started = False
+    try:
+        # Transition Running -> DRAINING atomically
+        try:
+            table.update_item(
+                Key={"taskArn": task_arn},
+                UpdateExpression="SET #s = if_not_exists(#s, :running), serviceArn=:svc, drainId=:did, startedAt=:ts, clusterArn=:ca",
+                ConditionExpression="attribute_not_exists(#s) OR #s = :running",
+                ExpressionAttributeNames={"#s": "state"},
+                ExpressionAttributeValues={
+                    ":running": "RUNNING",
+                    ":svc": service_arn,
+                    ":did": drain_id,
+                    ":ts": _now(),
+                    ":ca": cluster_arn
+                },
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                logger.info(f"Task {task_arn} already being drained")
+                return {"status": "skipped", "reason": "already_draining", "taskArn": task_arn}
+            raise
+
+        # Remove IP from Kamailio distribution and start the Asterisk drain, concurrently
+        outcome = _start_drain(ip, task_arn, drain_id, deadline)
+        if outcome["asterisk"] and not outcome["kamailio"] and not ASTERISK_CANCEL_PATH:
+            # Asterisk is already draining and cannot be told to stop: rolling back would leave it
+            # draining with its callback rejected, so the task stays DRAINING (and keeps its slot)
+            logger.error(f"Kamailio removal failed for {task_arn} ({ip}) but Asterisk is draining; keeping DRAINING")
+            _put_metric("DrainStartPartial", 1, dimensions=[{"Name": "Reason", "Value": "kamailio_not_removed"}])
+        elif not all(outcome.values()):
+            if outcome["kamailio"] is False:
+                reason = "kamailio_failed"
+            elif outcome["asterisk"] is False:
+                reason = "asterisk_failed"
+            else:
+                reason = "drain_start_timeout"
+            logger.error(f"Drain start for {task_arn} ({ip}) failed: {reason}, rolling back")
+            _rollback_drain(task_arn, service_arn, ip, drain_id, outcome)
+            return {"status": "error", "reason": reason, "taskArn": task_arn}
+
+        # Mark as DRAINING
+        table.update_item(
+            Key={"taskArn": task_arn},
+            UpdateExpression="SET #s=:dr, lastIp=:ip",
+            ExpressionAttributeNames={"#s": "state"},
+            ExpressionAttributeValues={":dr": "DRAINING", ":ip": ip},
+        )
+        started = True
+    finally:
+        if not started:
+            _release_drain_slot(service_arn)
+
+    _put_metric("DrainStarted", 1, dimensions=[
+        {"Name": "ServiceArn", "Value": service_arn},
+        {"Name": "TaskArn", "Value": task_arn}
+    ])
+    logger.info(f"Successfully started drain for task {task_arn}")
+    return {"status": "started", "taskArn": task_arn, "ip": ip, "drainId": drain_id}
+
+
+def _resource_id(service_arn: str) -> str:
+    parts = service_arn.split(":service/")[-1]
+    cluster_name = parts.split("/")[0]
+    service_name = parts.split("/")[1]
+    return f"service/{cluster_name}/{service_name}"
+
+
+def _service_arn_from_group(cluster_arn: str, group: str) -> str:
+    """Task group "service:<name>" -> service ARN in the task's cluster"""
+    prefix, cluster_name = cluster_arn.split(":cluster/", 1)
+    return f"{prefix}:service/{cluster_name}/{group.split(':', 1)[1]}"
+
+
+def _describe_tasks_bulk(cluster_arn: str, task_arns: list) -> list:
+    """DescribeTasks in chunks of 100 ARNs (one call for a typical scale-in)"""
+    tasks = []
+    for i in range(0, len(task_arns), DESCRIBE_TASKS_MAX):
+        tasks += ecs.describe_tasks(cluster=cluster_arn, tasks=task_arns[i:i + DESCRIBE_TASKS_MAX]).get("tasks", [])
+    return tasks
+
+
+def _service_capacity(cluster_arn: str, service_arns: list) -> Dict[str, Tuple[int, int]]:
+    """{serviceArn: (desiredCount, MinCapacity)} with batched DescribeServices / DescribeScalableTargets"""
+    desired = {}
+    for i in range(0, len(service_arns), DESCRIBE_SERVICES_MAX):
+        for svc in ecs.describe_services(cluster=cluster_arn, services=service_arns[i:i + DESCRIBE_SERVICES_MAX]).get("services", []):
+            desired[svc["serviceArn"]] = svc.get("desiredCount", 0)
+    ids = {_resource_id(arn): arn for arn in service_arns}
+    min_capacity = {}
+    resource_ids = list(ids)
+    for i in range(0, len(resource_ids), DESCRIBE_SCALABLE_TARGETS_MAX):
+        resp = appscaling.describe_scalable_targets(ServiceNamespace="ecs", ResourceIds=resource_ids[i:i + DESCRIBE_SCALABLE_TARGETS_MAX])
+        for st in resp.get("ScalableTargets", []):
+            min_capacity[ids[st["ResourceId"]]] = st["MinCapacity"]
+    return {arn: (desired.get(arn, 0), min_capacity.get(arn, 0)) for arn in service_arns}
+
+
+def _plan_service_drains(cluster_arn: str, service_arn: str, tasks: list, capacity: Tuple[int, int], deadline: float) -> list:
+    """Drain as many of the service's pending tasks as its limits allow, best candidates first"""
+    desired, min_capacity = capacity
+    if desired <= min_capacity:
+        logger.info(f"Service {service_arn} at min capacity: {desired} <= {min_capacity}")
+        _put_metric("ScaleInSkipped", 1, dimensions=[{"Name": "Reason", "Value": "at_min_capacity"}])
+        return [{"status": "skipped", "reason": "at_min_capacity", "taskArn": t["taskArn"]} for t in tasks]
+
+    states = _get_task_states([t["taskArn"] for t in tasks])
+    candidates = [t for t in _rank_candidates(tasks) if states.get(t["taskArn"]) != "DRAINING" and _get_task_ip(t)]
+    results = [{"status": "skipped", "reason": "not_candidate", "taskArn": t["taskArn"]} for t in tasks if t not in candidates]
+    if not candidates:
+        return results
+    candidates = _rank_candidates(candidates, _poll_active_calls(candidates))
+    if _time_left(deadline) < LAMBDA_CALL_MAX_SECONDS:
+        # Earlier services used up the invocation: do not reserve slots for drains that cannot start
+        logger.warning(f"No time left to drain {service_arn}; deferring {len(candidates)} tasks")
+        return results + [{"status": "deferred", "reason": "out_of_time", "taskArn": t["taskArn"]} for t in candidates]
+    try:
+        state = _get_service_state(service_arn)
+        reason, granted, draining = _reserve_drain_slots(service_arn, state, min(len(candidates), desired - min_capacity))
+    except Exception as e:
+        logger.error(f"Failed to read drain state for {service_arn}: {e}")
+        reason, granted, draining = "state_unavailable", 0, 0
+    if reason:
+        logger.info(f"Service {service_arn} not admitted for drain: {reason}")
+        _put_metric("ScaleInSkipped", 1, dimensions=[{"Name": "Reason", "Value": reason}])
+        return results + [{"status": "skipped", "reason": reason, "taskArn": t["taskArn"]} for t in candidates]
+
+    logger.info(f"Service {service_arn}: draining {granted} of {len(candidates)} candidates")
+    chosen, rest = candidates[:granted], candidates[granted:]
+    futures = [batch_executor.submit(_drain_task, cluster_arn, service_arn, t["taskArn"], _get_task_ip(t), deadline) for t in chosen]
+    results += [f.result() for f in futures]
+    results += [{"status": "skipped", "reason": "concurrency_limit", "taskArn": t["taskArn"]} for t in rest]
+    started = sum(1 for r in results if r["status"] == "started")
+    _put_metric("DrainingCount", draining - (granted - started), dimensions=[{"Name": "ServiceArn", "Value": service_arn}])
+    return results
+
+
+def _handle_batch(records: list, context) -> Dict[str, Any]:
+    """
+    SQS batch of protectedScaleInAttempt events (collected over the batching window):
+    one DescribeTasks per cluster, then per service one admission and as many drains as allowed.
+    Records whose processing raised, or whose service was not reached before the
+    deadline, are reported back as batchItemFailures so SQS redelivers them.
+    """
+    deadline = _drain_deadline(context)
+    by_cluster: Dict[str, Dict[str, list]] = {}  # cluster -> taskArn -> SQS message ids
+    failures = []
+    for record in records:
+        try:
+            detail = json.loads(record["body"]).get("detail", {})
+            by_cluster.setdefault(detail["clusterArn"], {}).setdefault(detail["taskArn"], []).append(record["messageId"])
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Dropping malformed record {record.get('messageId')}: {e}")
+
+    results = []
+    for cluster_arn, task_messages in by_cluster.items():
+        if _time_left(deadline) < LAMBDA_CALL_MAX_SECONDS:
+            logger.warning(f"No time left for cluster {cluster_arn}; deferring {len(task_messages)} tasks")
+            failures += [mid for mids in task_messages.values() for mid in mids]
+            continue
+        try:
+            by_service: Dict[str, list] = {}
+            for task in _describe_tasks_bulk(cluster_arn, list(task_messages)):
+                service_arn = task.get("serviceArn")
+                if not service_arn and task.get("group", "").startswith("service:"):
+                    service_arn = _service_arn_from_group(cluster_arn, task["group"])
+                if service_arn:
+                    by_service.setdefault(service_arn, []).append(task)
+            capacity = _service_capacity(cluster_arn, list(by_service))
+            for service_arn, tasks in by_service.items():
+                planned = _plan_service_drains(cluster_arn, service_arn, tasks, capacity[service_arn], deadline)
+                failures += [mid for r in planned if r["status"] == "deferred" for mid in task_messages.get(r["taskArn"], [])]
+                results += planned
+        except Exception as e:
+            logger.error(f"Batch planning failed for cluster {cluster_arn}: {e}", exc_info=True)
+            _put_metric("ScaleInErrors", 1, dimensions=[{"Name": "Reason", "Value": "unexpected_error"}])
+            failures += [mid for mids in task_messages.values() for mid in mids]
+    logger.info(f"Batch results: {json.dumps(results, default=str)}")
+    return {"batchItemFailures": [{"itemIdentifier": mid} for mid in failures]}
+
+
 def _extract_cluster_service_task_from_ecs_event(event) -> tuple[str, str, str]:
     """Extract cluster, service, and task from ECS protected scale-in attempt event"""
     detail = event.get("detail", {})
@@ -216,8 +705,11 @@ def _extract_cluster_service_task_from_ecs_event(event) -> tuple[str, str, str]:
     return cluster_arn, service_arn, task_arn
 
 
+@metrics.flush_after
 def handler(event, context):
     """Main handler with comprehensive error handling and logging"""
+    if "Records" in event:
+        return _handle_batch(event["Records"], context)
     try:
         logger.info(f"Processing ECS protected scale-in event: {json.dumps(event)}")
         
@@ -231,33 +723,22 @@ def handler(event, context):
             logger.info(f"Task {task_arn} already being drained")
             return {"status": "skipped", "reason": "already_draining"}
         
-        # Check cooldown period
-        if _check_cooldown(service_arn):
-            logger.info(f"Service {service_arn} in cooldown period")
-            _put_metric("ScaleInSkipped", 1, dimensions=[{"Name": "Reason", "Value": "cooldown"}])
-            return {"status": "skipped", "reason": "cooldown"}
-        
-        # Check hourly limit
-        if _check_hourly_limit(service_arn):
-            logger.info(f"Service {service_arn} exceeded hourly drain limit")
-            _put_metric("ScaleInSkipped", 1, dimensions=[{"Name": "Reason", "Value": "hourly_limit"}])
-            return {"status": "skipped", "reason": "hourly_limit"}
-        
-        # Check concurrent draining limit
-        draining = _current_draining_count(service_arn)
-        if draining >= DRAIN_CONCURRENCY_LIMIT:
-            logger.info(f"Service {service_arn} at concurrent drain limit: {draining}")
-            _put_metric("ScaleInSkipped", 1, dimensions=[{"Name": "Reason", "Value": "concurrency_limit"}])
-            return {"status": "skipped", "reason": "concurrency_limit"}
+        # Check cooldown, hourly limit and concurrent draining limit (one read of the counter item)
+        try:
+            service_state = _get_service_state(service_arn)
+        except Exception as e:
+            logger.error(f"Failed to read drain state for {service_arn}: {e}")
+            service_state = None  # Fail safe - do not drain
+        reason = _admission_block_reason(service_state) if service_state else "state_unavailable"
+        if reason:
+            logger.info(f"Service {service_arn} not admitted for drain: {reason}")
+            _put_metric("ScaleInSkipped", 1, dimensions=[{"Name": "Reason", "Value": reason}])
+            return {"status": "skipped", "reason": reason}
 
         # Check min capacity
         svc = ecs.describe_services(cluster=cluster_arn, services=[service_arn])["services"][0]
         desired = svc.get("desiredCount", 0)
-        parts = service_arn.split(":service/")[-1]
-        cluster_name = parts.split("/")[0]
-        service_name = parts.split("/")[1]
-        resource_id = f"service/{cluster_name}/{service_name}"
-        sts = appscaling.describe_scalable_targets(ServiceNamespace="ecs", ResourceIds=[resource_id]).get("ScalableTargets", [])
+        sts = appscaling.describe_scalable_targets(ServiceNamespace="ecs", ResourceIds=[_resource_id(service_arn)]).get("ScalableTargets", [])
         min_capacity = sts[0]["MinCapacity"] if sts else 0
         if desired <= min_capacity:
             logger.info(f"Service {service_arn} at min capacity: {desired} <= {min_capacity}")
@@ -265,86 +746,41 @@ def handler(event, context):
             return {"status": "skipped", "reason": "at_min_capacity", "desired": desired, "min": min_capacity}
 
         # Get task details and IP
-        task_response = ecs.describe_tasks(cluster=cluster_arn, tasks=[task_arn])
-        if not task_response.get("tasks"):
-            logger.error(f"Task {task_arn} not found")
-            _put_metric("ScaleInErrors", 1, dimensions=[{"Name": "Reason", "Value": "task_not_found"}])
-            return {"status": "error", "reason": "task_not_found"}
-        
-        task = task_response["tasks"][0]
+        if LOAD_AWARE_SELECTION:
+            task = _pick_task(_get_running_tasks(cluster_arn, service_arn))
+            if not task:
+                logger.info(f"No drain candidate in service {service_arn}")
+                _put_metric("ScaleInSkipped", 1, dimensions=[{"Name": "Reason", "Value": "no_candidate"}])
+                return {"status": "skipped", "reason": "no_candidate"}
+            logger.info(f"Selected task {task['taskArn']} instead of event task {task_arn}")
+            task_arn = task["taskArn"]
+        else:
+            task_response = ecs.describe_tasks(cluster=cluster_arn, tasks=[task_arn])
+            if not task_response.get("tasks"):
+                logger.error(f"Task {task_arn} not found")
+                _put_metric("ScaleInErrors", 1, dimensions=[{"Name": "Reason", "Value": "task_not_found"}])
+                return {"status": "error", "reason": "task_not_found"}
+            task = task_response["tasks"][0]
+
         ip = _get_task_ip(task)
         if not ip:
             logger.error(f"Could not extract IP for task {task_arn}")
             _put_metric("ScaleInErrors", 1, dimensions=[{"Name": "Reason", "Value": "no_ip"}])
             return {"status": "error", "reason": "no_ip"}
 
-        drain_id = _hash_id(f"{task_arn}:{_now()//600}")  # bucketed 10min id
-        logger.info(f"Processing task {task_arn} with IP {ip}, drainId: {drain_id}")
-
-        # Transition Running -> DRAINING atomically
-        try:
-            table.update_item(
-                Key={"taskArn": task_arn},
-                UpdateExpression="SET #s = if_not_exists(#s, :running), serviceArn=:svc, drainId=:did, startedAt=:ts, clusterArn=:ca",
-                ConditionExpression="attribute_not_exists(#s) OR #s = :running",
-                ExpressionAttributeNames={"#s": "state"},
-                ExpressionAttributeValues={
-                    ":running": "RUNNING", 
-                    ":svc": service_arn, 
-                    ":did": drain_id, 
-                    ":ts": _now(),
-                    ":ca": cluster_arn
-                },
-            )
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-                logger.info(f"Task {task_arn} already being drained")
-                return {"status": "skipped", "reason": "already_draining"}
-            raise
-
-        # Invoke Kamailio to remove IP from distribution
-        if not _invoke_kamailio(ip, drain_id):
-            logger.error(f"Failed to invoke Kamailio for {ip}, rolling back")
-            # Rollback: mark task as RUNNING again
-            table.update_item(
-                Key={"taskArn": task_arn},
-                UpdateExpression="SET #s = :running",
-                ExpressionAttributeNames={"#s": "state"},
-                ExpressionAttributeValues={":running": "RUNNING"},
-            )
-            return {"status": "error", "reason": "kamailio_failed"}
-
-        # Call Asterisk to start drain
-        if not _call_asterisk_start(ip, task_arn, drain_id):
-            logger.error(f"Failed to start Asterisk drain for {ip}, rolling back")
-            # Rollback: mark task as RUNNING again
-            table.update_item(
-                Key={"taskArn": task_arn},
-                UpdateExpression="SET #s = :running",
-                ExpressionAttributeNames={"#s": "state"},
-                ExpressionAttributeValues={":running": "RUNNING"},
-            )
-            return {"status": "error", "reason": "asterisk_failed"}
-
-        # Mark as DRAINING
-        table.update_item(
-            Key={"taskArn": task_arn},
-            UpdateExpression="SET #s=:dr, lastIp=:ip",
-            ExpressionAttributeNames={"#s": "state"},
-            ExpressionAttributeValues={":dr": "DRAINING", ":ip": ip},
-        )
-
-        # Record metrics
-        _put_metric("DrainStarted", 1, dimensions=[
-            {"Name": "ServiceArn", "Value": service_arn},
-            {"Name": "TaskArn", "Value": task_arn}
-        ])
-        _put_metric("DrainingCount", draining + 1, dimensions=[
-            {"Name": "ServiceArn", "Value": service_arn}
-        ])
-
-        logger.info(f"Successfully started drain for task {task_arn}")
-        return {"status": "started", "taskArn": task_arn, "ip": ip, "drainId": drain_id}
+        # Reserve the drain on the service counter (re-checks the limits atomically)
+        reason, _, draining = _reserve_drain_slots(service_arn, service_state)
+        if reason:
+            logger.info(f"Service {service_arn} not admitted for drain: {reason}")
+            _put_metric("ScaleInSkipped", 1, dimensions=[{"Name": "Reason", "Value": reason}])
+            return {"status": "skipped", "reason": reason}
+
+        result = _drain_task(cluster_arn, service_arn, task_arn, ip, _drain_deadline(context))
+        if result["status"] == "started":
+            _put_metric("DrainingCount", draining, dimensions=[
+                {"Name": "ServiceArn", "Value": service_arn}
+            ])
+        return result
 
     except Exception as e:
         logger.error(f"Unexpected error in scale_manager: {e}", exc_info=True)
@@ -4,23 +4,29 @@ import time
 import boto3
 import logging
 from botocore.exceptions import ClientError, BotoCoreError
+from scalein_metrics import MetricsBuffer  # shared metrics layer (src/shared)
 from typing import Dict, Any, Optional
 
 # Environment variables
 TABLE_NAME = os.environ["TABLE_NAME"]
 SHARED_TOKEN = os.environ["SHARED_TOKEN"]
 
+# Per-service counter item maintained by the scale manager (same table)
+SERVICE_KEY_PREFIX = "SERVICE#"
+
 # AWS clients
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(TABLE_NAME)
 ecs = boto3.client("ecs")
 appscaling = boto3.client("application-autoscaling")
-cloudwatch = boto3.client("cloudwatch")
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Datapoints are buffered and written once per invocation (EMF log lines by default)
+metrics = MetricsBuffer.from_env()
+
 
 def _json(body, code=200):
     return {
@@ -31,19 +37,22 @@ def _json(body, code=200):
 
 
 def _put_metric(metric_name: str, value: float, unit: str = "Count", dimensions: Optional[Dict] = None):
-    """Put custom CloudWatch metric"""
+    """Buffer custom CloudWatch metric (written when the handler returns)"""
+    metrics.put(metric_name, value, unit, dimensions)
+
+
+def _release_drain_slot(service_arn: str):
+    """Drain finished: decrement the service's draining count on its counter item"""
     try:
-        cloudwatch.put_metric_data(
-            Namespace="ECS/SafeScaleIn",
-            MetricData=[{
-                "MetricName": metric_name,
-                "Value": value,
-                "Unit": unit,
-                "Dimensions": dimensions or []
-            }]
+        table.update_item(
+            Key={"taskArn": f"{SERVICE_KEY_PREFIX}{service_arn}"},
+            UpdateExpression="ADD drainingCount :minus",
+            ConditionExpression="drainingCount > :zero",
+            ExpressionAttributeValues={":minus": -1, ":zero": 0},
         )
-    except Exception as e:
-        logger.warning(f"Failed to put metric {metric_name}: {e}")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            logger.error(f"Failed to release drain slot for {service_arn}: {e}")
 
 
 def _auth(event):
@@ -53,6 +62,7 @@ def _auth(event):
     return True
 
 
+@metrics.flush_after
 def handler(event, context):
     """Main handler with comprehensive error handling and logging"""
     try:
@@ -123,13 +133,21 @@ def handler(event, context):
                 _put_metric("ScalerErrors", 1, dimensions=[{"Name": "Reason", "Value": "update_service_failed"}])
                 return _json({"message": "failed to update service"}, 500)
 
-        # Mark as SCALED_OUT
-        table.update_item(
-            Key={"taskArn": task_arn},
-            UpdateExpression="SET #s=:so, completedAt=:ca",
-            ExpressionAttributeNames={"#s": "state"},
-            ExpressionAttributeValues={":so": "SCALED_OUT", ":ca": int(time.time())},
-        )
+        # Mark as SCALED_OUT (only once, so a repeated callback does not release twice)
+        try:
+            table.update_item(
+                Key={"taskArn": task_arn},
+                UpdateExpression="SET #s=:so, completedAt=:ca",
+                ConditionExpression="#s = :dr",
+                ExpressionAttributeNames={"#s": "state"},
+                ExpressionAttributeValues={":so": "SCALED_OUT", ":dr": "DRAINING", ":ca": int(time.time())},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            logger.info(f"Task {task_arn} already marked SCALED_OUT")
+            return _json({"status": "scaled", "desired": max(desired - 1, 0)})
+        _release_drain_slot(service_arn)
 
         # Record metrics
         _put_metric("ScaleOutCompleted", 1, dimensions=[
@@ -0,0 +1,133 @@
+"""Buffered CloudWatch metrics shared by the Scale Manager and Scaler Lambdas (Lambda layer).
+
+Datapoints are collected in memory during an invocation and written once at the
+end (flush_after decorator):
+- METRICS_MODE=emf (default): Embedded Metric Format log lines, one per dimension
+  set. CloudWatch extracts the metrics from the logs; no API call in the request path.
+- METRICS_MODE=api: one put_metric_data call (chunked at 1000 datapoints).
+
+Dimensions are normalized: per-task/per-IP dimensions (TaskArn, TargetIP, DrainId)
+would create one metric per task, so they are dropped from the dimension set and
+kept as EMF properties (searchable in Logs Insights) instead.
+"""
+import functools
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger()
+
+HIGH_CARDINALITY_DIMENSIONS = frozenset({"TaskArn", "TargetIP", "DrainId"})
+MAX_DATUMS_PER_CALL = 1000
+MAX_EMF_VALUES = 100  # values per metric in one EMF document
+
+Dimensions = Union[None, Dict[str, str], List[Dict[str, str]]]
+
+
+class MetricsBuffer:
+    def __init__(self, namespace: str, mode: str = "emf", cloudwatch: Any = None):
+        self.namespace = namespace
+        self.mode = mode
+        self._cloudwatch = cloudwatch
+        self._points: List[Tuple[str, float, str, Tuple[Tuple[str, str], ...], Dict[str, str], float]] = []
+
+    @classmethod
+    def from_env(cls, cloudwatch: Any = None) -> "MetricsBuffer":
+        return cls(
+            namespace=os.environ.get("METRICS_NAMESPACE", "ECS/SafeScaleIn"),
+            mode=os.environ.get("METRICS_MODE", "emf").lower(),
+            cloudwatch=cloudwatch,
+        )
+
+    def put(self, metric_name: str, value: float, unit: str = "Count", dimensions: Dimensions = None):
+        """Buffer one datapoint. dimensions: {"Name": value} or put_metric_data style [{"Name", "Value"}]."""
+        dims, properties = normalize_dimensions(dimensions)
+        self._points.append((metric_name, value, unit, dims, properties, time.time()))
+
+    def flush(self):
+        """Write buffered datapoints; never raises (metrics must not fail the invocation)."""
+        points, self._points = self._points, []
+        if not points:
+            return
+        try:
+            if self.mode == "api":
+                self._flush_api(points)
+            else:
+                self._flush_emf(points)
+        except Exception as e:
+            logger.warning(f"Failed to flush {len(points)} metrics: {e}")
+
+    def flush_after(self, fn: Callable) -> Callable:
+        """Decorator for a Lambda handler: flush when it returns or raises."""
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.flush()
+
+        return wrapper
+
+    def _flush_emf(self, points):
+        groups: Dict[Tuple[Tuple[str, str], ...], List] = {}
+        for p in points:
+            groups.setdefault(p[3], []).append(p)
+        for dims, group in groups.items():
+            values: Dict[str, List[float]] = {}
+            units: Dict[str, str] = {}
+            properties: Dict[str, Any] = {}
+            for name, value, unit, _, props, _ in group:
+                values.setdefault(name, []).append(value)
+                units[name] = unit
+                for k, v in props.items():
+                    properties.setdefault(k, [])
+                    if v not in properties[k]:
+                        properties[k].append(v)
+            doc = {
+                "_aws": {
+                    "Timestamp": int(group[0][5] * 1000),
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [[k for k, _ in dims]],
+                        "Metrics": [{"Name": n, "Unit": units[n]} for n in values],
+                    }],
+                },
+                **{k: v[0] if len(v) == 1 else v for k, v in properties.items()},
+                **dict(dims),
+                **{n: v[0] if len(v) == 1 else v[:MAX_EMF_VALUES] for n, v in values.items()},
+            }
+            print(json.dumps(doc), flush=True)
+
+    def _flush_api(self, points):
+        if self._cloudwatch is None:
+            import boto3
+
+            self._cloudwatch = boto3.client("cloudwatch")
+        data = [
+            {
+                "MetricName": name,
+                "Value": value,
+                "Unit": unit,
+                "Dimensions": [{"Name": k, "Value": v} for k, v in dims],
+                "Timestamp": ts,
+            }
+            for name, value, unit, dims, _, ts in points
+        ]
+        for i in range(0, len(data), MAX_DATUMS_PER_CALL):
+            self._cloudwatch.put_metric_data(Namespace=self.namespace, MetricData=data[i:i + MAX_DATUMS_PER_CALL])
+
+
+def normalize_dimensions(dimensions: Dimensions) -> Tuple[Tuple[Tuple[str, str], ...], Dict[str, str]]:
+    """(sorted low-cardinality dimensions, high-cardinality values moved to properties)"""
+    if not dimensions:
+        return (), {}
+    if isinstance(dimensions, dict):
+        pairs = list(dimensions.items())
+    else:
+        pairs = [(d["Name"], d["Value"]) for d in dimensions]
+    dims = tuple(sorted((k, str(v)) for k, v in pairs if k not in HIGH_CARDINALITY_DIMENSIONS))
+    properties = {k: str(v) for k, v in pairs if k in HIGH_CARDINALITY_DIMENSIONS}
+    return dims, properties
@@ -0,0 +1,27 @@
+"""Loads the Lambda modules with stub configuration (no AWS calls are made at import)."""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src", "shared", "python"))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("TABLE_NAME", "drain-states")
+os.environ.setdefault("KAMAILIO_LAMBDA_ARN", "arn:aws:lambda:us-east-1:111111111111:function:kamailio")
+os.environ.setdefault("SCALER_FUNCTION_URL", "https://scaler.example")
+os.environ.setdefault("SHARED_TOKEN", "token")
+
+
+def _load(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def scale_manager():
+    return _load("scale_manager_app", "src/scale_manager/app.py")
@@ -0,0 +1,106 @@
+"""Drain admission on the per-service counter item, and candidate ranking."""
+from datetime import datetime, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+NOW = 1_800_000_000
+SERVICE = "arn:aws:ecs:us-east-1:111111111111:service/c/s"
+
+
+def _conflict():
+    return ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+
+
+class FakeTable:
+    def __init__(self, fail=0):
+        self.updates = []
+        self.fail = fail
+
+    def update_item(self, **kwargs):
+        self.updates.append(kwargs)
+        if self.fail:
+            self.fail -= 1
+            raise _conflict()
+        values = kwargs["ExpressionAttributeValues"]
+        return {"Attributes": {"drainingCount": values[":max_before"] + values[":n"]}} if ":n" in values else {}
+
+
+@pytest.fixture
+def sm(scale_manager, monkeypatch):
+    monkeypatch.setattr(scale_manager, "_now", lambda: NOW)
+    monkeypatch.setattr(scale_manager, "COOLDOWN_SECONDS", 900)
+    monkeypatch.setattr(scale_manager, "MAX_DRAINS_PER_HOUR", 3)
+    monkeypatch.setattr(scale_manager, "DRAIN_CONCURRENCY_LIMIT", 2)
+    monkeypatch.setattr(scale_manager, "table", FakeTable())
+    return scale_manager
+
+
+def _state(last=0, times=(), draining=0, version=1):
+    return {"lastDrainAt": last, "drainTimes": list(times), "drainingCount": draining, "version": version}
+
+
+def test_admission_block_reason(sm):
+    assert sm._admission_block_reason(_state()) is None
+    assert sm._admission_block_reason(_state(last=NOW - 60)) == "cooldown"
+    assert sm._admission_block_reason(_state(times=[NOW - 1000, NOW - 2000, NOW - 3000])) == "hourly_limit"
+    assert sm._admission_block_reason(_state(times=[NOW - 4000] * 3)) is None  # older than an hour
+    assert sm._admission_block_reason(_state(draining=2)) == "concurrency_limit"
+
+
+def test_reserve_grants_up_to_the_tightest_limit(sm):
+    reason, granted, draining = sm._reserve_drain_slots(SERVICE, _state(times=[NOW - 1000, NOW - 5000]), wanted=5)
+    assert (reason, granted) == (None, 2)  # concurrency limit 2 (hourly would allow 2 as well)
+    values = sm.table.updates[0]["ExpressionAttributeValues"]
+    assert values[":times"] == [NOW - 1000, NOW, NOW]  # expired entry dropped, one per grant
+    assert values[":max_before"] == 0 and values[":v"] == 1 and values[":next"] == 2
+    assert draining == 2
+
+    sm.table.updates.clear()
+    reason, granted, _ = sm._reserve_drain_slots(SERVICE, _state(times=[NOW - 1000, NOW - 2000], draining=1), wanted=5)
+    assert (reason, granted) == (None, 1)
+    assert sm.table.updates[0]["ExpressionAttributeValues"][":max_before"] == 1
+
+
+def test_reserve_blocked_does_not_write(sm):
+    assert sm._reserve_drain_slots(SERVICE, _state(last=NOW - 10)) == ("cooldown", 0, 0)
+    assert sm.table.updates == []
+
+
+def test_reserve_retries_on_conflict_with_fresh_state(sm, monkeypatch):
+    sm.table.fail = 1
+    reads = []
+    monkeypatch.setattr(sm, "_get_service_state", lambda arn: reads.append(arn) or _state(version=7))
+    reason, granted, _ = sm._reserve_drain_slots(SERVICE, _state(version=6))
+    assert (reason, granted) == (None, 1)
+    assert reads == [SERVICE]
+    assert [u["ExpressionAttributeValues"][":v"] for u in sm.table.updates] == [6, 7]
+
+
+def test_reserve_gives_up_when_contended(sm, monkeypatch):
+    sm.table.fail = 99
+    monkeypatch.setattr(sm, "_get_service_state", lambda arn: _state())
+    assert sm._reserve_drain_slots(SERVICE, _state())[:2] == ("contended", 0)
+    assert len(sm.table.updates) == sm.ADMISSION_MAX_ATTEMPTS
+
+
+def test_release_drain_slot(sm):
+    sm._release_drain_slot(SERVICE, count=2)
+    update = sm.table.updates[0]
+    assert update["Key"] == {"taskArn": f"SERVICE#{SERVICE}"}
+    assert update["ExpressionAttributeValues"] == {":minus": -2, ":count": 2}
+    assert update["ConditionExpression"] == "drainingCount >= :count"
+
+    sm.table.fail = 1
+    sm._release_drain_slot(SERVICE)  # already zero: conflict is ignored
+
+
+def _task(arn, minute, status="RUNNING"):
+    return {"taskArn": arn, "lastStatus": status, "startedAt": datetime(2026, 1, 1, 0, minute, tzinfo=timezone.utc)}
+
+
+def test_rank_candidates(scale_manager):
+    tasks = [_task("old", 1), _task("new", 5), _task("mid", 3), _task("stopping", 9, "DEACTIVATING")]
+    assert [t["taskArn"] for t in scale_manager._rank_candidates(tasks)] == ["new", "mid", "old"]
+    ranked = scale_manager._rank_candidates(tasks, {"old": 0, "new": 4})
+    assert [t["taskArn"] for t in ranked] == ["old", "new", "mid"]  # unknown count ranks last
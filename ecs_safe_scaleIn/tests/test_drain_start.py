@@ -0,0 +1,85 @@
+"""Drain start outcome handling."""
+import pytest
+
+SERVICE = "arn:aws:ecs:us-east-1:111111111111:service/c/s"
+
+
+class RecordingTable:
+    def __init__(self):
+        self.updates = []
+
+    def update_item(self, **kwargs):
+        self.updates.append(kwargs)
+        return {}
+
+
+@pytest.fixture
+def sm(scale_manager, monkeypatch):
+    monkeypatch.setattr(scale_manager, "table", RecordingTable())
+    released = []
+    monkeypatch.setattr(scale_manager, "_release_drain_slot", lambda arn, count=1: released.append(arn))
+    monkeypatch.setattr(scale_manager, "released", released, raising=False)
+    return scale_manager
+
+
+def _states(sm):
+    return [u["ExpressionAttributeValues"].get(":dr") or u["ExpressionAttributeValues"].get(":running")
+            for u in sm.table.updates if "#s" in u["UpdateExpression"]]
+
+
+def test_asterisk_draining_without_cancel_keeps_task_draining(sm, monkeypatch):
+    monkeypatch.setattr(sm, "ASTERISK_CANCEL_PATH", "")
+    monkeypatch.setattr(sm, "_start_drain", lambda *a: {"kamailio": False, "asterisk": True})
+    assert sm._drain_task("cluster", SERVICE, "task", "10.0.0.1", 0)["status"] == "started"
+    assert _states(sm)[-1] == "DRAINING"
+    assert sm.released == []
+
+
+def test_failed_drain_start_rolls_back_and_releases(sm, monkeypatch):
+    monkeypatch.setattr(sm, "ASTERISK_CANCEL_PATH", "")
+    monkeypatch.setattr(sm, "_start_drain", lambda *a: {"kamailio": True, "asterisk": False})
+    monkeypatch.setattr(sm, "_undo", lambda *a: None)
+    assert sm._drain_task("cluster", SERVICE, "task", "10.0.0.1", 0) == {
+        "status": "error", "reason": "asterisk_failed", "taskArn": "task",
+    }
+    assert _states(sm)[-1] == "RUNNING"
+    assert sm.released == [SERVICE]
+
+
+def test_retry_until_needs_room_for_a_whole_call(sm):
+    calls = []
+    deadline = sm.time.monotonic() + 5
+    assert not sm._retry_until("Kamailio invocation", "ip", lambda t: calls.append(t) or True, deadline, min_call_seconds=13)
+    assert calls == []
+    assert sm._retry_until("Asterisk drain start", "ip", lambda t: calls.append(t) or True, deadline)
+    assert len(calls) == 1 and calls[0] <= 5
+
+
+def test_batch_defers_services_once_time_runs_out(sm, monkeypatch):
+    import json
+
+    tasks = {
+        "t1": {"taskArn": "t1", "group": "service:a", "lastStatus": "RUNNING"},
+        "t2": {"taskArn": "t2", "group": "service:b", "lastStatus": "RUNNING"},
+    }
+    monkeypatch.setattr(sm, "_describe_tasks_bulk", lambda cluster, arns: [tasks[a] for a in arns])
+    monkeypatch.setattr(sm, "_service_capacity", lambda cluster, arns: {a: (3, 1) for a in arns})
+    monkeypatch.setattr(sm, "_get_task_states", lambda arns: {})
+    monkeypatch.setattr(sm, "_get_task_ip", lambda task: "10.0.0.1")
+    monkeypatch.setattr(sm, "_poll_active_calls", lambda tasks: {})
+    monkeypatch.setattr(sm, "_get_service_state", lambda arn: {})
+    monkeypatch.setattr(sm, "_reserve_drain_slots", lambda arn, state, wanted: (None, 1, 1))
+    clock = {"left": 60}
+
+    def drain(cluster, service, task, ip, deadline):
+        clock["left"] = 1  # the first service's drain uses up the invocation
+        return {"status": "started", "taskArn": task}
+
+    monkeypatch.setattr(sm, "_drain_task", drain)
+    monkeypatch.setattr(sm, "_time_left", lambda deadline: clock["left"])
+    cluster = "arn:aws:ecs:us-east-1:111111111111:cluster/c"
+    records = [
+        {"messageId": f"m-{arn}", "body": json.dumps({"detail": {"clusterArn": cluster, "taskArn": arn}})}
+        for arn in ("t1", "t2")
+    ]
+    assert sm._handle_batch(records, None) == {"batchItemFailures": [{"itemIdentifier": "m-t2"}]}
@@ -0,0 +1,14 @@
+"""Buffered metrics (shared layer)."""
+from scalein_metrics import normalize_dimensions
+
+
+def test_normalize_dimensions():
+    assert normalize_dimensions(None) == ((), {})
+    dims, props = normalize_dimensions([
+        {"Name": "ServiceArn", "Value": "svc"},
+        {"Name": "TaskArn", "Value": "task"},
+        {"Name": "Reason", "Value": "cooldown"},
+    ])
+    assert dims == (("Reason", "cooldown"), ("ServiceArn", "svc"))
+    assert props == {"TaskArn": "task"}
+    assert normalize_dimensions({"TargetIP": "10.0.0.1", "Count": 3}) == ((("Count", "3"),), {"TargetIP": "10.0.0.1"})
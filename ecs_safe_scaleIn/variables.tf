@@ -14,4 +14,15 @@ variable "drain_concurrency_limit" { type = number  default = 1 }
 
 variable "shared_token" { type = string  sensitive = true }
 
+# emf = metrics as Embedded Metric Format log lines; api = one PutMetricData call per invocation
+variable "metrics_mode" { type = string  default = "emf" }
 
+# Batch planning: buffer scale-in attempts in SQS for up to batch_window_seconds and
+# plan the drains of a whole scale-in event together
+variable "batch_planning_enabled" { type = bool  default = false }
+variable "batch_window_seconds" { type = number  default = 10 }
+variable "batch_max_parallel_drains" { type = number  default = 4 }
+
+# Drain the service's task with the fewest live calls (polled from Asterisk) instead of the event's task
+variable "load_aware_selection" { type = bool  default = false }
+variable "asterisk_calls_path" { type = string  default = "/calls/active" }